@@ -42,11 +42,16 @@ function initNeDB() {
 // Try to connect to MongoDB, fallback to NeDB
 async function connectDatabase(mongoUri) {
     try {
-        await mongoose.connect(mongoUri, {
+        // Both timeouts can be tuned while measuring failover with tools/fault_proxy.py
+        const options = {
             useNewUrlParser: true,
             useUnifiedTopology: true,
-            serverSelectionTimeoutMS: 5000
-        });
+            serverSelectionTimeoutMS: parseInt(process.env.MONGO_SERVER_SELECTION_TIMEOUT_MS) || 5000
+        };
+        if (process.env.MONGO_SOCKET_TIMEOUT_MS) {
+            options.socketTimeoutMS = parseInt(process.env.MONGO_SOCKET_TIMEOUT_MS);
+        }
+        await mongoose.connect(mongoUri, options);
         
         console.log('✅ MongoDB connected successfully');
         console.log(`🗄️  Database: ${mongoose.connection.name}`);
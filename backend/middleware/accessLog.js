@@ -0,0 +1,37 @@
+// One line per request, parsed by tools/metrics_exporter.py and recorded by tools/traffic.py:
+//   [access] GET /api/chatbot/:botId 200 12.4ms req=0 res=1834 path=/api/chatbot/bot_x at=1718000000123 client=3f9a0c12
+// `at` is the arrival time (epoch ms) and `client` a short hash of the client IP.
+// Enabled with ACCESS_LOG=1 (the control panel sets it when it starts the server).
+const crypto = require('crypto');
+
+const ENABLED = ['1', 'true', 'yes'].includes(String(process.env.ACCESS_LOG || '').toLowerCase());
+
+/**
+ * Route template for the request, so metrics are grouped per endpoint
+ * rather than per botId
+ */
+const routeOf = (req) => {
+    if (req.route && req.route.path) {
+        return `${req.baseUrl || ''}${req.route.path}`;
+    }
+    if (req.originalUrl.startsWith('/api/')) return 'unmatched';
+    return 'static';
+};
+
+const accessLog = (req, res, next) => {
+    if (!ENABLED) return next();
+
+    const arrivedAt = Date.now();
+    const started = process.hrtime.bigint();
+    res.on('finish', () => {
+        const ms = Number(process.hrtime.bigint() - started) / 1e6;
+        const reqBytes = parseInt(req.headers['content-length']) || 0;
+        const resBytes = parseInt(res.getHeader('content-length')) || 0;
+        const url = req.originalUrl.replace(/\s/g, '%20');
+        const client = crypto.createHash('sha1').update(String(req.ip)).digest('hex').slice(0, 8);
+        console.log(`[access] ${req.method} ${routeOf(req)} ${res.statusCode} ${ms.toFixed(1)}ms req=${reqBytes} res=${resBytes} path=${url} at=${arrivedAt} client=${client}`);
+    });
+    next();
+};
+
+module.exports = accessLog;
@@ -0,0 +1,95 @@
+const fs = require('fs');
+const path = require('path');
+
+// Built by tools/build_assets.py
+const DIST_DIR = process.env.STATIC_DIST_DIR || path.join(__dirname, '../../dist');
+const MANIFEST_FILE = path.join(DIST_DIR, 'manifest.json');
+const MANIFEST_CHECK_MS = 2000;
+
+const IMMUTABLE = 'public, max-age=31536000, immutable';
+const REVALIDATE = 'public, max-age=300, must-revalidate';
+const SUFFIXES = { br: '.br', gzip: '.gz', identity: '' };
+
+let routes = null;
+let loadedMtime = 0;
+let checkedAt = 0;
+
+/**
+ * Index the manifest by URL path: logical names ("widget/chatbot.js") and
+ * their fingerprinted copies ("widget/chatbot.0814e503fc.js").
+ */
+const loadManifest = () => {
+    const now = Date.now();
+    if (now - checkedAt < MANIFEST_CHECK_MS) return routes;
+    checkedAt = now;
+
+    try {
+        const mtime = fs.statSync(MANIFEST_FILE).mtimeMs;
+        if (routes && mtime === loadedMtime) return routes;
+
+        const manifest = JSON.parse(fs.readFileSync(MANIFEST_FILE, 'utf8'));
+        const next = new Map();
+        for (const [logical, entry] of Object.entries(manifest.files || {})) {
+            next.set(logical, { entry, immutable: false });
+            if (entry.hashed) next.set(entry.path, { entry, immutable: true });
+        }
+        routes = next;
+        loadedMtime = mtime;
+    } catch (error) {
+        if (routes) console.error('Static asset manifest error:', error.message);
+        routes = null;
+    }
+    return routes;
+};
+
+const pickEncoding = (req, encodings) => {
+    const accepted = req.acceptsEncodings(Object.keys(encodings).filter(enc => enc !== 'identity').concat('identity'));
+    return accepted && encodings[accepted] !== undefined ? accepted : 'identity';
+};
+
+/**
+ * Serve the precompressed build of `prefix` ("frontend" or "widget") when
+ * dist/manifest.json exists; otherwise fall through to express.static.
+ */
+const staticAssets = (prefix) => (req, res, next) => {
+    if (req.method !== 'GET' && req.method !== 'HEAD') return next();
+
+    const table = loadManifest();
+    if (!table) return next();
+
+    let urlPath = req.path;
+    if (urlPath.endsWith('/')) urlPath += 'index.html';
+    const route = table.get(`${prefix}${urlPath}`);
+    if (!route) return next();
+
+    const { entry, immutable } = route;
+    const encoding = pickEncoding(req, entry.encodings);
+    const etag = `"${entry.sha256.slice(0, 16)}-${encoding}"`;
+
+    res.setHeader('Vary', 'Accept-Encoding');
+    res.setHeader('ETag', etag);
+    res.setHeader('Cache-Control', immutable ? IMMUTABLE : (entry.hashed ? REVALIDATE : 'no-cache'));
+    res.type(path.extname(entry.path));
+
+    const ifNoneMatch = req.headers['if-none-match'];
+    if (ifNoneMatch && ifNoneMatch.split(/\s*,\s*/).includes(etag)) {
+        return res.status(304).end();
+    }
+
+    if (encoding !== 'identity') res.setHeader('Content-Encoding', encoding);
+    res.setHeader('Content-Length', entry.encodings[encoding]);
+    if (req.method === 'HEAD') return res.end();
+
+    const stream = fs.createReadStream(path.join(DIST_DIR, entry.path + SUFFIXES[encoding]));
+    stream.on('error', (error) => {
+        console.error('Static asset error:', error.message);
+        if (!res.headersSent) {
+            res.removeHeader('Content-Encoding');
+            return next();
+        }
+        res.destroy(error);
+    });
+    stream.pipe(res);
+};
+
+module.exports = staticAssets;
@@ -214,6 +214,9 @@ If you don't know the answer, politely say you don't have that information.`
 // Index for better performance
 chatbotSchema.index({ userId: 1, botId: 1 });
 chatbotSchema.index({ isPublished: 1, isActive: 1 });
+// Incremental scans in tools/stats_rollup.py
+chatbotSchema.index({ createdAt: 1 });
+chatbotSchema.index({ updatedAt: 1 });
 
 // Update timestamp on save
 chatbotSchema.pre('save', function(next) {
@@ -111,10 +111,11 @@ const leadSchema = new mongoose.Schema({
 });
 
 // Indexes
-leadSchema.index({ botId: 1, createdAt: -1 });
+leadSchema.index({ botId: 1, createdAt: -1, _id: -1 });
 leadSchema.index({ userId: 1, status: 1 });
 leadSchema.index({ email: 1 });
 leadSchema.index({ phone: 1 });
+leadSchema.index({ createdAt: 1 }); // incremental scans in tools/stats_rollup.py
 
 // Update timestamp
 leadSchema.pre('save', function(next) {
@@ -73,6 +73,10 @@ const userSchema = new mongoose.Schema({
   }
 });
 
+// Newest users per role (admin dashboard); sign-ups since a checkpoint (tools/stats_rollup.py)
+userSchema.index({ role: 1, createdAt: -1 });
+userSchema.index({ createdAt: 1 });
+
 // Hash password before saving
 userSchema.pre('save', async function(next) {
   if (!this.isModified('password')) return next();
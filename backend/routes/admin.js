@@ -4,27 +4,42 @@ const User = require('../models/User');
 const Chatbot = require('../models/Chatbot');
 const SystemSettings = require('../models/SystemSettings');
 const adminAuth = require('../middleware/adminAuth');
+const getStatsRollup = require('../utils/statsRollup');
 
 // @route   GET api/admin/stats
 // @desc    Get system-wide statistics
 // @access  Admin
 router.get('/stats', adminAuth, async (req, res) => {
   try {
+    // Get recent users
+    const recentUsers = await User.find({ role: 'user' })
+      .sort({ createdAt: -1 })
+      .limit(5)
+      .select('-password');
+
+    // Serve the precomputed rollup (tools/stats_rollup.py) when it is fresh
+    const rollup = await getStatsRollup();
+    if (rollup) {
+      return res.json({
+        totalUsers: rollup.totals.users,
+        totalChatbots: rollup.totals.chatbots,
+        totalMessages: rollup.totals.messages,
+        totalLeads: rollup.totals.leads,
+        daily: rollup.daily,
+        generatedAt: rollup.generatedAt,
+        recentUsers
+      });
+    }
+
     const totalUsers = await User.countDocuments({ role: 'user' });
     const totalChatbots = await Chatbot.countDocuments();
     
     // Calculate total messages (aggregation)
     const messagesStats = await Chatbot.aggregate([
-      { $group: { _id: null, total: { $sum: "$analytics.totalMessages" } } }
+      { $group: { _id: null, total: { $sum: "$stats.totalMessages" } } }
     ]);
     const totalMessages = messagesStats.length > 0 ? messagesStats[0].total : 0;
 
-    // Get recent users
-    const recentUsers = await User.find({ role: 'user' })
-      .sort({ date: -1 })
-      .limit(5)
-      .select('-password');
-
     res.json({
       totalUsers,
       totalChatbots,
@@ -48,7 +63,7 @@ router.get('/users', adminAuth, async (req, res) => {
 
     const users = await User.find({ role: { $ne: 'admin' } }) // Exclude admins
       .select('-password')
-      .sort({ date: -1 })
+      .sort({ createdAt: -1 })
       .skip(skip)
       .limit(limit);
 
@@ -1,13 +1,32 @@
 const express = require('express');
+const mongoose = require('mongoose');
 const router = express.Router();
 const Chatbot = require('../models/Chatbot');
 const Lead = require('../models/Lead');
 const { authMiddleware } = require('../middleware/auth');
+const { findPage } = require('../utils/cursor');
 const aiService = require('../services/aiService');
+const retrievalService = require('../services/retrievalService');
 const fileService = require('../services/fileService');
 const emailService = require('../services/emailService');
 const whatsappService = require('../services/whatsappService');
 const { v4: uuidv4 } = require('uuid');
+const fs = require('fs');
+const path = require('path');
+
+// Precomputed by tools/analytics_export.py; re-read only when the file changes
+const ANALYTICS_SUMMARY_PATH = process.env.ANALYTICS_SUMMARY_PATH ||
+    path.join(__dirname, '../../tools/exports/analytics/summary.json');
+let analyticsSummary = { mtimeMs: 0, data: null };
+
+const loadAnalyticsSummary = async () => {
+    const stat = await fs.promises.stat(ANALYTICS_SUMMARY_PATH);
+    if (stat.mtimeMs !== analyticsSummary.mtimeMs) {
+        const raw = await fs.promises.readFile(ANALYTICS_SUMMARY_PATH, 'utf8');
+        analyticsSummary = { mtimeMs: stat.mtimeMs, data: JSON.parse(raw) };
+    }
+    return analyticsSummary.data;
+};
 
 // Create new chatbot
 router.post('/create', authMiddleware, async (req, res) => {
@@ -91,6 +110,7 @@ router.post('/:botId/upload-knowledge', authMiddleware,
         
         chatbot.knowledgeBase.push(knowledgeEntry);
         await chatbot.save();
+        retrievalService.sync(botId, chatbot.knowledgeBase);
         
         // Clean up uploaded file
         await fileService.deleteFile(fileData.path);
@@ -198,7 +218,8 @@ router.post('/:botId/chat', async (req, res) => {
         const context = await aiService.findRelevantContext(
             message,
             chatbot.knowledgeBase,
-            3
+            3,
+            botId
         );
 
         // Check if this is a property inquiry (Real Estate specific)
@@ -413,11 +434,13 @@ router.patch('/:botId/publish', authMiddleware, async (req, res) => {
     }
 });
 
-// Get leads for a chatbot (with pagination & filtering)
+// Get leads for a chatbot (with pagination & filtering).
+// Pass ?cursor= (empty for the first page) to page by keyset instead of
+// page number; the response then carries nextCursor and no total.
 router.get('/:botId/leads', authMiddleware, async (req, res) => {
     try {
         const { botId } = req.params;
-        const { page = 1, limit = 50, startDate, endDate, status } = req.query;
+        const { page = 1, limit = 50, startDate, endDate, status, cursor } = req.query;
         
         // Verify bot ownership
         const chatbot = await Chatbot.findOne({ botId, userId: req.userId });
@@ -447,6 +470,12 @@ router.get('/:botId/leads', authMiddleware, async (req, res) => {
         // Calculate pagination
         const pageNum = Math.max(1, parseInt(page) || 1);
         const pageSize = Math.min(100, Math.max(1, parseInt(limit) || 50));
+
+        if (cursor !== undefined) {
+            const { items, nextCursor } = await findPage(Lead, query, cursor, pageSize);
+            return res.json({ leads: items, nextCursor });
+        }
+
         const skip = (pageNum - 1) * pageSize;
         
         // Get total count for pagination
@@ -468,11 +497,70 @@ router.get('/:botId/leads', authMiddleware, async (req, res) => {
             }
         });
     } catch (error) {
+        if (error.status === 400) {
+            return res.status(400).json({ error: error.message });
+        }
         console.error('Get leads error:', error);
         res.status(500).json({ error: 'Failed to get leads: ' + error.message });
     }
 });
 
+// Get conversations for a chatbot, newest first, by keyset cursor
+// (?cursor=<nextCursor from the previous page>&limit=1..100)
+router.get('/:botId/conversations', authMiddleware, async (req, res) => {
+    try {
+        const { botId } = req.params;
+        const { limit = 50, cursor } = req.query;
+
+        // Verify bot ownership
+        const chatbot = await Chatbot.findOne({ botId, userId: req.userId }).select('botId');
+        if (!chatbot) {
+            return res.status(404).json({ error: 'Chatbot not found' });
+        }
+
+        // Registered in server.js after this router is loaded
+        const Conversation = mongoose.model('Conversation');
+        const pageSize = Math.min(100, Math.max(1, parseInt(limit) || 50));
+        const { items, nextCursor } = await findPage(Conversation, { botId }, cursor, pageSize);
+
+        res.json({ conversations: items, nextCursor });
+    } catch (error) {
+        if (error.status === 400) {
+            return res.status(400).json({ error: error.message });
+        }
+        console.error('Get conversations error:', error);
+        res.status(500).json({ error: 'Failed to get conversations' });
+    }
+});
+
+// Get precomputed analytics for a chatbot
+router.get('/:botId/analytics', authMiddleware, async (req, res) => {
+    try {
+        const { botId } = req.params;
+
+        // Verify bot ownership
+        const chatbot = await Chatbot.findOne({ botId, userId: req.userId }).select('botId');
+        if (!chatbot) {
+            return res.status(404).json({ error: 'Chatbot not found' });
+        }
+
+        let summary;
+        try {
+            summary = await loadAnalyticsSummary();
+        } catch (error) {
+            return res.status(404).json({ error: 'Analytics have not been exported yet' });
+        }
+
+        res.json({
+            generatedAt: summary.generatedAt,
+            analytics: (summary.bots || {})[botId] || null
+        });
+    } catch (error) {
+        console.error('Get analytics error:', error);
+        res.status(500).json({ error: 'Failed to get analytics' });
+    }
+});
+
 // Delete chatbot
 router.delete('/:botId', authMiddleware, async (req, res) => {
     try {
@@ -485,6 +573,7 @@ router.delete('/:botId', authMiddleware, async (req, res) => {
 
         // Also delete associated leads
         await Lead.deleteMany({ botId });
+        retrievalService.drop(botId);
 
         res.json({ success: true, message: 'Chatbot deleted successfully' });
     } catch (error) {
@@ -7,6 +7,8 @@ const rateLimit = require('express-rate-limit');
 const path = require('path');
 const { connectDatabase, dbAdapter } = require('./db/dbAdapter');
 const seedDefaultAdmin = require('./utils/seedAdmin');
+const staticAssets = require('./middleware/staticAssets');
+const accessLog = require('./middleware/accessLog');
 
 dotenv.config();
 
@@ -23,6 +25,9 @@ const { authMiddleware } = require('./middleware/auth');
 // Import models
 const Chatbot = require('./models/Chatbot');
 
+// Per-request access log for tools/metrics_exporter.py (ACCESS_LOG=1)
+app.use(accessLog);
+
 // Security middleware
 app.use(helmet({
     crossOriginResourcePolicy: { policy: "cross-origin" },
@@ -81,19 +86,26 @@ const corsOptions = {
 };
 app.use(cors(corsOptions));
 
-// Serve widget files statically
-app.use('/widget', express.static(path.join(__dirname, '../widget')));
+// Serve widget files statically (precompressed build from tools/build_assets.py when present)
+app.use('/widget', staticAssets('widget'), express.static(path.join(__dirname, '../widget')));
 
 // Serve frontend files statically
-app.use('/frontend', express.static(path.join(__dirname, '../frontend')));
+app.use('/frontend', staticAssets('frontend'), express.static(path.join(__dirname, '../frontend')));
 
 // Serve root as frontend
-app.use(express.static(path.join(__dirname, '../frontend')));
+app.use(staticAssets('frontend'), express.static(path.join(__dirname, '../frontend')));
+
+// Behind a load balancer (or tools/traffic.py replaying many clients), take the
+// client IP from X-Forwarded-For; e.g. TRUST_PROXY=loopback or a hop count
+if (process.env.TRUST_PROXY) {
+    const hops = Number(process.env.TRUST_PROXY);
+    app.set('trust proxy', Number.isInteger(hops) ? hops : process.env.TRUST_PROXY);
+}
 
 // Rate limiting
 const limiter = rateLimit({
-    windowMs: 15 * 60 * 1000, // 15 minutes
-    max: 100, // limit each IP to 100 requests per windowMs
+    windowMs: parseInt(process.env.RATE_LIMIT_WINDOW_MS) || 15 * 60 * 1000, // 15 minutes
+    max: parseInt(process.env.RATE_LIMIT_MAX) || 100, // limit each IP to 100 requests per windowMs
     message: 'Too many requests from this IP, please try again later'
 });
 app.use('/api/', limiter);
@@ -145,6 +157,9 @@ const conversationSchema = new mongoose.Schema({
     }
 });
 
+// Serves the per-bot history and the keyset-paginated export (utils/cursor.js)
+conversationSchema.index({ botId: 1, createdAt: -1, _id: -1 });
+
 const Conversation = mongoose.model('Conversation', conversationSchema);
 
 // Routes
@@ -374,6 +389,16 @@ const startServer = async () => {
             console.error('Server error:', err);
         });
 
+        // Exit through process.exit on stop signals so node flushes
+        // --cpu-prof/--heap-prof output (tools/profiler.py)
+        ['SIGINT', 'SIGTERM', 'SIGBREAK'].forEach((signal) => {
+            process.on(signal, () => {
+                console.log(`\n${signal} received, shutting down...`);
+                server.close();
+                process.exit(0);
+            });
+        });
+
         return server;
     } catch (err) {
         console.error('Failed to start server:', err);
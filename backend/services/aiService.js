@@ -1,5 +1,7 @@
 const OpenAI = require('openai');
 const { GoogleGenerativeAI } = require('@google/generative-ai');
+const embeddingCache = require('./embeddingCache');
+const retrievalService = require('./retrievalService');
 
 class AIService {
     constructor() {
@@ -30,10 +32,30 @@ class AIService {
         }
     }
 
+    /**
+     * Identifier of the active embedding model (used as the cache namespace)
+     */
+    getEmbeddingModelName() {
+        return this.provider === 'gemini' ? 'gemini/embedding-001' : `openai/${this.embeddingModel}`;
+    }
+
     /**
      * Generate embeddings for text
      */
     async generateEmbedding(text) {
+        const model = this.getEmbeddingModelName();
+        const [cached] = await embeddingCache.lookup(model, [text]);
+        if (cached) return cached;
+
+        const embedding = await this.requestEmbedding(text);
+        embeddingCache.store(model, [text], [embedding]);
+        return embedding;
+    }
+
+    /**
+     * Call the provider for a single embedding (no caching)
+     */
+    async requestEmbedding(text) {
         try {
             if (this.provider === 'gemini') {
                 const result = await this.geminiEmbeddingModel.embedContent(text);
@@ -56,6 +78,22 @@ class AIService {
      * Generate embeddings for multiple texts
      */
     async generateEmbeddings(texts) {
+        const model = this.getEmbeddingModelName();
+        const embeddings = await embeddingCache.lookup(model, texts);
+        const missing = texts.filter((_, i) => !embeddings[i]);
+        if (missing.length === 0) return embeddings;
+
+        const generated = await this.requestEmbeddings(missing);
+        embeddingCache.store(model, missing, generated);
+
+        let next = 0;
+        return embeddings.map(embedding => embedding || generated[next++]);
+    }
+
+    /**
+     * Call the provider for a list of embeddings in batches (no caching)
+     */
+    async requestEmbeddings(texts) {
         try {
             const embeddings = [];
             const batchSize = 10;
@@ -66,7 +104,7 @@ class AIService {
                 if (this.provider === 'gemini') {
                     // Gemini doesn't support batch embedding in the same way, do one by one or parallel
                     // For simplicity and rate limits, let's do parallel with limit
-                    const batchPromises = batch.map(text => this.generateEmbedding(text));
+                    const batchPromises = batch.map(text => this.requestEmbedding(text));
                     const batchEmbeddings = await Promise.all(batchPromises);
                     embeddings.push(...batchEmbeddings);
                 } else {
@@ -99,39 +137,50 @@ class AIService {
     /**
      * Find most relevant context from knowledge base
      */
-    async findRelevantContext(query, knowledgeBase, topK = 3) {
+    async findRelevantContext(query, knowledgeBase, topK = 3, botId = null) {
         try {
             // Generate embedding for query
             const queryEmbedding = await this.generateEmbedding(query);
-            
-            // Calculate similarities
-            const similarities = [];
-            for (const doc of knowledgeBase) {
-                for (const chunk of doc.chunks) {
-                    if (chunk.embedding && chunk.embedding.length > 0) {
-                        const similarity = this.cosineSimilarity(
-                            queryEmbedding,
-                            chunk.embedding
-                        );
-                        similarities.push({
-                            text: chunk.text,
-                            similarity,
-                            source: doc.filename,
-                            metadata: chunk.metadata
-                        });
-                    }
-                }
-            }
-            
-            // Sort by similarity and return top K
-            similarities.sort((a, b) => b.similarity - a.similarity);
-            return similarities.slice(0, topK);
+
+            // Prefer the vectorised sidecar when it has a current index for this bot
+            const indexed = await retrievalService.search(botId, knowledgeBase, queryEmbedding, topK);
+            if (indexed) return indexed;
+
+            return this.rankChunks(queryEmbedding, knowledgeBase, topK);
         } catch (error) {
             console.error('Context finding error:', error);
             return [];
         }
     }
 
+    /**
+     * Score every chunk against the query embedding and return the top K
+     */
+    rankChunks(queryEmbedding, knowledgeBase, topK = 3) {
+        // Calculate similarities
+        const similarities = [];
+        for (const doc of knowledgeBase) {
+            for (const chunk of doc.chunks) {
+                if (chunk.embedding && chunk.embedding.length > 0) {
+                    const similarity = this.cosineSimilarity(
+                        queryEmbedding,
+                        chunk.embedding
+                    );
+                    similarities.push({
+                        text: chunk.text,
+                        similarity,
+                        source: doc.filename,
+                        metadata: chunk.metadata
+                    });
+                }
+            }
+        }
+        
+        // Sort by similarity and return top K
+        similarities.sort((a, b) => b.similarity - a.similarity);
+        return similarities.slice(0, topK);
+    }
+
     /**
      * Generate chat completion with context
      */
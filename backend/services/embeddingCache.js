@@ -0,0 +1,43 @@
+const { postJson } = require('../utils/sidecar');
+
+/**
+ * Client for the local embedding cache (tools/embedding_cache.py).
+ * Disabled unless EMBEDDING_CACHE_URL is set; errors are treated as misses.
+ */
+class EmbeddingCache {
+    constructor() {
+        this.baseUrl = (process.env.EMBEDDING_CACHE_URL || '').replace(/\/+$/, '');
+        this.timeoutMs = parseInt(process.env.EMBEDDING_CACHE_TIMEOUT_MS) || 250;
+    }
+
+    isEnabled() {
+        return Boolean(this.baseUrl);
+    }
+
+    /**
+     * Look up cached embeddings; returns one vector or null per text
+     */
+    async lookup(model, texts) {
+        if (!this.isEnabled() || texts.length === 0) {
+            return texts.map(() => null);
+        }
+        try {
+            const data = await postJson(this.baseUrl, '/lookup', { model, texts }, this.timeoutMs);
+            return Array.isArray(data.embeddings) ? data.embeddings : texts.map(() => null);
+        } catch (error) {
+            console.warn('Embedding cache lookup failed:', error.message);
+            return texts.map(() => null);
+        }
+    }
+
+    /**
+     * Store freshly generated embeddings (fire-and-forget)
+     */
+    store(model, texts, embeddings) {
+        if (!this.isEnabled() || texts.length === 0) return;
+        postJson(this.baseUrl, '/store', { model, texts, embeddings }, this.timeoutMs * 4)
+            .catch(error => console.warn('Embedding cache store failed:', error.message));
+    }
+}
+
+module.exports = new EmbeddingCache();
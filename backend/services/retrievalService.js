@@ -0,0 +1,105 @@
+const crypto = require('crypto');
+const { requestJson, postJson } = require('../utils/sidecar');
+
+/**
+ * Client for the vectorised retrieval sidecar (tools/retrieval_engine.py).
+ * Disabled unless RETRIEVAL_URL is set. A missing or stale index triggers a
+ * background re-sync and returns null so the caller falls back to the
+ * in-process cosine loop for that request.
+ */
+class RetrievalService {
+    constructor() {
+        this.baseUrl = (process.env.RETRIEVAL_URL || '').replace(/\/+$/, '');
+        this.timeoutMs = parseInt(process.env.RETRIEVAL_TIMEOUT_MS) || 500;
+        this.syncing = new Map();
+    }
+
+    isEnabled() {
+        return Boolean(this.baseUrl);
+    }
+
+    /**
+     * Fingerprint of a knowledge base (matches knowledge_base_revision in Python).
+     * Covers each document's id, chunk count and embedding dimension plus the
+     * first and last component of every embedding, so re-embedding changes it
+     * without hashing whole vectors on every query.
+     */
+    revisionOf(knowledgeBase = []) {
+        const hash = crypto.createHash('sha1');
+        for (const doc of knowledgeBase) {
+            const chunks = doc.chunks || [];
+            const dim = chunks.length ? (chunks[0].embedding || []).length : 0;
+            hash.update(`${doc.id || ''}:${chunks.length}:${dim}|`);
+            const sample = new Float64Array(chunks.length * 2);
+            chunks.forEach((chunk, i) => {
+                const embedding = chunk.embedding || [];
+                if (embedding.length) {
+                    sample[2 * i] = embedding[0];
+                    sample[2 * i + 1] = embedding[embedding.length - 1];
+                }
+            });
+            hash.update(Buffer.from(sample.buffer));
+        }
+        return hash.digest('hex');
+    }
+
+    /**
+     * Top-K chunks for a query embedding, or null if the sidecar can't answer
+     */
+    async search(botId, knowledgeBase, queryEmbedding, topK = 3) {
+        if (!this.isEnabled() || !botId) return null;
+
+        const revision = this.revisionOf(knowledgeBase);
+        try {
+            const data = await postJson(this.baseUrl, `/bots/${encodeURIComponent(botId)}/search`, {
+                revision,
+                embedding: queryEmbedding,
+                topK
+            }, this.timeoutMs);
+            return data.results;
+        } catch (error) {
+            if (error.status === 404 || error.status === 409) {
+                this.sync(botId, knowledgeBase);
+            } else {
+                console.warn('Retrieval sidecar search failed:', error.message);
+            }
+            return null;
+        }
+    }
+
+    /**
+     * Push a bot's chunks to the sidecar (one sync per bot at a time)
+     */
+    sync(botId, knowledgeBase) {
+        if (!this.isEnabled() || !botId || this.syncing.has(botId)) return;
+
+        const body = {
+            revision: this.revisionOf(knowledgeBase),
+            knowledgeBase: knowledgeBase.map(doc => ({
+                id: doc.id,
+                filename: doc.filename,
+                chunks: (doc.chunks || []).map(chunk => ({
+                    text: chunk.text,
+                    embedding: Array.from(chunk.embedding || []),
+                    metadata: chunk.metadata
+                }))
+            }))
+        };
+
+        const pending = requestJson(this.baseUrl, 'PUT', `/bots/${encodeURIComponent(botId)}`, body, 60000)
+            .catch(error => console.warn(`Retrieval sidecar sync failed for ${botId}:`, error.message))
+            .finally(() => this.syncing.delete(botId));
+        this.syncing.set(botId, pending);
+    }
+
+    /**
+     * Remove a deleted bot's index (fire-and-forget)
+     */
+    drop(botId) {
+        if (!this.isEnabled() || !botId) return;
+        requestJson(this.baseUrl, 'DELETE', `/bots/${encodeURIComponent(botId)}`, undefined, this.timeoutMs)
+            .catch(error => console.warn(`Retrieval sidecar drop failed for ${botId}:`, error.message));
+    }
+}
+
+module.exports = new RetrievalService();
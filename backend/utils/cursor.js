@@ -0,0 +1,65 @@
+/**
+ * Keyset pagination over (createdAt, _id), newest first.
+ *
+ * A cursor is the sort key of the last document of a page, base64url
+ * encoded. The next page starts strictly after it, so paging costs the same
+ * on page 1 and page 10,000 and rows inserted meanwhile never shift or
+ * repeat what has already been returned.
+ */
+const mongoose = require('mongoose');
+
+const CURSOR_SORT = { createdAt: -1, _id: -1 };
+
+const encodeCursor = (doc) => Buffer.from(JSON.stringify({
+    t: new Date(doc.createdAt).getTime(),
+    id: String(doc._id)
+})).toString('base64url');
+
+// Returns null for anything that isn't a cursor we issued
+const decodeCursor = (value) => {
+    try {
+        const { t, id } = JSON.parse(Buffer.from(String(value), 'base64url').toString('utf8'));
+        if (!Number.isFinite(t) || !mongoose.Types.ObjectId.isValid(id)) return null;
+        return { createdAt: new Date(t), _id: new mongoose.Types.ObjectId(id) };
+    } catch (error) {
+        return null;
+    }
+};
+
+// Filter for documents that sort after the cursor
+const afterCursor = (cursor) => ({
+    $or: [
+        { createdAt: { $lt: cursor.createdAt } },
+        { createdAt: cursor.createdAt, _id: { $lt: cursor._id } }
+    ]
+});
+
+/**
+ * Fetch one page of `model` matching `query`. An empty cursor starts at the
+ * newest document. Resolves { items, nextCursor }; nextCursor is null on the
+ * last page.
+ */
+const findPage = async (model, query, cursorValue, limit) => {
+    let filter = query;
+    if (cursorValue) {
+        const cursor = decodeCursor(cursorValue);
+        if (!cursor) {
+            const error = new Error('Invalid cursor');
+            error.status = 400;
+            throw error;
+        }
+        filter = { $and: [query, afterCursor(cursor)] };
+    }
+
+    // One extra row tells us whether another page exists without a count
+    const items = await model.find(filter).sort(CURSOR_SORT).limit(limit + 1).lean();
+    const hasMore = items.length > limit;
+    if (hasMore) items.pop();
+
+    return {
+        items,
+        nextCursor: hasMore ? encodeCursor(items[items.length - 1]) : null
+    };
+};
+
+module.exports = { CURSOR_SORT, encodeCursor, decodeCursor, findPage };
@@ -0,0 +1,25 @@
+/**
+ * Minimal JSON client for the optional Python sidecars in tools/
+ * (embedding cache, retrieval engine). Callers treat any failure as
+ * "sidecar unavailable" and fall back to the in-process path.
+ */
+const requestJson = async (baseUrl, method, path, body, timeoutMs = 500) => {
+    const response = await fetch(`${baseUrl}${path}`, {
+        method,
+        headers: { 'Content-Type': 'application/json' },
+        body: body === undefined ? undefined : JSON.stringify(body),
+        signal: AbortSignal.timeout(timeoutMs)
+    });
+
+    const data = await response.json().catch(() => ({}));
+    if (!response.ok) {
+        const error = new Error(data.error || `Sidecar responded with ${response.status}`);
+        error.status = response.status;
+        throw error;
+    }
+    return data;
+};
+
+const postJson = (baseUrl, path, body, timeoutMs) => requestJson(baseUrl, 'POST', path, body, timeoutMs);
+
+module.exports = { requestJson, postJson };
@@ -0,0 +1,35 @@
+const fs = require('fs');
+const path = require('path');
+const mongoose = require('mongoose');
+const { dbAdapter } = require('../db/dbAdapter');
+
+// Written by tools/stats_rollup.py
+const ROLLUP_FILE = path.join(__dirname, '../data/stats_rollup.json');
+const ROLLUP_COLLECTION = 'statsrollups';
+const MAX_AGE_MS = parseInt(process.env.STATS_ROLLUP_MAX_AGE_MS) || 60 * 60 * 1000;
+
+/**
+ * Load the precomputed platform stats, or null if missing or stale
+ */
+const getStatsRollup = async () => {
+    try {
+        let rollup;
+        if (dbAdapter.isUsingNeDB()) {
+            rollup = JSON.parse(await fs.promises.readFile(ROLLUP_FILE, 'utf8'));
+        } else {
+            // Only what /api/admin/stats serves, not the per-store checkpoints
+            rollup = await mongoose.connection.collection(ROLLUP_COLLECTION).findOne(
+                { _id: 'platform' },
+                { projection: { totals: 1, daily: 1, generatedAt: 1 } }
+            );
+        }
+
+        if (!rollup || !rollup.generatedAt) return null;
+        if (Date.now() - new Date(rollup.generatedAt).getTime() > MAX_AGE_MS) return null;
+        return rollup;
+    } catch (error) {
+        return null;
+    }
+};
+
+module.exports = getStatsRollup;
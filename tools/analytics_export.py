@@ -0,0 +1,316 @@
+"""
+Conversation analytics export.
+
+Streams conversations and leads from MongoDB or the NeDB datafiles into
+Parquet datasets partitioned by bot and day, then computes the dashboard
+aggregates (messages per day, response latency, lead conversion per bot)
+with vectorised Arrow operations. The backend serves the resulting
+summary.json, so dashboard loads never scan the live database.
+
+Usage:
+    python analytics_export.py export [--source auto|mongodb|nedb] [--out DIR]
+    python analytics_export.py summarize [--out DIR]
+"""
+import argparse
+import json
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from datastore import iter_documents, resolve_source
+
+# ------------------------------
+# Configuration
+# ------------------------------
+ANALYTICS_DIR = Path(__file__).resolve().parent / "exports" / "analytics"
+SUMMARY_FILE = "summary.json"
+BATCH_ROWS = 100_000  # rows buffered before a batch is written
+MAX_PARTITIONS = 1_000_000  # bot x day partitions a single batch may touch
+
+MESSAGE_SCHEMA = pa.schema([
+    ("bot_id", pa.string()),
+    ("day", pa.string()),
+    ("session_id", pa.string()),
+    ("origin", pa.string()),  # "conversation" or "lead"
+    ("role", pa.string()),  # "user" or "bot"
+    ("ts", pa.timestamp("ms", tz="UTC")),
+    ("content_chars", pa.int32()),
+    ("latency_ms", pa.float64()),  # bot replies only: time since the user message
+])
+
+LEAD_SCHEMA = pa.schema([
+    ("bot_id", pa.string()),
+    ("day", pa.string()),
+    ("lead_id", pa.string()),
+    ("session_id", pa.string()),
+    ("status", pa.string()),
+    ("quality_score", pa.int8()),
+    ("captured", pa.bool_()),  # a notification was sent for this lead
+    ("created_at", pa.timestamp("ms", tz="UTC")),
+    ("message_count", pa.int32()),
+])
+
+
+# ------------------------------
+# Row extraction
+# ------------------------------
+
+def _as_utc(value: Any, fallback: Optional[datetime] = None) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    if isinstance(value, str):
+        try:
+            return _as_utc(datetime.fromisoformat(value.replace("Z", "+00:00")), fallback)
+        except ValueError:
+            pass
+    return fallback
+
+
+def message_rows(doc: Dict[str, Any], origin: str) -> Iterator[Dict[str, Any]]:
+    """
+    One row per message. Conversations use type user/bot and leads use role
+    user/assistant; both are mapped onto role user/bot.
+    """
+    bot_id = str(doc.get("botId", ""))
+    session_id = str(doc.get("sessionId", ""))
+    created = _as_utc(doc.get("createdAt"), datetime.now(timezone.utc))
+    last_user_ts: Optional[datetime] = None
+
+    for msg in doc.get("messages") or []:
+        role = "user" if (msg.get("type") or msg.get("role")) == "user" else "bot"
+        ts = _as_utc(msg.get("timestamp"), created)
+        latency = None
+        if role == "user":
+            last_user_ts = ts
+        elif last_user_ts is not None:
+            latency = max(0.0, (ts - last_user_ts).total_seconds() * 1000)
+            last_user_ts = None
+        yield {
+            "bot_id": bot_id,
+            "day": ts.strftime("%Y-%m-%d"),
+            "session_id": session_id,
+            "origin": origin,
+            "role": role,
+            "ts": ts,
+            "content_chars": len(msg.get("content") or ""),
+            "latency_ms": latency,
+        }
+
+
+def lead_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    created = _as_utc(doc.get("createdAt"), datetime.now(timezone.utc))
+    sent = (doc.get("notificationsSent") or {}).get("sentAt")
+    return {
+        "bot_id": str(doc.get("botId", "")),
+        "day": created.strftime("%Y-%m-%d"),
+        "lead_id": str(doc.get("leadId") or doc.get("_id")),
+        "session_id": str(doc.get("sessionId", "")),
+        "status": doc.get("status") or "new",
+        "quality_score": int(doc.get("qualityScore") or 3),
+        "captured": sent is not None,
+        "created_at": created,
+        "message_count": len(doc.get("messages") or []),
+    }
+
+
+# ------------------------------
+# Export
+# ------------------------------
+
+class _PartitionedWriter:
+    """Buffers rows and flushes them as hive-partitioned Parquet batches."""
+
+    def __init__(self, base_dir: Path, schema: pa.Schema):
+        self.base_dir = base_dir
+        self.schema = schema
+        self.rows: List[Dict[str, Any]] = []
+        self.batches = 0
+        self.total = 0
+
+    def add(self, row: Dict[str, Any]):
+        self.rows.append(row)
+        if len(self.rows) >= BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        table = pa.Table.from_pylist(self.rows, schema=self.schema)
+        ds.write_dataset(
+            table, self.base_dir, format="parquet",
+            partitioning=ds.partitioning(pa.schema([("bot_id", pa.string()), ("day", pa.string())]), flavor="hive"),
+            basename_template=f"part-{self.batches:05d}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            max_partitions=MAX_PARTITIONS,
+        )
+        self.total += len(self.rows)
+        self.batches += 1
+        self.rows = []
+
+
+def export(out_dir: Path = ANALYTICS_DIR, source: str = "auto", log=print) -> Dict[str, Any]:
+    """Full re-export into a staging directory, swapped in when complete."""
+    source = resolve_source(source)
+    started = time.perf_counter()
+    staging = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    messages = _PartitionedWriter(staging / "messages", MESSAGE_SCHEMA)
+    leads = _PartitionedWriter(staging / "leads", LEAD_SCHEMA)
+
+    for doc in iter_documents("conversations", source):
+        for row in message_rows(doc, "conversation"):
+            messages.add(row)
+    log(f"Conversations exported ({messages.total + len(messages.rows)} messages so far)")
+
+    for doc in iter_documents("leads", source):
+        leads.add(lead_row(doc))
+        for row in message_rows(doc, "lead"):
+            messages.add(row)
+    messages.flush()
+    leads.flush()
+    log(f"Leads exported ({leads.total} leads, {messages.total} messages)")
+
+    if out_dir.exists():
+        retired = out_dir.with_name(out_dir.name + ".old")
+        shutil.rmtree(retired, ignore_errors=True)
+        out_dir.rename(retired)
+        staging.rename(out_dir)
+        shutil.rmtree(retired, ignore_errors=True)
+    else:
+        staging.rename(out_dir)
+
+    summary = summarize(out_dir)
+    summary["export"] = {
+        "source": source,
+        "messages": messages.total,
+        "leads": leads.total,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    _write_summary(out_dir, summary)
+    return summary
+
+
+# ------------------------------
+# Aggregates
+# ------------------------------
+
+def _read(out_dir: Path, name: str, schema: pa.Schema, columns: List[str]) -> pa.Table:
+    path = out_dir / name
+    if not path.exists():
+        return schema.empty_table().select(columns)
+    dataset = ds.dataset(path, format="parquet", schema=schema, partitioning="hive")
+    return dataset.to_table(columns=columns)
+
+
+def summarize(out_dir: Path = ANALYTICS_DIR) -> Dict[str, Any]:
+    """Compute dashboard aggregates from the exported datasets."""
+    messages = _read(out_dir, "messages", MESSAGE_SCHEMA, ["bot_id", "day", "session_id", "role", "latency_ms"])
+    leads = _read(out_dir, "leads", LEAD_SCHEMA, ["bot_id", "status", "captured"])
+
+    is_user = pc.equal(messages["role"], "user")
+    messages = messages.append_column("is_user", pc.cast(is_user, pa.int64()))
+    per_day = messages.group_by(["bot_id", "day"]).aggregate([
+        ("role", "count"),
+        ("is_user", "sum"),
+    ]).sort_by([("bot_id", "ascending"), ("day", "ascending")])
+
+    replies = messages.filter(pc.is_valid(messages["latency_ms"]))
+    latency = replies.group_by("bot_id").aggregate([
+        ("latency_ms", "mean"),
+        ("latency_ms", "tdigest", pc.TDigestOptions(q=[0.5, 0.95])),
+    ])
+    sessions = messages.group_by("bot_id").aggregate([("session_id", "count_distinct")])
+
+    leads = leads.append_column("is_captured", pc.cast(leads["captured"], pa.int64()))
+    leads = leads.append_column("is_converted", pc.cast(pc.equal(leads["status"], "converted"), pa.int64()))
+    lead_stats = leads.group_by("bot_id").aggregate([
+        ("bot_id", "count"),
+        ("is_captured", "sum"),
+        ("is_converted", "sum"),
+    ])
+
+    bots: Dict[str, Dict[str, Any]] = {}
+
+    def bot(bot_id: str) -> Dict[str, Any]:
+        return bots.setdefault(bot_id, {
+            "botId": bot_id, "messages": 0, "sessions": 0, "leads": 0, "capturedLeads": 0,
+            "convertedLeads": 0, "latencyMs": {"mean": None, "p50": None, "p95": None}, "days": [],
+        })
+
+    for row in per_day.to_pylist():
+        entry = bot(row["bot_id"])
+        entry["messages"] += row["role_count"]
+        entry["days"].append({
+            "day": row["day"],
+            "messages": row["role_count"],
+            "userMessages": row["is_user_sum"],
+        })
+    for row in sessions.to_pylist():
+        bot(row["bot_id"])["sessions"] = row["session_id_count_distinct"]
+    for row in latency.to_pylist():
+        digest = row["latency_ms_tdigest"] or [None, None]
+        bot(row["bot_id"])["latencyMs"] = {
+            "mean": row["latency_ms_mean"], "p50": digest[0], "p95": digest[1],
+        }
+    for row in lead_stats.to_pylist():
+        entry = bot(row["bot_id"])
+        entry["leads"] = row["bot_id_count"]
+        entry["capturedLeads"] = row["is_captured_sum"]
+        entry["convertedLeads"] = row["is_converted_sum"]
+
+    for entry in bots.values():
+        entry["leadConversionRate"] = round(entry["capturedLeads"] / entry["sessions"], 4) if entry["sessions"] else 0.0
+
+    return {
+        "generatedAt": datetime.now(timezone.utc).isoformat(),
+        "totals": {
+            "messages": messages.num_rows,
+            "leads": leads.num_rows,
+            "bots": len(bots),
+        },
+        "bots": bots,
+    }
+
+
+def _write_summary(out_dir: Path, summary: Dict[str, Any]):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp = out_dir / (SUMMARY_FILE + ".tmp")
+    tmp.write_text(json.dumps(summary, default=str), encoding="utf-8")
+    tmp.replace(out_dir / SUMMARY_FILE)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export conversation analytics to Parquet")
+    parser.add_argument("--out", type=Path, default=ANALYTICS_DIR, help="Output directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="Re-export conversations and leads, then summarize")
+    p_export.add_argument("--source", choices=["auto", "mongodb", "nedb"], default="auto")
+
+    sub.add_parser("summarize", help="Recompute summary.json from existing Parquet files")
+
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    if args.command == "export":
+        summary = export(args.out, args.source)
+    else:
+        summary = summarize(args.out)
+        _write_summary(args.out, summary)
+    print(json.dumps(summary["totals"]))
+    print(f"Wrote {args.out / SUMMARY_FILE} in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
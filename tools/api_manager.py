@@ -1,183 +1,21 @@
 
-import os
-import csv
-import datetime
-from pathlib import Path
 from typing import List, Dict, Any
 
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-
-from dotenv import dotenv_values
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-
-# ------------------------------
-# Project-aware paths
-# ------------------------------
-BASE_DIR = Path(__file__).resolve().parents[1]
-ENV_PATH = BASE_DIR / "backend" / ".env"
-EXPORTS_DIR = Path(__file__).resolve().parent / "exports"
-EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
-
-# ------------------------------
-# Configuration of variables
-# ------------------------------
-CONFIG: List[Dict[str, Any]] = [
-    # Core (Required)
-    {"category": "Core", "service": "Server", "var": "PORT", "required": False, "desc": "Backend port (default 5000)"},
-    {"category": "Core", "service": "MongoDB", "var": "MONGODB_URI", "required": True, "desc": "Database connection string"},
-    {"category": "Core", "service": "JWT", "var": "JWT_SECRET", "required": True, "desc": "Auth token signing secret"},
-    {"category": "Core", "service": "Environment", "var": "NODE_ENV", "required": False, "desc": "development / production"},
-    {"category": "Core", "service": "Frontend", "var": "FRONTEND_URL", "required": False, "desc": "URL for CORS (e.g. https://myapp.com)"},
-
-    # AI (Required)
-    {"category": "AI", "service": "OpenAI", "var": "OPENAI_API_KEY", "required": True, "desc": "OpenAI API Key"},
-    {"category": "AI", "service": "OpenAI", "var": "OPENAI_MODEL", "required": False, "desc": "Model (e.g. gpt-4o-mini)"},
-    {"category": "AI", "service": "OpenAI", "var": "OPENAI_EMBEDDING_MODEL", "required": False, "desc": "Embedding model"},
-
-    # Billing (Optional)
-    {"category": "Billing", "service": "Stripe", "var": "STRIPE_SECRET_KEY", "required": False, "desc": "Stripe Secret Key"},
-    {"category": "Billing", "service": "Stripe", "var": "STRIPE_WEBHOOK_SECRET", "required": False, "desc": "Stripe Webhook Secret"},
-
-    # Email (Optional)
-    {"category": "Email", "service": "SMTP", "var": "EMAIL_SERVICE", "required": False, "desc": "Service (e.g. gmail)"},
-    {"category": "Email", "service": "SMTP", "var": "EMAIL_USER", "required": False, "desc": "Email username"},
-    {"category": "Email", "service": "SMTP", "var": "EMAIL_PASSWORD", "required": False, "desc": "Email password"},
-    {"category": "Email", "service": "SMTP", "var": "EMAIL_FROM", "required": False, "desc": "Sender address"},
-
-    # WhatsApp (Optional)
-    {"category": "WhatsApp", "service": "Twilio", "var": "TWILIO_ACCOUNT_SID", "required": False, "desc": "Twilio Account SID"},
-    {"category": "WhatsApp", "service": "Twilio", "var": "TWILIO_AUTH_TOKEN", "required": False, "desc": "Twilio Auth Token"},
-    {"category": "WhatsApp", "service": "Twilio", "var": "WHATSAPP_PHONE_NUMBER", "required": False, "desc": "Sender number"},
-]
-
-CATEGORIES = ["All"] + sorted(list({item["category"] for item in CONFIG}))
-
-# ------------------------------
-# Helpers
-# ------------------------------
-
-def get_merged_config(env_values: Dict[str, str]) -> List[Dict[str, Any]]:
-    """
-    Merges the hardcoded CONFIG with any extra keys found in the .env file.
-    """
-    known_vars = {item["var"] for item in CONFIG}
-    merged = list(CONFIG)
-
-    # Add any keys found in .env that aren't in CONFIG
-    for key in env_values:
-        if key not in known_vars:
-            merged.append({
-                "category": "Custom",
-                "service": "Detected",
-                "var": key,
-                "required": False,
-                "desc": "Auto-detected from .env"
-            })
-    
-    return merged
-
-def load_env() -> Dict[str, str]:
-    if ENV_PATH.exists():
-        return {k: str(v) for k, v in dotenv_values(ENV_PATH).items() if k}
-    return {}
-
-
-def mask_value(val: str) -> str:
-    if not val:
-        return ""
-    v = str(val)
-    if len(v) <= 8:
-        return "*" * len(v)
-    return f"{v[:4]}***{v[-4:]}"
-
-
-def write_env(updates: Dict[str, str]):
-    ENV_PATH.parent.mkdir(parents=True, exist_ok=True)
-    existing_lines: List[str] = []
-    existing_map: Dict[str, int] = {}
-
-    if ENV_PATH.exists():
-        content = ENV_PATH.read_text(encoding="utf-8")
-        existing_lines = content.splitlines()
-        for idx, line in enumerate(existing_lines):
-            if not line or line.strip().startswith("#"):
-                continue
-            if "=" in line:
-                key = line.split("=", 1)[0].strip()
-                existing_map[key] = idx
-
-    # Apply updates
-    for key, value in updates.items():
-        if value is None:
-            continue
-        line_val = value
-        # Always quote for safety
-        if not (line_val.startswith('"') and line_val.endswith('"')):
-            line_val = f'"{line_val}"'
-        new_line = f"{key}={line_val}"
-        if key in existing_map:
-            existing_lines[existing_map[key]] = new_line
-        else:
-            existing_lines.append(new_line)
-
-    # Ensure file ends with newline
-    final_text = "\n".join(existing_lines) + "\n"
-    ENV_PATH.write_text(final_text, encoding="utf-8")
-
-
-def export_csv(rows: List[Dict[str, Any]], out_path: Path):
-    with out_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Category", "Service", "Var", "Required", "Present", "Value (masked)"])
-        for r in rows:
-            writer.writerow([
-                r["category"], r["service"], r["var"],
-                "Yes" if r["required"] else "No",
-                "Yes" if r.get("present") else "No",
-                r.get("masked", "")
-            ])
-
-
-def export_pdf(rows: List[Dict[str, Any]], out_path: Path):
-    doc = SimpleDocTemplate(str(out_path), pagesize=A4, title="API Keys Status")
-    styles = getSampleStyleSheet()
-    story = []
-    story.append(Paragraph("API Keys Status - Chatbot Builder", styles["Title"]))
-    story.append(Spacer(1, 12))
-
-    data = [["Category", "Service", "Var", "Required", "Present", "Value (masked)"]]
-    for r in rows:
-        data.append([
-            r["category"], r["service"], r["var"],
-            "Yes" if r["required"] else "No",
-            "Yes" if r.get("present") else "No",
-            r.get("masked", "")
-        ])
-
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 9),
-        ('BOTTOMPADDING', (0,0), (-1,0), 6),
-        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
-    ]))
-    story.append(table)
-
-    story.append(Spacer(1, 12))
-    story.append(Paragraph(
-        "Note: Values are masked for safety. Use the GUI to view/edit actual values.",
-        styles["Normal"]
-    ))
-
-    doc.build(story)
-
+from tkinter import ttk, messagebox
+
+from manager_core import (
+    CATEGORIES,
+    CONFIG,
+    ENV_PATH,
+    collect_rows,
+    export_csv,
+    export_path,
+    export_pdf,
+    get_merged_config,
+    load_env,
+    write_env,
+)
 
 # ------------------------------
 # GUI
@@ -311,35 +149,18 @@ class ApiManagerApp(tk.Tk):
         except Exception as e:
             messagebox.showerror("Error", f"Failed to write .env: {e}")
 
-    def collect_rows(self) -> List[Dict[str, Any]]:
-        rows = []
-        env_now = load_env()
-        # Use merged config to include custom keys in export
-        full_config = get_merged_config(env_now)
-        
-        for item in full_config:
-            raw = env_now.get(item["var"], "")
-            rows.append({
-                **item,
-                "present": bool(raw),
-                "masked": mask_value(raw)
-            })
-        return rows
-
     def do_export_csv(self):
-        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        out_path = EXPORTS_DIR / f"apis_{ts}.csv"
         try:
-            export_csv(self.collect_rows(), out_path)
+            out_path = export_path("csv")
+            export_csv(collect_rows(), out_path)
             messagebox.showinfo("Exported", f"CSV exported to:\n{out_path}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export CSV: {e}")
 
     def do_export_pdf(self):
-        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        out_path = EXPORTS_DIR / f"apis_{ts}.pdf"
         try:
-            export_pdf(self.collect_rows(), out_path)
+            out_path = export_path("pdf")
+            export_pdf(collect_rows(), out_path)
             messagebox.showinfo("Exported", f"PDF exported to:\n{out_path}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export PDF: {e}")
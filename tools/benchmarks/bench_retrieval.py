@@ -0,0 +1,171 @@
+"""
+Benchmark: per-chunk cosine loop (aiService.findRelevantContext) versus the
+NumPy retrieval engine, for knowledge bases of 1k to 1M chunks.
+
+Usage:
+    python tools/benchmarks/bench_retrieval.py [--sizes 1000,10000,100000,1000000] [--dim 1536]
+
+The loop baseline runs the backend's JavaScript in node when available
+(falling back to an equivalent Python loop) and is only measured up to
+--loop-max chunks; larger sizes are extrapolated linearly and marked "~".
+Vectors are uniform random, which is the worst case for IVF recall; real
+embeddings cluster and recall is considerably higher at the same nprobe.
+"""
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from retrieval_engine import ANN_THRESHOLD, BotIndex, normalize_rows, train_ivf  # noqa: E402
+
+# Same arithmetic as cosineSimilarity() + findRelevantContext() in aiService.js
+NODE_LOOP = r"""
+const [n, dim, queries, topK] = process.argv.slice(1).map(Number);
+const rand = () => Math.random() * 2 - 1;
+const cosineSimilarity = (vecA, vecB) => {
+    if (!vecA || !vecB || vecA.length !== vecB.length) return 0;
+    const dotProduct = vecA.reduce((sum, a, i) => sum + a * vecB[i], 0);
+    const magnitudeA = Math.sqrt(vecA.reduce((sum, a) => sum + a * a, 0));
+    const magnitudeB = Math.sqrt(vecB.reduce((sum, b) => sum + b * b, 0));
+    return dotProduct / (magnitudeA * magnitudeB);
+};
+const chunks = Array.from({ length: n }, (_, i) => ({ text: 'chunk ' + i, embedding: Array.from({ length: dim }, rand) }));
+const timings = [];
+for (let q = 0; q < queries; q++) {
+    const query = Array.from({ length: dim }, rand);
+    const start = process.hrtime.bigint();
+    const similarities = [];
+    for (const chunk of chunks) {
+        similarities.push({ text: chunk.text, similarity: cosineSimilarity(query, chunk.embedding) });
+    }
+    similarities.sort((a, b) => b.similarity - a.similarity);
+    similarities.slice(0, topK);
+    timings.push(Number(process.hrtime.bigint() - start) / 1e6);
+}
+timings.sort((a, b) => a - b);
+console.log(JSON.stringify({ medianMs: timings[Math.floor(timings.length / 2)] }));
+"""
+
+
+def node_loop_ms(n: int, dim: int, queries: int, k: int) -> Optional[float]:
+    if not shutil.which("node"):
+        return None
+    result = subprocess.run(["node", "--max-old-space-size=8192", "-e", NODE_LOOP, str(n), str(dim), str(queries), str(k)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout)["medianMs"]
+
+
+def python_loop_ms(n: int, dim: int, queries: int, k: int, rng: np.random.Generator) -> float:
+    chunks = rng.standard_normal((n, dim)).tolist()
+    timings = []
+    for _ in range(queries):
+        query = rng.standard_normal(dim).tolist()
+        start = time.perf_counter()
+        mag_q = sum(a * a for a in query) ** 0.5
+        sims = []
+        for i, vec in enumerate(chunks):
+            dot = sum(a * b for a, b in zip(query, vec))
+            sims.append((dot / (mag_q * sum(b * b for b in vec) ** 0.5), i))
+        sims.sort(reverse=True)
+        sims[:k]
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def synthetic_index(path: Path, n: int, dim: int, rng: np.random.Generator, ann: bool) -> BotIndex:
+    """Write a BotIndex directly (avoids JSON-encoding millions of vectors)."""
+    path.mkdir(parents=True, exist_ok=True)
+    block = 50_000
+    offsets = np.empty(n, dtype=np.int64)
+    with (path / "vectors.f32").open("wb") as vec_f, (path / "chunks.jsonl").open("wb") as chunk_f:
+        for start in range(0, n, block):
+            rows = min(block, n - start)
+            vec_f.write(normalize_rows(rng.standard_normal((rows, dim)).astype(np.float32)).tobytes())
+            for i in range(start, start + rows):
+                offsets[i] = chunk_f.tell()
+                chunk_f.write(b'{"text": "chunk %d"}\n' % i)
+    np.save(path / "offsets.npy", offsets)
+    (path / "header.json").write_text(json.dumps({"dim": dim, "count": n, "revision": "bench"}))
+    if ann:
+        vectors = np.memmap(path / "vectors.f32", dtype=np.float32, mode="r", shape=(n, dim))
+        centroids, order, list_offsets = train_ivf(vectors, max(1, int(np.sqrt(n))))
+        np.savez(path / "ivf.npz", centroids=centroids, order=order, offsets=list_offsets)
+        del vectors
+    return BotIndex(path)
+
+
+def time_search(index: BotIndex, queries: List[np.ndarray], k: int, exact: bool):
+    timings, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(index.search(q, k, exact=exact))
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--loop-max", type=int, default=20000, help="Largest size the loop baseline is run at")
+    parser.add_argument("--ann-min", type=int, default=ANN_THRESHOLD, help="Smallest size an IVF index is built for")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(7)
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    use_node = shutil.which("node") is not None
+    print(f"dim={args.dim} k={args.k} queries={args.queries} loop={'node' if use_node else 'python'}")
+    print(f"{'chunks':>9} | {'loop ms':>10} | {'numpy ms':>9} | {'speedup':>8} | {'ann ms':>7} | {'recall':>6}")
+
+    loop_per_chunk = None
+    workdir = Path(tempfile.mkdtemp(prefix="bench_retrieval_"))
+    try:
+        for n in sizes:
+            if n <= args.loop_max:
+                loop_ms = node_loop_ms(n, args.dim, min(args.queries, 5), args.k) if use_node else None
+                if loop_ms is None:
+                    loop_ms = python_loop_ms(n, args.dim, min(args.queries, 3), args.k, rng)
+                loop_per_chunk = loop_ms / n
+                loop_label = f"{loop_ms:10.2f}"
+            elif loop_per_chunk is not None:
+                loop_ms = loop_per_chunk * n
+                loop_label = f"~{loop_ms:9.0f}"
+            else:
+                loop_ms, loop_label = None, f"{'-':>10}"
+
+            ann = n >= args.ann_min
+            index = synthetic_index(workdir / str(n), n, args.dim, rng, ann)
+            queries = [rng.standard_normal(args.dim).astype(np.float32) for _ in range(args.queries)]
+            numpy_ms, exact = time_search(index, queries, args.k, exact=True)
+
+            ann_label, recall_label = f"{'-':>7}", f"{'-':>6}"
+            if ann:
+                ann_ms, approx = time_search(index, queries, args.k, exact=False)
+                hits = sum(len({r["text"] for r in a} & {r["text"] for r in e}) for a, e in zip(approx, exact))
+                ann_label = f"{ann_ms:7.2f}"
+                recall_label = f"{hits / (args.k * len(queries)):6.2f}"
+
+            speedup = f"{loop_ms / numpy_ms:7.0f}x" if loop_ms else f"{'-':>8}"
+            print(f"{n:>9} | {loop_label} | {numpy_ms:9.2f} | {speedup} | {ann_label} | {recall_label}")
+            index.close()
+            shutil.rmtree(workdir / str(n), ignore_errors=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
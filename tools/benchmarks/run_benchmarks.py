@@ -0,0 +1,383 @@
+"""
+Benchmark and regression suite for the Python tooling hot paths.
+
+Times the .env helpers (load_env, write_env, get_merged_config) on files
+with thousands of keys, ApiManagerApp.render_form, log throughput through
+ProjectManagerApp.log, and export_csv/export_pdf on large row sets, then
+compares the medians with tools/benchmarks/baselines.json.
+
+Baselines are stored together with a fixed pure-Python calibration
+workload, and expected times are scaled by how fast that workload runs on
+the current machine, so one baseline file works across developer boxes.
+
+Usage:
+    python tools/benchmarks/run_benchmarks.py [--only NAME,...] [--repeat 5] [--threshold 0.25]
+    python tools/benchmarks/run_benchmarks.py --update-baseline
+    xvfb-run python tools/benchmarks/run_benchmarks.py --strict      (CI)
+
+Exits 1 when any benchmark is slower than its scaled baseline by more than
+the threshold (and by more than --min-delta-ms, to ignore timer noise).
+Tk benchmarks are skipped when no display is available. With --strict a
+benchmark that was skipped or has no baseline yet also fails the run, so
+CI can't pass without having compared everything.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# ------------------------------
+# Configuration
+# ------------------------------
+BASELINE_FILE = Path(__file__).resolve().parent / "baselines.json"
+ENV_KEYS = 5000
+ENV_UPDATES = 1000
+FORM_KEYS = 1000
+LOG_LINES = 5000
+CSV_ROWS = 50_000
+PDF_ROWS = 2000
+
+
+class Skip(Exception):
+    """Raised by a benchmark's setup when it can't run here."""
+
+
+def calibrate(repeat: int = 5) -> float:
+    """Median ms of a fixed interpreter-bound workload (dicts, strings, sorting)."""
+    def workload():
+        data = {f"KEY_{i}": f"value-{i * 7919 % 10007}" for i in range(20000)}
+        lines = sorted(f"{k}={v}" for k, v in data.items())
+        return sum(len(line.split("=", 1)[1]) for line in lines)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        workload()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+# ------------------------------
+# Fixtures
+# ------------------------------
+
+def _env_text(keys: int) -> str:
+    lines = ["# Generated by run_benchmarks.py"]
+    for i in range(keys):
+        if i % 50 == 0:
+            lines.append(f"# Section {i // 50}")
+        lines.append(f'BENCH_KEY_{i:05d}="value-{i}-{"x" * (i % 40)}"')
+    return "\n".join(lines) + "\n"
+
+
+def _config_rows(count: int) -> List[Dict[str, Any]]:
+    return [{
+        "category": ("Core", "AI", "Billing", "Email", "Custom")[i % 5],
+        "service": f"Service {i % 37}",
+        "var": f"BENCH_KEY_{i:05d}",
+        "required": i % 3 == 0,
+        "present": i % 4 != 0,
+        "masked": f"sk-{i:04d}***{i % 9999:04d}",
+    } for i in range(count)]
+
+
+@contextlib.contextmanager
+def _env_file(keys: int):
+    """Point manager_core.ENV_PATH at a temporary .env with `keys` entries."""
+    import manager_core
+
+    with tempfile.TemporaryDirectory(prefix="bench_env_") as tmp:
+        path = Path(tmp) / ".env"
+        path.write_text(_env_text(keys), encoding="utf-8")
+        original = manager_core.ENV_PATH
+        manager_core.ENV_PATH = path
+        try:
+            yield path
+        finally:
+            manager_core.ENV_PATH = original
+
+
+def _tk_root():
+    import tkinter as tk
+
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        raise Skip("no display")
+    root.withdraw()
+    return root
+
+
+# ------------------------------
+# Benchmarks
+# ------------------------------
+# Each returns (setup -> state, run(state), teardown(state)) so only run() is timed.
+
+def bench_load_env():
+    def setup():
+        ctx = _env_file(ENV_KEYS)
+        ctx.__enter__()
+        return ctx
+
+    def run(_ctx):
+        import manager_core
+        assert len(manager_core.load_env()) == ENV_KEYS
+
+    return setup, run, lambda ctx: ctx.__exit__(None, None, None)
+
+
+def bench_write_env():
+    updates = {f"BENCH_KEY_{i:05d}": f"updated-{i}" for i in range(0, ENV_KEYS, ENV_KEYS // (ENV_UPDATES // 2))}
+    updates.update({f"NEW_KEY_{i:05d}": f"new-{i}" for i in range(ENV_UPDATES // 2)})
+
+    def setup():
+        ctx = _env_file(ENV_KEYS)
+        ctx.__enter__()
+        return ctx
+
+    def run(_ctx):
+        import manager_core
+        manager_core.write_env(updates)
+
+    return setup, run, lambda ctx: ctx.__exit__(None, None, None)
+
+
+def bench_get_merged_config():
+    env = {f"BENCH_KEY_{i:05d}": str(i) for i in range(ENV_KEYS)}
+
+    def run(_state):
+        import manager_core
+        assert len(manager_core.get_merged_config(env)) >= ENV_KEYS
+
+    return (lambda: None), run, (lambda state: None)
+
+
+def bench_render_form():
+    def setup():
+        import api_manager
+
+        root = _tk_root()
+        root.destroy()
+        ctx = _env_file(FORM_KEYS)
+        ctx.__enter__()
+        app = api_manager.ApiManagerApp()
+        app.withdraw()
+        return app, ctx
+
+    def run(state):
+        app, _ctx = state
+        app.render_form()
+        app.update_idletasks()
+
+    def teardown(state):
+        app, ctx = state
+        app.destroy()
+        ctx.__exit__(None, None, None)
+
+    return setup, run, teardown
+
+
+def bench_log_throughput():
+    def setup():
+        import tkinter as tk
+        from tkinter import scrolledtext
+
+        from project_manager import ProjectManagerApp
+
+        root = _tk_root()
+        # Only the log view is needed; skip __init__ (server checks, exporter)
+        app = ProjectManagerApp.__new__(ProjectManagerApp)
+        app.root = root
+        app.log_area = scrolledtext.ScrolledText(root)
+        app.log_area.pack(fill=tk.BOTH, expand=True)
+        return app
+
+    def run(app):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(LOG_LINES):
+                app.log(f"[access] GET /api/chatbot/:botId 200 {i % 97}.3ms req=0 res=1834 path=/api/chatbot/bot_{i}")
+        app.root.update_idletasks()
+        app.log_area.delete("1.0", "end")
+
+    return setup, run, lambda app: app.root.destroy()
+
+
+def bench_export_csv():
+    rows = _config_rows(CSV_ROWS)
+
+    def setup():
+        return tempfile.TemporaryDirectory(prefix="bench_csv_")
+
+    def run(tmp):
+        import manager_core
+        manager_core.export_csv(rows, Path(tmp.name) / "keys.csv")
+
+    return setup, run, lambda tmp: tmp.cleanup()
+
+
+def bench_export_pdf():
+    rows = _config_rows(PDF_ROWS)
+
+    def setup():
+        return tempfile.TemporaryDirectory(prefix="bench_pdf_")
+
+    def run(tmp):
+        import manager_core
+        manager_core.export_pdf(rows, Path(tmp.name) / "keys.pdf")
+
+    return setup, run, lambda tmp: tmp.cleanup()
+
+
+BENCHMARKS: Dict[str, Tuple[Callable, str]] = {
+    "load_env": (bench_load_env, f"{ENV_KEYS} keys"),
+    "write_env": (bench_write_env, f"{ENV_UPDATES} updates into {ENV_KEYS} keys"),
+    "get_merged_config": (bench_get_merged_config, f"{ENV_KEYS} keys"),
+    "render_form": (bench_render_form, f"{FORM_KEYS} keys"),
+    "log_throughput": (bench_log_throughput, f"{LOG_LINES} lines"),
+    "export_csv": (bench_export_csv, f"{CSV_ROWS} rows"),
+    "export_pdf": (bench_export_pdf, f"{PDF_ROWS} rows"),
+}
+
+
+# ------------------------------
+# Runner
+# ------------------------------
+
+def measure(factory: Callable, repeat: int, warmup: int = 1) -> List[float]:
+    setup, run, teardown = factory()
+    timings = []
+    for i in range(warmup + repeat):
+        state = setup()
+        try:
+            started = time.perf_counter()
+            run(state)
+            elapsed = (time.perf_counter() - started) * 1000
+        finally:
+            teardown(state)
+        if i >= warmup:
+            timings.append(elapsed)
+    return timings
+
+
+def load_baselines(path: Path = BASELINE_FILE) -> Dict[str, Any]:
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return {"calibrationMs": None, "benchmarks": {}}
+
+
+def run_suite(names: List[str], repeat: int, threshold: float, min_delta_ms: float,
+              baselines: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], float]:
+    calibration = calibrate()
+    base_calibration = baselines.get("calibrationMs")
+    scale = calibration / base_calibration if base_calibration else 1.0
+    results = []
+    for name in names:
+        factory, size = BENCHMARKS[name]
+        result = {"name": name, "size": size, "status": "ok", "medianMs": None, "expectedMs": None, "deltaPct": None}
+        try:
+            timings = measure(factory, repeat)
+        except Skip as e:
+            result.update(status="skipped", note=str(e))
+            results.append(result)
+            continue
+        except ImportError as e:
+            result.update(status="skipped", note=f"missing dependency ({e.name})")
+            results.append(result)
+            continue
+        median = statistics.median(timings)
+        result.update(medianMs=round(median, 3), minMs=round(min(timings), 3))
+
+        baseline = baselines.get("benchmarks", {}).get(name)
+        if baseline is None:
+            result["status"] = "new"
+        else:
+            expected = baseline["medianMs"] * scale
+            delta = (median - expected) / expected if expected else 0.0
+            result.update(expectedMs=round(expected, 3), deltaPct=round(delta * 100, 1))
+            if delta > threshold and median - expected > min_delta_ms:
+                result["status"] = "REGRESSED"
+            elif delta < -threshold:
+                result["status"] = "faster"
+        results.append(result)
+    return results, calibration
+
+
+def print_results(results: List[Dict[str, Any]], calibration: float, baselines: Dict[str, Any]):
+    base = baselines.get("calibrationMs")
+    scale = f" (baseline {base:.1f}ms, scale {calibration / base:.2f}x)" if base else ""
+    print(f"Calibration: {calibration:.1f}ms{scale}")
+    print(f"{'benchmark':<18} {'size':<28} {'median ms':>10} {'expected':>10} {'delta':>8}  status")
+    for r in results:
+        median = f"{r['medianMs']:10.2f}" if r["medianMs"] is not None else f"{'-':>10}"
+        expected = f"{r['expectedMs']:10.2f}" if r["expectedMs"] is not None else f"{'-':>10}"
+        delta = f"{r['deltaPct']:+7.1f}%" if r["deltaPct"] is not None else f"{'-':>8}"
+        note = f" ({r['note']})" if r.get("note") else ""
+        print(f"{r['name']:<18} {r['size']:<28} {median} {expected} {delta}  {r['status']}{note}")
+
+
+def update_baselines(results: List[Dict[str, Any]], calibration: float, baselines: Dict[str, Any], path: Path):
+    """Record measured medians; benchmarks that were skipped keep their old baseline."""
+    old_scale = calibration / baselines["calibrationMs"] if baselines.get("calibrationMs") else 1.0
+    benchmarks = {name: {**entry, "medianMs": round(entry["medianMs"] * old_scale, 3)}
+                  for name, entry in baselines.get("benchmarks", {}).items()}
+    for r in results:
+        if r["medianMs"] is not None:
+            benchmarks[r["name"]] = {"medianMs": r["medianMs"], "size": r["size"]}
+    data = {
+        "updatedAt": datetime.now(timezone.utc).isoformat(),
+        "machine": f"{platform.system()} {platform.machine()} / Python {platform.python_version()}",
+        "calibrationMs": round(calibration, 3),
+        "benchmarks": dict(sorted(benchmarks.items())),
+    }
+    path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+    print(f"Baselines written to {path}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="Comma-separated benchmark names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown as a fraction (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore regressions smaller than this")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--strict", action="store_true", help="Fail on skipped benchmarks and missing baselines")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}; choose from {', '.join(BENCHMARKS)}")
+
+    baselines = load_baselines(args.baseline)
+    results, calibration = run_suite(names, args.repeat, args.threshold, args.min_delta_ms, baselines)
+    print_results(results, calibration, baselines)
+
+    if args.update_baseline:
+        update_baselines(results, calibration, baselines, args.baseline)
+        return 0
+    failed = False
+    regressed = [r["name"] for r in results if r["status"] == "REGRESSED"]
+    if regressed:
+        print(f"\nRegression beyond {args.threshold:.0%}: {', '.join(regressed)}")
+        failed = True
+    if args.strict:
+        unchecked = [r["name"] for r in results if r["status"] in ("new", "skipped")]
+        if unchecked:
+            print(f"\nNot compared with a baseline (--strict): {', '.join(unchecked)}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
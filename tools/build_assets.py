@@ -0,0 +1,456 @@
+"""
+Static asset build for frontend/ and widget/.
+
+Minifies JS and CSS, fingerprints each file with a content hash, writes
+.gz and .br variants next to it and records everything in dist/manifest.json.
+HTML pages are copied with their <script>/<link> references rewritten to the
+hashed names, so those URLs can be cached as immutable. The backend
+(middleware/staticAssets.js) serves the precompressed files when the manifest
+exists and falls back to the plain source files otherwise.
+
+Builds are incremental: a file is only re-minified and recompressed when its
+source hash (or, for HTML, one of the assets it references) changed.
+
+Usage:
+    python build_assets.py [--clean] [--no-minify]
+
+Brotli variants need the optional `Brotli` package; without it only .gz
+files are produced.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# ------------------------------
+# Configuration
+# ------------------------------
+BASE_DIR = Path(__file__).resolve().parents[1]
+DIST_DIR = BASE_DIR / "dist"
+MANIFEST_FILE = "manifest.json"
+
+SOURCE_DIRS = ("frontend", "widget")
+ASSET_SUFFIXES = (".js", ".css")
+PAGE_SUFFIXES = (".html",)
+HASH_LENGTH = 10
+MIN_COMPRESS_BYTES = 256  # smaller files are served as-is
+
+
+# ------------------------------
+# Minification
+# ------------------------------
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "yield", "await"}
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch in "_$" or ord(ch) > 127
+
+
+def minify_js(source: str) -> str:
+    """
+    Conservative JavaScript minifier.
+
+    Removes comments (except /*! ... */ banners), indentation, blank lines
+    and redundant spaces between punctuation. Line breaks are kept so
+    automatic semicolon insertion behaves exactly as in the source; strings,
+    template literals and regex literals are copied verbatim.
+    """
+    out: List[str] = []
+    n = len(source)
+    i = 0
+    pending_space = False
+    template_depth: List[int] = []  # brace depth at which each ${ ... } closes
+    braces = 0
+
+    def last_significant() -> str:
+        for chunk in reversed(out):
+            stripped = chunk.rstrip()
+            if stripped:
+                return stripped
+        return ""
+
+    def emit(text: str):
+        nonlocal pending_space
+        if pending_space and out:
+            prev, nxt = out[-1][-1:], text[:1]
+            if prev not in ("", "\n") and (
+                (_is_word(prev) and _is_word(nxt))
+                or (prev in "+-" and nxt in "+-")
+                or "/" in (prev, nxt) or "." in (prev, nxt)
+            ):
+                out.append(" ")
+        pending_space = False
+        out.append(text)
+
+    def newline():
+        nonlocal pending_space
+        pending_space = False
+        if out and out[-1] != "\n":
+            out.append("\n")
+
+    def copy_template(start: int) -> int:
+        """Copy template text from `start` (after a backtick or `}`); return the index after it."""
+        j = start
+        while j < n:
+            ch = source[j]
+            if ch == "\\":
+                j += 2
+                continue
+            if ch == "`":
+                out.append(source[start:j + 1])
+                return j + 1
+            if ch == "$" and source.startswith("${", j):
+                out.append(source[start:j + 2])
+                template_depth.append(braces)
+                return j + 2
+            j += 1
+        out.append(source[start:])
+        return n
+
+    while i < n:
+        ch = source[i]
+
+        if ch in " \t\r\f\v":
+            pending_space = True
+            i += 1
+        elif ch == "\n":
+            newline()
+            i += 1
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = n if end == -1 else end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            comment = source[i:end]
+            if comment.startswith("/*!"):
+                emit(comment)
+            elif "\n" in comment:
+                newline()
+            else:
+                pending_space = True
+            i = end
+        elif ch in "'\"":
+            j = i + 1
+            while j < n and source[j] != ch:
+                if source[j] == "\\":
+                    j += 1
+                elif source[j] == "\n":
+                    break
+                j += 1
+            emit(source[i:j + 1])
+            i = j + 1
+        elif ch == "`":
+            emit("`")
+            i = copy_template(i + 1)
+        elif ch == "/":
+            prev = last_significant()
+            word = re.search(r"[\w$]+$", prev)
+            if not prev or prev[-1] in _REGEX_PRECEDERS or (word and word.group() in _REGEX_KEYWORDS):
+                j, in_class = i + 1, False
+                while j < n and source[j] != "\n":
+                    c = source[j]
+                    if c == "\\":
+                        j += 1
+                    elif c == "[":
+                        in_class = True
+                    elif c == "]":
+                        in_class = False
+                    elif c == "/" and not in_class:
+                        break
+                    j += 1
+                j += 1
+                while j < n and _is_word(source[j]):
+                    j += 1  # flags
+                emit(source[i:j])
+                i = j
+            else:
+                emit("/")
+                i += 1
+        elif ch == "{":
+            braces += 1
+            emit(ch)
+            i += 1
+        elif ch == "}":
+            if template_depth and template_depth[-1] == braces:
+                template_depth.pop()
+                out.append("}")
+                pending_space = False
+                i = copy_template(i + 1)
+            else:
+                braces -= 1
+                emit(ch)
+                i += 1
+        else:
+            j = i + 1
+            if _is_word(ch):
+                while j < n and _is_word(source[j]):
+                    j += 1
+            emit(source[i:j])
+            i = j
+
+    return "".join(out).strip() + "\n"
+
+
+_CSS_TOKENS = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)""", re.S)
+
+
+def minify_css(source: str) -> str:
+    """Strip comments and whitespace from a stylesheet, leaving strings untouched."""
+    parts: List[str] = []
+    last = 0
+    for match in _CSS_TOKENS.finditer(source):
+        parts.append(source[last:match.start()])
+        string, comment, _space = match.groups()
+        if string:
+            parts.append(string)
+        elif comment and comment.startswith("/*!"):
+            parts.append(comment)
+        else:
+            parts.append(" ")
+        last = match.end()
+    parts.append(source[last:])
+
+    text = "".join(parts)
+    # Spaces around these are never significant outside strings; ":" only
+    # loses the space after it so descendant pseudo-selectors ("a :hover")
+    # keep their meaning.
+    out: List[str] = []
+    for chunk in re.split(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""", text):
+        if chunk[:1] in "'\"" and len(chunk) > 1:
+            out.append(chunk)
+            continue
+        chunk = re.sub(r"\s*([{};,>])\s*", r"\1", chunk)
+        chunk = re.sub(r":\s+", ":", chunk)
+        chunk = re.sub(r";}", "}", chunk)
+        out.append(chunk)
+    return "".join(out).strip() + "\n"
+
+
+# ------------------------------
+# Build steps
+# ------------------------------
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _hashed_name(rel: str, digest: str) -> str:
+    stem, dot, suffix = rel.rpartition(".")
+    return f"{stem}.{digest[:HASH_LENGTH]}{dot}{suffix}"
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _write_variants(out_dir: Path, rel: str, data: bytes) -> Dict[str, int]:
+    """Write the file plus .gz/.br variants; return the byte size of each encoding."""
+    target = out_dir / rel
+    _write_atomic(target, data)
+    sizes = {"identity": len(data)}
+    if len(data) < MIN_COMPRESS_BYTES:
+        return sizes
+
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        _write_atomic(target.with_name(target.name + ".gz"), gz)
+        sizes["gzip"] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            _write_atomic(target.with_name(target.name + ".br"), br)
+            sizes["br"] = len(br)
+    return sizes
+
+
+def _outputs_exist(out_dir: Path, entry: Dict[str, Any]) -> bool:
+    target = out_dir / entry["path"]
+    suffixes = {"gzip": ".gz", "br": ".br"}
+    return target.exists() and all(
+        target.with_name(target.name + suffixes[enc]).exists() for enc in entry["encodings"] if enc in suffixes
+    )
+
+
+def discover_sources(base_dir: Path = BASE_DIR) -> Tuple[List[str], List[str]]:
+    """Relative paths of the JS/CSS assets and the HTML pages to build."""
+    assets, pages = [], []
+    for name in SOURCE_DIRS:
+        root = base_dir / name
+        for path in sorted(root.rglob("*")):
+            if not path.is_file():
+                continue
+            rel = path.relative_to(base_dir).as_posix()
+            if path.suffix in ASSET_SUFFIXES:
+                assets.append(rel)
+            elif path.suffix in PAGE_SUFFIXES:
+                pages.append(rel)
+    return assets, pages
+
+
+_REFERENCE = re.compile(r"""\b(src|href)=(["'])([^"'?#:]+)\2""")
+
+
+def rewrite_references(html: str, page_rel: str, hashed: Dict[str, str]) -> Tuple[str, Dict[str, str]]:
+    """Point relative src/href attributes at fingerprinted assets; return the html and its dependencies."""
+    page_dir = os.path.dirname(page_rel)
+    deps: Dict[str, str] = {}
+
+    def replace(match: "re.Match[str]") -> str:
+        attr, quote, url = match.groups()
+        if url.startswith("/"):
+            return match.group(0)
+        target = os.path.normpath(os.path.join(page_dir, url)).replace(os.sep, "/")
+        if target not in hashed:
+            return match.group(0)
+        deps[target] = hashed[target]
+        new_url = os.path.relpath(hashed[target], page_dir or ".").replace(os.sep, "/")
+        return f"{attr}={quote}{new_url}{quote}"
+
+    return _REFERENCE.sub(replace, html), deps
+
+
+def load_manifest(out_dir: Path = DIST_DIR) -> Dict[str, Any]:
+    path = out_dir / MANIFEST_FILE
+    if path.exists():
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            pass
+    return {"version": 1, "files": {}}
+
+
+def build(out_dir: Path = DIST_DIR, minify: bool = True, clean: bool = False,
+          log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Build every asset and page into out_dir and write the manifest."""
+    started = time.perf_counter()
+    if clean:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    previous = load_manifest(out_dir)
+    old_files: Dict[str, Any] = previous.get("files", {})
+    if previous.get("minified", minify) != minify:
+        old_files = {}  # options changed, rebuild everything
+
+    assets, pages = discover_sources()
+    files: Dict[str, Any] = {}
+    stats = {"built": 0, "reused": 0, "sourceBytes": 0, "bytes": {"identity": 0, "gzip": 0, "br": 0}}
+
+    def record(rel: str, entry: Dict[str, Any], rebuilt: bool):
+        files[rel] = entry
+        stats["built" if rebuilt else "reused"] += 1
+        stats["sourceBytes"] += entry["sourceBytes"]
+        for enc in stats["bytes"]:
+            stats["bytes"][enc] += entry["encodings"].get(enc, entry["encodings"]["identity"])
+
+    for rel in assets:
+        raw = (BASE_DIR / rel).read_bytes()
+        source_sha = _sha256(raw)
+        old = old_files.get(rel)
+        if old and old.get("sourceSha") == source_sha and _outputs_exist(out_dir, old):
+            record(rel, old, False)
+            continue
+
+        data = raw
+        if minify:
+            text = raw.decode("utf-8")
+            data = (minify_js(text) if rel.endswith(".js") else minify_css(text)).encode("utf-8")
+        digest = _sha256(data)
+        hashed = _hashed_name(rel, digest)
+        entry = {
+            "path": hashed,
+            "hashed": True,
+            "sha256": digest,
+            "sourceSha": source_sha,
+            "sourceBytes": len(raw),
+            "encodings": _write_variants(out_dir, hashed, data),
+        }
+        record(rel, entry, True)
+        log(f"Built {rel} -> {hashed} ({len(raw)} -> {entry['encodings'].get('br', entry['encodings'].get('gzip', len(data)))} bytes)")
+
+    hashed_paths = {rel: entry["path"] for rel, entry in files.items()}
+    for rel in pages:
+        raw = (BASE_DIR / rel).read_bytes()
+        source_sha = _sha256(raw)
+        html, deps = rewrite_references(raw.decode("utf-8"), rel, hashed_paths)
+        old = old_files.get(rel)
+        if old and old.get("sourceSha") == source_sha and old.get("deps") == deps and _outputs_exist(out_dir, old):
+            record(rel, old, False)
+            continue
+
+        data = html.encode("utf-8")
+        entry = {
+            "path": rel,
+            "hashed": False,
+            "sha256": _sha256(data),
+            "sourceSha": source_sha,
+            "sourceBytes": len(raw),
+            "deps": deps,
+            "encodings": _write_variants(out_dir, rel, data),
+        }
+        record(rel, entry, True)
+        log(f"Built {rel} ({len(deps)} fingerprinted references)")
+
+    manifest = {
+        "version": 1,
+        "generatedAt": datetime.now(timezone.utc).isoformat(),
+        "minified": minify,
+        "brotli": brotli is not None,
+        "files": files,
+    }
+    _write_atomic(out_dir / MANIFEST_FILE, json.dumps(manifest, indent=2).encode("utf-8"))
+
+    # Keep the previous generation of hashed files so pages already loaded
+    # by browsers can still fetch what they reference.
+    keep = {MANIFEST_FILE}
+    for entry in list(files.values()) + list(previous.get("files", {}).values()):
+        keep.update({entry["path"], entry["path"] + ".gz", entry["path"] + ".br"})
+    removed = 0
+    for path in out_dir.rglob("*"):
+        if path.is_file() and path.relative_to(out_dir).as_posix() not in keep:
+            path.unlink()
+            removed += 1
+
+    stats["removed"] = removed
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    log(
+        f"Assets: {stats['built']} built, {stats['reused']} unchanged, {removed} stale removed in {stats['seconds']}s; "
+        f"{stats['sourceBytes']} source bytes -> {stats['bytes']['identity']} minified, "
+        f"{stats['bytes']['gzip']} gzip, {stats['bytes']['br'] if brotli else '-'} brotli"
+    )
+    if brotli is None:
+        log("Brotli not installed (pip install Brotli); only .gz variants were written")
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Minify, fingerprint and precompress frontend/widget assets")
+    parser.add_argument("--out", type=Path, default=DIST_DIR, help="Output directory")
+    parser.add_argument("--clean", action="store_true", help="Delete the output directory and rebuild everything")
+    parser.add_argument("--no-minify", action="store_true", help="Fingerprint and compress without minifying")
+    args = parser.parse_args(argv)
+    build(args.out, minify=not args.no_minify, clean=args.clean)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Bulk user role changes and audits.
+
+Applies a whole list of role changes over one database connection instead
+of one `npm run make-admin` (npm + node start + new connection) per user:
+MongoDB gets a single unordered bulk_write per batch, NeDB's users.db is
+rewritten once. Every input row gets a result.
+
+Input is a CSV with an `email` column and an optional `role` column, or a
+plain list of emails (one per line, or comma/semicolon separated).
+
+Usage:
+    python bulk_admin.py FILE [--role admin|user] [--source auto|mongodb|nedb] [--dry-run] [--report OUT.csv]
+    python bulk_admin.py FILE --audit      (report current roles, change nothing)
+
+NeDB note: the backend keeps users.db in memory and rewrites it on its own
+schedule, so changes on NeDB are refused while the managed server is
+running; stop it first and start it again afterwards.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from datastore import nedb_path, open_mongo, resolve_source
+from manager_core import OperationError, read_server_pid
+
+# ------------------------------
+# Configuration
+# ------------------------------
+ROLES = ("user", "admin")
+BATCH_SIZE = 1000
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# Result statuses
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+DUPLICATE = "duplicate"
+FAILED = "failed"
+WOULD_UPDATE = "would_update"
+
+
+# ------------------------------
+# Input
+# ------------------------------
+
+def parse_rows(text: str, default_role: str = "admin") -> List[Dict[str, Any]]:
+    """
+    Turn CSV or an email list into rows of {row, email, role, status, message}.
+    Rows that can't be applied already carry an invalid/duplicate status.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    entries: List[tuple] = []
+    if lines and "email" in [field.strip().lower() for field in lines[0].split(",")]:
+        reader = csv.DictReader(io.StringIO("\n".join(lines)))
+        fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+        for number, record in enumerate(reader, start=2):
+            email = (record.get(fields.get("email", "email")) or "").strip()
+            role = (record.get(fields["role"]) or "").strip().lower() if "role" in fields else ""
+            entries.append((number, email, role or default_role))
+    else:
+        for number, line in enumerate(lines, start=1):
+            for email in re.split(r"[,;\s]+", line.strip()):
+                if email:
+                    entries.append((number, email, default_role))
+
+    rows, seen = [], set()
+    for number, email, role in entries:
+        email = email.lower()
+        row = {"row": number, "email": email, "role": role, "previousRole": None, "status": None, "message": ""}
+        if not EMAIL_RE.match(email):
+            row.update(status=INVALID, message="not an email address")
+        elif role not in ROLES:
+            row.update(status=INVALID, message=f"role must be one of {', '.join(ROLES)}")
+        elif email in seen:
+            row.update(status=DUPLICATE, message="email listed more than once")
+        seen.add(email)
+        rows.append(row)
+    return rows
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _resolve(row: Dict[str, Any], current_role: Optional[str], audit: bool, dry_run: bool) -> bool:
+    """Fill in the row's outcome; True when the stored role needs to change."""
+    if current_role is None:
+        row.update(status=NOT_FOUND, message="no user with this email")
+        return False
+    row["previousRole"] = current_role or "user"
+    if audit:
+        row.update(status=UNCHANGED, role=row["previousRole"], message="audit only")
+        return False
+    if row["previousRole"] == row["role"]:
+        row.update(status=UNCHANGED, message=f"already {row['role']}")
+        return False
+    row.update(status=WOULD_UPDATE if dry_run else UPDATED, message=f"{row['previousRole']} -> {row['role']}")
+    return not dry_run
+
+
+# ------------------------------
+# Stores
+# ------------------------------
+
+def _apply_mongo(rows: List[Dict[str, Any]], audit: bool, dry_run: bool, log: Callable[[str], None]):
+    from pymongo import UpdateOne
+
+    client, db = open_mongo()
+    try:
+        users = db["users"]
+        for batch in _chunks(rows, BATCH_SIZE):
+            found = {
+                doc["email"]: doc
+                for doc in users.find({"email": {"$in": [row["email"] for row in batch]}}, {"email": 1, "role": 1})
+            }
+            ops, pending = [], []
+            for row in batch:
+                doc = found.get(row["email"])
+                if _resolve(row, doc.get("role", "user") if doc else None, audit, dry_run):
+                    ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"role": row["role"]}}))
+                    pending.append(row)
+            if ops:
+                result = users.bulk_write(ops, ordered=False)
+                log(f"bulk_write: {result.modified_count} of {len(ops)} users modified")
+                if result.modified_count != len(ops):
+                    # Someone else changed these users in the meantime; re-read to report accurately
+                    current = {doc["email"]: doc.get("role", "user") for doc in
+                               users.find({"email": {"$in": [row["email"] for row in pending]}}, {"email": 1, "role": 1})}
+                    for row in pending:
+                        if current.get(row["email"]) != row["role"]:
+                            row.update(status=FAILED, message="role did not change")
+    finally:
+        client.close()
+
+
+def _apply_nedb(rows: List[Dict[str, Any]], audit: bool, dry_run: bool, log: Callable[[str], None]):
+    """Read users.db once, then write the compacted file back with the new roles."""
+    if not (audit or dry_run) and read_server_pid():
+        # The running backend would overwrite the rewrite with its in-memory copy
+        raise OperationError("Stop the server before changing roles on NeDB")
+    path = nedb_path("users")
+    if not path.exists():
+        for row in rows:
+            _resolve(row, None, audit, dry_run)
+        return
+
+    header: List[str] = []  # index definitions, kept as-is
+    docs: Dict[str, Dict[str, Any]] = {}
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                doc = json.loads(line)
+            except ValueError:
+                continue  # truncated last line, dropped like NeDB does
+            if "_id" not in doc:
+                header.append(line.rstrip("\n"))
+            elif doc.get("$$deleted"):
+                docs.pop(doc["_id"], None)
+            else:
+                docs.pop(doc["_id"], None)
+                docs[doc["_id"]] = doc
+
+    by_email = {str(doc.get("email", "")).lower(): doc for doc in docs.values()}
+    changed = 0
+    for row in rows:
+        doc = by_email.get(row["email"])
+        if _resolve(row, doc.get("role", "user") if doc else None, audit, dry_run):
+            doc["role"] = row["role"]
+            changed += 1
+
+    if not changed:
+        return
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8", newline="\n") as f:
+        for line in header:
+            f.write(line + "\n")
+        for doc in docs.values():
+            f.write(json.dumps(doc, separators=(",", ":"), ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+    log(f"Rewrote {path.name}: {changed} users changed, {len(docs)} users kept. Restart the backend to load them.")
+
+
+def apply_roles(rows: List[Dict[str, Any]], source: str = "auto", audit: bool = False, dry_run: bool = False,
+                log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Apply (or audit) the parsed rows in one pass; returns {source, seconds, counts, rows}."""
+    started = time.perf_counter()
+    source = resolve_source(source)
+    valid = [row for row in rows if row["status"] is None]
+    if valid:
+        if source == "mongodb":
+            _apply_mongo(valid, audit, dry_run, log)
+        else:
+            _apply_nedb(valid, audit, dry_run, log)
+
+    counts: Dict[str, int] = {}
+    for row in rows:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+    elapsed = time.perf_counter() - started
+    log(f"Bulk {'audit' if audit else 'role update'} on {source}: {len(rows)} rows in {elapsed:.2f}s {counts}")
+    return {"source": source, "seconds": round(elapsed, 3), "counts": counts, "rows": rows}
+
+
+def write_report(rows: List[Dict[str, Any]], path: Path):
+    with Path(path).open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["row", "email", "previousRole", "role", "status", "message"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Change or audit user roles in bulk")
+    parser.add_argument("input", help="CSV (email[,role]) or list of emails; '-' reads stdin")
+    parser.add_argument("--role", choices=ROLES, default="admin", help="Role for rows without a role column")
+    parser.add_argument("--source", choices=["auto", "mongodb", "nedb"], default="auto")
+    parser.add_argument("--audit", action="store_true", help="Report current roles without changing anything")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would change")
+    parser.add_argument("--report", type=Path, help="Write per-row results to this CSV")
+    args = parser.parse_args(argv)
+
+    text = sys.stdin.read() if args.input == "-" else Path(args.input).read_text(encoding="utf-8-sig")
+    try:
+        result = apply_roles(parse_rows(text, args.role), args.source, audit=args.audit, dry_run=args.dry_run)
+    except OperationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    for row in result["rows"]:
+        print(f"{row['row']:>5}  {row['email']:<40} {str(row['previousRole'] or '-'):<6} -> {row['role']:<6} {row['status']:<12} {row['message']}")
+    if args.report:
+        write_report(result["rows"], args.report)
+        print(f"Report written to {args.report}")
+    failed = sum(n for status, n in result["counts"].items() if status not in (UPDATED, UNCHANGED, WOULD_UPDATE))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
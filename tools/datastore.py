@@ -0,0 +1,224 @@
+"""
+Read-only access to the Chatbot Builder data stores from the Python tools.
+
+Mirrors backend/db/dbAdapter.js: MongoDB when it is reachable, otherwise the
+NeDB datafiles in backend/data. pymongo is imported only when MongoDB is used.
+"""
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# ------------------------------
+# Project-aware paths
+# ------------------------------
+BASE_DIR = Path(__file__).resolve().parents[1]
+ENV_PATH = BASE_DIR / "backend" / ".env"
+DATA_DIR = BASE_DIR / "backend" / "data"
+
+DEFAULT_MONGO_URI = "mongodb://localhost:27017/chatbot-builder"
+STORES = ("users", "chatbots", "leads", "conversations")
+
+
+# ------------------------------
+# Configuration
+# ------------------------------
+
+def get_mongo_uri() -> str:
+    """MONGODB_URI from backend/.env, falling back to the backend's default."""
+    if ENV_PATH.exists():
+        from dotenv import dotenv_values
+        uri = dotenv_values(ENV_PATH).get("MONGODB_URI")
+        if uri:
+            return uri
+    return DEFAULT_MONGO_URI
+
+
+def nedb_path(store: str) -> Path:
+    return DATA_DIR / f"{store}.db"
+
+
+# ------------------------------
+# NeDB datafiles
+# ------------------------------
+
+def _decode_nedb(value: Any) -> Any:
+    """Convert NeDB's {"$$date": ms} markers back into datetimes."""
+    if isinstance(value, dict):
+        if len(value) == 1 and "$$date" in value:
+            return datetime.fromtimestamp(value["$$date"] / 1000, tz=timezone.utc)
+        return {k: _decode_nedb(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode_nedb(v) for v in value]
+    return value
+
+
+def _encode_nedb(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return {"$$date": int(value.timestamp() * 1000)}
+    if isinstance(value, dict):
+        return {k: _encode_nedb(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode_nedb(v) for v in value]
+    return value
+
+
+def nedb_line(doc: Dict[str, Any]) -> str:
+    """Serialise a document as one NeDB datafile line (without newline)."""
+    return json.dumps(_encode_nedb(doc), separators=(",", ":"), default=str)
+
+
+def parse_nedb_line(raw: bytes) -> Dict[str, Any]:
+    """Inverse of nedb_line()."""
+    return _decode_nedb(json.loads(raw))
+
+
+def iter_nedb(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the live documents of a NeDB datafile.
+
+    NeDB appends a new line for every update and a {"$$deleted": true} line
+    for removals, so a first pass records where each _id was last written.
+    Only that id -> offset map is held in memory.
+    """
+    if not path.exists():
+        return
+
+    latest: Dict[str, Optional[int]] = {}
+    with path.open("rb") as f:
+        offset = 0
+        for raw in f:
+            line_offset, offset = offset, offset + len(raw)
+            try:
+                doc = json.loads(raw)
+            except ValueError:
+                continue  # NeDB tolerates a truncated last line, so do we
+            if not isinstance(doc, dict) or "_id" not in doc:
+                continue  # index definitions
+            latest[doc["_id"]] = None if doc.get("$$deleted") else line_offset
+
+    offsets = sorted(o for o in latest.values() if o is not None)
+    del latest
+    with path.open("rb") as f:
+        for line_offset in offsets:
+            f.seek(line_offset)
+            yield parse_nedb_line(f.readline())
+
+
+def _get_field(doc: Dict[str, Any], dotted: str) -> Any:
+    value: Any = doc
+    for part in dotted.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the small subset of Mongo query syntax the tools use."""
+    for field, cond in (query or {}).items():
+        value = _get_field(doc, field)
+        if isinstance(cond, dict) and any(k.startswith("$") for k in cond):
+            for op, arg in cond.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op in ("$gt", "$gte", "$lt", "$lte"):
+                    if value is None:
+                        return False
+                    if op == "$gt" and not value > arg:
+                        return False
+                    if op == "$gte" and not value >= arg:
+                        return False
+                    if op == "$lt" and not value < arg:
+                        return False
+                    if op == "$lte" and not value <= arg:
+                        return False
+        elif value != cond:
+            return False
+    return True
+
+
+# ------------------------------
+# MongoDB
+# ------------------------------
+
+def open_mongo(uri: Optional[str] = None, timeout_ms: int = 3000):
+    """Return (client, database) for the configured MongoDB."""
+    from pymongo import MongoClient
+
+    client = MongoClient(uri or get_mongo_uri(), serverSelectionTimeoutMS=timeout_ms, tz_aware=True)
+    return client, client.get_default_database(default="chatbot-builder")
+
+
+def mongo_available(uri: Optional[str] = None, timeout_ms: int = 2000) -> bool:
+    try:
+        client, db = open_mongo(uri, timeout_ms)
+    except ImportError:
+        return False
+    try:
+        client.admin.command("ping")
+        return True
+    except Exception:
+        return False
+    finally:
+        client.close()
+
+
+def resolve_source(source: str = "auto", uri: Optional[str] = None) -> str:
+    """Map "auto" to "mongodb" or "nedb" the same way the backend does."""
+    if source != "auto":
+        return source
+    return "mongodb" if mongo_available(uri) else "nedb"
+
+
+def iter_documents(store: str, source: str = "auto", query: Optional[Dict[str, Any]] = None,
+                   uri: Optional[str] = None, sort: Optional[List[Tuple[str, int]]] = None,
+                   batch_size: int = 1000, projection: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the documents of one store from MongoDB or NeDB.
+
+    `sort` is honoured for MongoDB only; NeDB documents come back in datafile
+    (insertion) order. `projection` limits documents to _id and the listed
+    (possibly dotted) fields, so MongoDB doesn't ship e.g. embeddings.
+    """
+    source = resolve_source(source, uri)
+    if source == "nedb":
+        heads = {field.split(".")[0] for field in projection or ()}
+        for doc in iter_nedb(nedb_path(store)):
+            if matches(doc, query):
+                yield {k: v for k, v in doc.items() if k == "_id" or k in heads} if projection else doc
+        return
+
+    client, db = open_mongo(uri)
+    try:
+        fields = {field: 1 for field in projection} if projection else None
+        cursor = db[store].find(query or {}, fields, batch_size=batch_size)
+        if sort:
+            cursor = cursor.sort(sort)
+        for doc in cursor:
+            yield doc
+    finally:
+        client.close()
+
+
+def count_documents(store: str, source: str = "auto", query: Optional[Dict[str, Any]] = None,
+                    uri: Optional[str] = None) -> int:
+    """
+    Live document count. Without a query MongoDB answers from collection
+    metadata (estimatedDocumentCount); NeDB counts the live datafile lines.
+    """
+    source = resolve_source(source, uri)
+    if source == "nedb":
+        return sum(1 for doc in iter_nedb(nedb_path(store)) if matches(doc, query))
+
+    client, db = open_mongo(uri)
+    try:
+        if not query:
+            return db[store].estimated_document_count()
+        return db[store].count_documents(query)
+    finally:
+        client.close()
@@ -0,0 +1,597 @@
+"""
+Caching edge proxy for the public bot-config endpoint.
+
+Every page view of a site that embeds the widget fetches
+GET /api/chatbot/:botId, which reads the whole chatbot document (knowledge
+base included) from the database. This reverse proxy sits in front of the
+backend and answers that route from an in-memory LRU with a TTL:
+
+    - ETag / If-None-Match: repeat widget loads get a bodyless 304
+    - request coalescing: concurrent misses for one bot share a single
+      upstream fetch instead of stampeding the database
+    - invalidation: a PUT, PATCH, DELETE or knowledge/property POST under
+      /api/chatbot/:botId that passes through drops that bot's entry
+      (changes made around the proxy show up once the TTL runs out)
+
+Cached responses are shared by every site embedding the widget, so the
+upstream CORS headers are not stored; each response gets its own from the
+caller's Origin, following the backend's policy in server.js (any origin
+outside production, the allow-list with NODE_ENV=production).
+
+Everything else is forwarded unchanged, with the client appended to
+X-Forwarded-For (set TRUST_PROXY=loopback on the backend so rate limits
+stay per client). Hit/miss counters are served to loopback clients at
+/__edge/stats; POST /__edge/purge[?bot=ID] drops one or all entries.
+
+Usage:
+    python edge_cache.py serve [--host 127.0.0.1] [--port 5070] [--target http://localhost:5000]
+                               [--ttl 30] [--max-mb 64] [--max-entries 5000]
+    python edge_cache.py stats [--url http://127.0.0.1:5070]
+    python edge_cache.py purge [BOT_ID] [--url http://127.0.0.1:5070]
+
+Point the widget's apiUrl at the proxy to take the load off the backend.
+"""
+import argparse
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import re
+import signal
+import sys
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from manager_core import load_env
+from traffic import HOP_HEADERS
+
+# ------------------------------
+# Configuration
+# ------------------------------
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5070
+DEFAULT_TARGET = "http://localhost:5000"
+DEFAULT_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+DEFAULT_TTL = 30.0  # seconds a bot config is served without asking the backend
+NEGATIVE_TTL = 5.0  # 404s are cached briefly so a removed widget can't hammer the DB
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 5000
+COALESCE_TIMEOUT = 30.0  # followers give up on a stuck leader after this long
+IDLE_RECONNECT = 2.0  # below Node's 5s keep-alive timeout, so reused sockets are never half-closed
+GZIP_MIN_BYTES = 1024
+
+BOT_CONFIG = re.compile(r"^/api/chatbot/([^/]+)$")
+# Writes that change what GET /api/chatbot/:botId returns (chat posts don't)
+BOT_WRITE = re.compile(r"^/api/chatbot/([^/]+)(?:/(?:publish|upload-knowledge|add-property))?$")
+IDEMPOTENT = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+# The proxy writes its own Date/Server, and framing is recomputed per response
+SKIP_HEADERS = HOP_HEADERS | {"date", "server"}
+# Origins server.js accepts in production, besides FRONTEND_URL
+BACKEND_ORIGINS = (
+    "http://localhost:3000", "http://localhost:5000", "http://127.0.0.1:3000", "http://127.0.0.1:5000",
+    "https://your-production-domain.com", "https://www.your-production-domain.com",
+)
+
+
+# ------------------------------
+# Cache
+# ------------------------------
+
+class CachedResponse:
+    """One upstream response plus the validators served with it."""
+
+    __slots__ = ("status", "headers", "body", "etag", "stored_at", "expires_at", "gzipped")
+
+    def __init__(self, status: int, headers: List[Tuple[str, str]], body: bytes, ttl: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self.stored_at = time.monotonic()
+        self.expires_at = self.stored_at + ttl
+        # Compressed once per fetch rather than once per hit
+        self.gzipped = gzip.compress(body, compresslevel=6) if status == 200 and len(body) >= GZIP_MIN_BYTES else None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped or b"")
+
+    @property
+    def gzip_etag(self) -> str:
+        return self.etag[:-1] + '-gz"'
+
+
+class _Flight:
+    """An upstream fetch that concurrent misses for the same bot wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: Optional[CachedResponse] = None
+        self.error: Optional[BaseException] = None
+        self.stale = False  # invalidated while in flight: hand out, don't store
+
+
+class EdgeCache:
+    """LRU of bot-config responses bounded by entry count and bytes, with a TTL."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # bot id -> response; ordered oldest -> most recently used
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.not_modified = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bypassed = 0
+        self.upstream_errors = 0
+
+    def fetch(self, bot_id: str, loader: Callable[[], Tuple[int, List[Tuple[str, str]], bytes]]) -> Tuple[CachedResponse, str]:
+        """
+        Return (response, outcome) for `bot_id`, where outcome is HIT, MISS or
+        COALESCED. On a miss the first caller runs `loader` and everyone who
+        arrives meanwhile waits for its result.
+        """
+        with self._lock:
+            entry = self._entries.get(bot_id)
+            if entry is not None:
+                if entry.expires_at > time.monotonic():
+                    self._entries.move_to_end(bot_id)
+                    self.hits += 1
+                    return entry, "HIT"
+                self._drop(bot_id)
+                self.expired += 1
+            flight = self._inflight.get(bot_id)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[bot_id] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.done.wait(COALESCE_TIMEOUT):
+                raise TimeoutError("Timed out waiting for the upstream fetch")
+            if flight.error is not None:
+                raise flight.error
+            return flight.response, "COALESCED"
+
+        try:
+            status, headers, body = loader()
+            flight.response = CachedResponse(status, headers, body, self._ttl_for(status))
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.upstream_errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(bot_id, None)
+                if flight.response is not None and not flight.stale and self._storable(flight.response):
+                    self._store(bot_id, flight.response)
+            flight.done.set()
+        return flight.response, "MISS"
+
+    def invalidate(self, bot_id: Optional[str] = None) -> int:
+        """Drop one bot's entry, or everything; returns how many entries went."""
+        with self._lock:
+            if bot_id is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                self.used_bytes = 0
+                flights = list(self._inflight.values())
+            else:
+                dropped = 1 if self._drop(bot_id) else 0
+                flights = [self._inflight[bot_id]] if bot_id in self._inflight else []
+            for flight in flights:
+                flight.stale = True
+            self.invalidations += 1
+            return dropped
+
+    def count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "usedBytes": self.used_bytes,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                # Requests answered without an upstream fetch of their own
+                "hitRate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "notModified": self.not_modified,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "bypassed": self.bypassed,
+                "upstreamErrors": self.upstream_errors,
+                "inflight": len(self._inflight),
+            }
+
+    # --- internals, called with the lock held ---
+
+    def _ttl_for(self, status: int) -> float:
+        return self.ttl if status == 200 else min(self.ttl, NEGATIVE_TTL)
+
+    def _storable(self, response: CachedResponse) -> bool:
+        if response.status not in (200, 404) or response.size > self.max_bytes:
+            return False
+        cache_control = next((v for k, v in response.headers if k.lower() == "cache-control"), "").lower()
+        return "no-store" not in cache_control and "private" not in cache_control
+
+    def _store(self, bot_id: str, response: CachedResponse):
+        self._drop(bot_id)
+        self._entries[bot_id] = response
+        self.used_bytes += response.size
+        self._evict()
+
+    def _drop(self, bot_id: str) -> bool:
+        entry = self._entries.pop(bot_id, None)
+        if entry is None:
+            return False
+        self.used_bytes -= entry.size
+        return True
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.used_bytes > self.max_bytes):
+            _bot_id, entry = self._entries.popitem(last=False)
+            self.used_bytes -= entry.size
+            self.evictions += 1
+
+
+# ------------------------------
+# CORS
+# ------------------------------
+
+def backend_allowed_origins() -> Optional[FrozenSet[str]]:
+    """The origins the backend's cors() accepts; None when it accepts any (outside production)."""
+    env = {**load_env(), **os.environ}  # process variables win, as with dotenv
+    if env.get("NODE_ENV") != "production":
+        return None
+    return frozenset(BACKEND_ORIGINS + (env.get("FRONTEND_URL") or "http://localhost:3000",))
+
+
+def _shared_headers(headers: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Upstream headers minus everything that depends on the caller's Origin."""
+    shared = []
+    for key, value in headers:
+        lower = key.lower()
+        if lower in SKIP_HEADERS or lower == "etag" or lower.startswith("access-control-"):
+            continue
+        if lower == "vary":
+            value = ", ".join(v.strip() for v in value.split(",") if v.strip().lower() not in ("origin", ""))
+            if not value:
+                continue
+        shared.append((key, value))
+    return shared
+
+
+def cors_headers(origin: Optional[str], allowed: Optional[FrozenSet[str]]) -> List[Tuple[str, str]]:
+    """What cors({origin: <server.js callback>, credentials: true}) sends for this Origin."""
+    headers = [("Access-Control-Allow-Credentials", "true")]
+    # A refused origin gets no Allow-Origin, so the browser blocks it as the backend would
+    if origin and (allowed is None or origin in allowed):
+        headers.insert(0, ("Access-Control-Allow-Origin", origin))
+    return headers
+
+
+# ------------------------------
+# Upstream connections
+# ------------------------------
+
+class _Upstream:
+    """Keep-alive connections to the backend, one per handler thread."""
+
+    def __init__(self, target: str):
+        parts = urlsplit(target)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, headers: Dict[str, str],
+                body: Optional[bytes]) -> Tuple[int, str, List[Tuple[str, str]], bytes]:
+        for attempt in range(2):
+            conn, reused = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self._close()
+                # A reused socket the backend had just closed; safe to resend only when idempotent
+                if attempt or not reused or method not in IDEMPOTENT:
+                    raise
+                continue
+            except (OSError, http.client.HTTPException):
+                self._close()
+                raise
+            if response.will_close:
+                self._close()
+            else:
+                self._local.last_used = time.monotonic()
+            return response.status, response.reason, response.getheaders(), payload
+        raise ConnectionError("unreachable")
+
+    def _connection(self) -> Tuple[http.client.HTTPConnection, bool]:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and time.monotonic() - self._local.last_used < IDLE_RECONNECT:
+            return conn, True
+        self._close()
+        conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        self._local.last_used = time.monotonic()
+        return conn, False
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ------------------------------
+# HTTP service
+# ------------------------------
+
+def _etag_matches(header: Optional[str], etags: Tuple[str, ...]) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    candidates = {tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip() for tag in header.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+def _accepts_gzip(header: Optional[str]) -> bool:
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        name, _, value = params.strip().partition("=")
+        try:
+            return name.strip().lower() != "q" or float(value) > 0
+        except ValueError:
+            return True
+    return False
+
+
+class _EdgeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    cache: EdgeCache = None  # set by make_server()
+    upstream: _Upstream = None
+    allowed_origins: Optional[FrozenSet[str]] = None  # None: reflect any Origin
+
+    def log_message(self, format, *args):
+        pass  # the backend keeps the access log
+
+    def _handle(self):
+        path, _, query = self.path.partition("?")
+        if path.startswith("/__edge/"):
+            self._admin(path, query)
+            return
+
+        match = BOT_CONFIG.match(path)
+        if match and self.command in ("GET", "HEAD") and not query:
+            self._serve_cached(match.group(1))
+            return
+
+        if match and self.command in ("GET", "HEAD"):
+            self.cache.count("bypassed")
+        status, reason, headers, payload = self._forward()
+        write = BOT_WRITE.match(path)
+        if write and self.command in ("PUT", "PATCH", "DELETE", "POST") and not 400 <= status < 500:
+            # After the write commits (or may have), so the next read refetches
+            self.cache.invalidate(write.group(1))
+        self._respond(status, reason, headers, payload)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _handle
+
+    def _forward(self) -> Tuple[int, str, List[Tuple[str, str]], bytes]:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_HEADERS}
+        headers["Host"] = self.headers.get("Host") or f"{self.upstream.host}:{self.upstream.port}"
+        forwarded = self.headers.get("X-Forwarded-For")
+        headers["X-Forwarded-For"] = f"{forwarded}, {self.client_address[0]}" if forwarded else self.client_address[0]
+        if self.command in ("GET", "HEAD") and BOT_CONFIG.match(self.path):
+            # Cached bodies are stored uncompressed; the proxy compresses per client
+            headers.pop("Accept-Encoding", None)
+            headers.pop("If-None-Match", None)
+            headers.pop("If-Modified-Since", None)
+            # The body is the same for everyone, so don't let a HEAD leave the cache empty
+            return self.upstream.request("GET", self.path, headers, None)
+        try:
+            return self.upstream.request(self.command, self.path, headers, body)
+        except (OSError, http.client.HTTPException) as e:
+            self.cache.count("upstream_errors")
+            return 502, "Bad Gateway", [("Content-Type", "text/plain")], f"Upstream error: {e}".encode()
+
+    def _serve_cached(self, bot_id: str):
+        def load():
+            status, _reason, headers, payload = self._forward()
+            return status, _shared_headers(headers), payload
+
+        try:
+            entry, outcome = self.cache.fetch(bot_id, load)
+        except (OSError, http.client.HTTPException) as e:
+            self._respond(502, "Bad Gateway", [("Content-Type", "text/plain")], f"Upstream error: {e}".encode())
+            return
+
+        headers = list(entry.headers) + cors_headers(self.headers.get("Origin"), self.allowed_origins)
+        body = entry.body
+        etag = entry.etag
+        if entry.gzipped is not None and _accepts_gzip(self.headers.get("Accept-Encoding")):
+            body = entry.gzipped
+            etag = entry.gzip_etag
+            headers.append(("Content-Encoding", "gzip"))
+        vary = [v for k, v in headers if k.lower() == "vary"]
+        headers = [(k, v) for k, v in headers if k.lower() != "vary"]
+        headers.append(("Vary", ", ".join(vary + ["Origin"] + (["Accept-Encoding"] if entry.status == 200 else []))))
+        if entry.status == 200:
+            headers.append(("ETag", etag))
+            if not any(k.lower() == "cache-control" for k, _v in headers):
+                # Browsers keep the copy but revalidate each load, which costs a 304
+                headers.append(("Cache-Control", "no-cache"))
+        headers.append(("X-Edge-Cache", outcome))
+        if outcome == "HIT":
+            headers.append(("Age", str(int(time.monotonic() - entry.stored_at))))
+
+        if entry.status == 200 and _etag_matches(self.headers.get("If-None-Match"), (entry.etag, entry.gzip_etag)):
+            self.cache.count("not_modified")
+            self.send_response(304)
+            for key, value in headers:
+                if key.lower() in ("etag", "cache-control", "vary", "x-edge-cache", "age") \
+                        or key.lower().startswith("access-control-"):
+                    self.send_header(key, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._respond(entry.status, None, headers, body)
+
+    def _respond(self, status: int, reason: Optional[str], headers: List[Tuple[str, str]], payload: bytes):
+        self.send_response(status, reason)
+        for key, value in headers:
+            if key.lower() not in SKIP_HEADERS:
+                self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+
+    def _admin(self, path: str, query: str):
+        # Management endpoints stay on this machine even when the proxy is public
+        if self.client_address[0] not in ("127.0.0.1", "::1"):
+            self._send_json(403, {"error": "Forbidden"})
+        elif path == "/__edge/stats" and self.command == "GET":
+            self._send_json(200, self.cache.stats())
+        elif path == "/__edge/purge" and self.command == "POST":
+            bot_id = (parse_qs(query).get("bot") or [None])[0]
+            self._send_json(200, {"purged": self.cache.invalidate(bot_id)})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self._respond(status, None, [("Content-Type", "application/json")], json.dumps(payload).encode("utf-8"))
+
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, target: str = DEFAULT_TARGET,
+                cache: Optional[EdgeCache] = None, allowed_origins: Optional[Iterable[str]] = None) -> ThreadingHTTPServer:
+    """
+    Build the proxy; call serve_forever() on it (or run it in a thread) and
+    shutdown() to stop. The cache is on `server.cache`. Cached responses get
+    CORS headers for `allowed_origins`, or by the backend's policy when that
+    is None. Raises OSError if the port is taken.
+    """
+    cache = cache or EdgeCache()
+    origins = frozenset(allowed_origins) if allowed_origins is not None else backend_allowed_origins()
+    handler = type("EdgeRequestHandler", (_EdgeRequestHandler,),
+                   {"cache": cache, "upstream": _Upstream(target), "allowed_origins": origins})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.cache = cache
+    return server
+
+
+def fetch_stats(url: str = DEFAULT_URL, timeout: float = 2.0) -> Optional[Dict[str, Any]]:
+    """Stats from a running proxy, or None when it isn't reachable."""
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/__edge/stats", timeout=timeout) as response:
+            return json.loads(response.read())
+    except (OSError, ValueError):
+        return None
+
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    return (f"{stats['hitRate']:.1%} hit rate · {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['coalesced']} coalesced, {stats['notModified']} 304s · {stats['entries']} entries "
+            f"({stats['usedBytes'] / 1024:.0f} KiB) · {stats['invalidations']} invalidations")
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, target: str = DEFAULT_TARGET, cache: Optional[EdgeCache] = None):
+    server = make_server(host, port, target, cache)
+
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, interrupt)
+    print(f"Edge cache listening on http://{host}:{port} -> {target} (TTL {server.cache.ttl:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(format_stats(server.cache.stats()))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Caching edge proxy for GET /api/chatbot/:botId")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="Run the proxy in front of the backend")
+    p_serve.add_argument("--host", default=DEFAULT_HOST, help="0.0.0.0 to accept outside traffic")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument("--target", default=DEFAULT_TARGET, help="Backend base URL")
+    p_serve.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="Seconds a cached config stays fresh")
+    p_serve.add_argument("--max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024))
+    p_serve.add_argument("--max-entries", type=int, default=DEFAULT_MAX_ENTRIES)
+
+    p_stats = sub.add_parser("stats", help="Print a running proxy's counters")
+    p_stats.add_argument("--url", default=DEFAULT_URL)
+
+    p_purge = sub.add_parser("purge", help="Drop one bot (or everything) from a running proxy")
+    p_purge.add_argument("bot", nargs="?")
+    p_purge.add_argument("--url", default=DEFAULT_URL)
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        if args.ttl <= 0:
+            parser.error("--ttl must be positive")
+        serve(args.host, args.port, args.target, EdgeCache(args.ttl, args.max_mb * 1024 * 1024, args.max_entries))
+        return 0
+
+    if args.command == "stats":
+        stats = fetch_stats(args.url)
+        if stats is None:
+            print(f"No edge cache at {args.url}", file=sys.stderr)
+            return 1
+        print(json.dumps(stats, indent=2))
+        return 0
+
+    query = f"?bot={args.bot}" if args.bot else ""
+    request = urllib.request.Request(f"{args.url.rstrip('/')}/__edge/purge{query}", method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            print(f"Purged {json.loads(response.read())['purged']} entries")
+    except (OSError, ValueError) as e:
+        print(f"Purge failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+"""
+Local embedding cache for the Chatbot Builder backend.
+
+Embeddings are keyed by (model, normalized text hash) and stored as float32
+vectors in memory-mapped slab files, one slab per (model, dimension) pair.
+Entries are evicted least-recently-used once the live vectors exceed the
+configured size cap.
+
+Usage:
+    python embedding_cache.py serve [--port 5055] [--max-mb 512]
+    python embedding_cache.py stats
+
+The backend talks to `serve` over localhost when EMBEDDING_CACHE_URL is set
+(e.g. http://127.0.0.1:5055).
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import signal
+import sys
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# ------------------------------
+# Configuration
+# ------------------------------
+CACHE_DIR = Path(__file__).resolve().parent / "cache" / "embeddings"
+INDEX_FILE = "index.json"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5055
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+FLUSH_INTERVAL = 30  # seconds between index writes while serving
+
+SLAB_GROWTH = 1024  # slots added each time a slab file grows
+KEY_TAG_SIZE = 8  # leading key-digest bytes stored with each vector
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+# ------------------------------
+# Helpers
+# ------------------------------
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: NFKC, collapsed whitespace, trimmed."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def cache_key(model: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).digest()
+
+
+def _slab_name(model: str, dim: int) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", model)
+    return f"{safe}_{dim}.f32"
+
+
+class _Slab:
+    """Fixed-width records of one (model, dim) pair in a growable mmap file."""
+
+    def __init__(self, path: Path, model: str, dim: int, next_slot: int = 0):
+        self.path = path
+        self.model = model
+        self.dim = dim
+        self.record_size = KEY_TAG_SIZE + dim * 4
+        self.next_slot = next_slot
+        self.free: List[int] = []
+
+        if not path.exists():
+            path.touch()
+        self._fh = path.open("r+b")
+        self.capacity = os.path.getsize(path) // self.record_size
+        self._map: Optional[mmap.mmap] = None
+        if self.capacity:
+            self._map = mmap.mmap(self._fh.fileno(), 0)
+
+    def allocate(self) -> int:
+        if self.free:
+            return self.free.pop()
+        if self.next_slot >= self.capacity:
+            self._grow()
+        slot = self.next_slot
+        self.next_slot += 1
+        return slot
+
+    def _grow(self):
+        if self._map is not None:
+            self._map.close()
+        self.capacity += SLAB_GROWTH
+        self._fh.truncate(self.capacity * self.record_size)
+        self._map = mmap.mmap(self._fh.fileno(), 0)
+
+    def read(self, slot: int, key: bytes) -> Optional[List[float]]:
+        offset = slot * self.record_size
+        if self._map is None or offset + self.record_size > len(self._map):
+            return None
+        # The tag guards against a slot reused after the index was last saved
+        if self._map[offset:offset + KEY_TAG_SIZE] != key[:KEY_TAG_SIZE]:
+            return None
+        vec = array("f")
+        vec.frombytes(self._map[offset + KEY_TAG_SIZE:offset + self.record_size])
+        return vec.tolist()
+
+    def write(self, slot: int, key: bytes, vector: List[float]):
+        offset = slot * self.record_size
+        self._map[offset:offset + self.record_size] = key[:KEY_TAG_SIZE] + array("f", vector).tobytes()
+
+    def flush(self):
+        if self._map is not None:
+            self._map.flush()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._fh.close()
+
+
+# ------------------------------
+# Cache
+# ------------------------------
+
+class EmbeddingCache:
+    """
+    Content-addressed, size-capped LRU cache of embedding vectors.
+
+    The size cap bounds the bytes held by live vectors; slab files keep their
+    high-water size so freed slots can be reused without remapping.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._slabs: Dict[str, _Slab] = {}
+        # key -> (slab name, slot); ordered oldest -> most recently used
+        self._entries: "OrderedDict[bytes, Tuple[str, int]]" = OrderedDict()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.dirty = False
+
+        self._load_index()
+
+    # --- persistence ---
+
+    def _load_index(self):
+        index_path = self.cache_dir / INDEX_FILE
+        if not index_path.exists():
+            return
+        try:
+            data = json.loads(index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+
+        for name, info in data.get("slabs", {}).items():
+            self._slabs[name] = _Slab(self.cache_dir / name, info["model"], info["dim"], info["next_slot"])
+
+        used: Dict[str, set] = {name: set() for name in self._slabs}
+        for key_hex, name, slot in data.get("entries", []):
+            slab = self._slabs.get(name)
+            if slab is None or slot >= slab.next_slot:
+                continue
+            self._entries[bytes.fromhex(key_hex)] = (name, slot)
+            used[name].add(slot)
+            self.used_bytes += slab.record_size
+
+        for name, slab in self._slabs.items():
+            slab.free = [s for s in range(slab.next_slot) if s not in used[name]]
+
+        self._evict()
+
+    def flush(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            data = {
+                "version": 1,
+                "slabs": {
+                    name: {"model": s.model, "dim": s.dim, "next_slot": s.next_slot}
+                    for name, s in self._slabs.items()
+                },
+                "entries": [[key.hex(), name, slot] for key, (name, slot) in self._entries.items()],
+            }
+            for slab in self._slabs.values():
+                slab.flush()
+            index_path = self.cache_dir / INDEX_FILE
+            tmp_path = index_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp_path, index_path)
+            self.dirty = False
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            for slab in self._slabs.values():
+                slab.close()
+            self._slabs.clear()
+
+    # --- lookups ---
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        results: List[Optional[List[float]]] = []
+        with self._lock:
+            for text in texts:
+                key = cache_key(model, text)
+                entry = self._entries.get(key)
+                vector = None
+                if entry is not None:
+                    vector = self._slabs[entry[0]].read(entry[1], key)
+                    if vector is None:
+                        self._drop(key)
+                    else:
+                        self._entries.move_to_end(key)
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                results.append(vector)
+        return results
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text])[0]
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> int:
+        stored = 0
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                if not vector:
+                    continue
+                key = cache_key(model, text)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    continue
+                name = _slab_name(model, len(vector))
+                slab = self._slabs.get(name)
+                if slab is None:
+                    slab = self._slabs[name] = _Slab(self.cache_dir / name, model, len(vector))
+                if slab.record_size > self.max_bytes:
+                    continue
+                self.used_bytes += slab.record_size
+                self._evict()
+                slot = slab.allocate()
+                slab.write(slot, key, vector)
+                self._entries[key] = (name, slot)
+                stored += 1
+            if stored:
+                self.dirty = True
+        return stored
+
+    def put(self, model: str, text: str, vector: List[float]) -> bool:
+        return self.put_many(model, [text], [vector]) == 1
+
+    def _drop(self, key: bytes):
+        name, slot = self._entries.pop(key)
+        slab = self._slabs[name]
+        slab.free.append(slot)
+        self.used_bytes -= slab.record_size
+        self.dirty = True
+
+    def _evict(self):
+        while self.used_bytes > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            per_model: Dict[str, int] = {}
+            for name, _slot in self._entries.values():
+                model = self._slabs[name].model
+                per_model[model] = per_model.get(model, 0) + 1
+            return {
+                "entries": len(self._entries),
+                "usedBytes": self.used_bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "models": per_model,
+            }
+
+
+# ------------------------------
+# HTTP service (localhost only)
+# ------------------------------
+
+class _CacheRequestHandler(BaseHTTPRequestHandler):
+    cache: EmbeddingCache = None  # set by serve()
+
+    def _send_json(self, status: int, payload: Dict[str, object]):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Optional[Dict[str, object]]:
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return None
+        if not isinstance(data, dict) or not isinstance(data.get("model"), str) \
+                or not isinstance(data.get("texts"), list):
+            return None
+        return data
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send_json(200, self.cache.stats())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        data = self._read_json()
+        if data is None:
+            self._send_json(400, {"error": "Expected JSON with 'model' and 'texts'"})
+            return
+
+        if self.path == "/lookup":
+            self._send_json(200, {"embeddings": self.cache.get_many(data["model"], data["texts"])})
+        elif self.path == "/store":
+            vectors = data.get("embeddings") or []
+            if len(vectors) != len(data["texts"]):
+                self._send_json(400, {"error": "'texts' and 'embeddings' differ in length"})
+                return
+            self._send_json(200, {"stored": self.cache.put_many(data["model"], data["texts"], vectors)})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def log_message(self, format, *args):
+        pass  # keep the console quiet; the backend logs its own failures
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, cache_dir: Path = CACHE_DIR,
+          max_bytes: int = DEFAULT_MAX_BYTES):
+    cache = EmbeddingCache(cache_dir, max_bytes)
+    handler = type("CacheRequestHandler", (_CacheRequestHandler,), {"cache": cache})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    stop = threading.Event()
+
+    def flush_loop():
+        while not stop.wait(FLUSH_INTERVAL):
+            cache.flush()
+
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    threading.Thread(target=flush_loop, daemon=True).start()
+    signal.signal(signal.SIGTERM, interrupt)
+    print(f"Embedding cache listening on http://{host}:{port} ({cache_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        cache.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Local embedding cache for the Chatbot Builder backend")
+    parser.add_argument("--dir", type=Path, default=CACHE_DIR, help="Cache directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="Run the localhost cache service")
+    p_serve.add_argument("--host", default=DEFAULT_HOST)
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument("--max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                         help="Size cap for cached vectors, in MiB")
+
+    sub.add_parser("stats", help="Print entry counts for the on-disk cache")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(args.host, args.port, args.dir, args.max_mb * 1024 * 1024)
+    else:
+        cache = EmbeddingCache(args.dir, sys.maxsize)
+        print(json.dumps(cache.stats(), indent=2))
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
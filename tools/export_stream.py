@@ -0,0 +1,413 @@
+"""
+Streaming lead and conversation export.
+
+Pages through each bot's leads and conversations and appends them to
+CSV or JSONL as it goes, so memory stays flat however large a bot is.
+Many bots are exported in parallel by a bounded worker pool, and every
+page is checkpointed so an interrupted run picks up where it stopped.
+
+Sources:
+    api      the backend's cursor-paginated endpoints (needs --token)
+    mongodb  keyset queries on (createdAt, _id), newest first, like the API
+    nedb     the backend/data datafiles (file order; resumes only while the
+             datafile is unchanged, otherwise that bot starts over)
+
+Usage:
+    python export_stream.py --bots BOT [BOT ...] [--source auto|mongodb|nedb|api]
+    python export_stream.py --all [--kinds leads conversations] [--format csv|jsonl] [--workers 4]
+    python export_stream.py --all --source api --api-url http://localhost:5000 --token JWT
+    python export_stream.py ... --restart      (ignore saved progress)
+"""
+import argparse
+import base64
+import csv
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from datastore import iter_documents, nedb_path, open_mongo, parse_nedb_line, resolve_source
+
+# ------------------------------
+# Configuration
+# ------------------------------
+EXPORT_DIR = Path(__file__).resolve().parent / "exports" / "stream"
+DEFAULT_API_URL = "http://localhost:5000"
+PAGE_SIZE = 100  # the API's maximum page size
+KINDS = ("leads", "conversations")
+
+LEAD_COLUMNS = ["leadId", "botId", "sessionId", "name", "email", "phone", "status", "qualityScore",
+                "interestedIn", "preferredLocation", "propertyType", "budget", "source", "notes",
+                "messageCount", "createdAt", "updatedAt"]
+MESSAGE_COLUMNS = ["conversationId", "botId", "sessionId", "conversationCreatedAt", "index",
+                   "type", "content", "timestamp"]
+
+Page = Tuple[List[Dict[str, Any]], Optional[str]]  # (documents, next cursor or None when finished)
+
+
+# ------------------------------
+# Serialisation
+# ------------------------------
+
+def _plain(value: Any) -> Any:
+    """JSON-friendly copy: datetimes as ISO-8601 UTC, ObjectIds as strings."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    return "" if value is None else value
+
+
+def csv_rows(kind: str, doc: Dict[str, Any]) -> Iterator[List[Any]]:
+    """Leads are one row each; conversations are one row per message."""
+    if kind == "leads":
+        row = dict(doc, messageCount=len(doc.get("messages") or []))
+        yield [_cell(row.get(column)) for column in LEAD_COLUMNS]
+        return
+    for index, message in enumerate(doc.get("messages") or []):
+        yield [_cell(v) for v in (doc.get("_id"), doc.get("botId"), doc.get("sessionId"), doc.get("createdAt"),
+                                  index, message.get("type"), message.get("content"), message.get("timestamp"))]
+
+
+def columns(kind: str) -> List[str]:
+    return LEAD_COLUMNS if kind == "leads" else MESSAGE_COLUMNS
+
+
+# ------------------------------
+# Pagers
+# ------------------------------
+# A pager takes the saved cursor (None for a fresh start) and yields pages.
+
+def _encode_cursor(doc: Dict[str, Any]) -> str:
+    created = doc.get("createdAt")
+    millis = int(created.timestamp() * 1000) if isinstance(created, datetime) else 0
+    raw = json.dumps({"t": millis, "id": str(doc["_id"])}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+
+
+def mongo_pager(db, bot_id: str, kind: str, page_size: int = PAGE_SIZE) -> Callable[[Optional[str]], Iterator[Page]]:
+    """Keyset pages on (createdAt, _id) descending; each page is one indexed query."""
+    def pages(cursor: Optional[str]) -> Iterator[Page]:
+        from bson import ObjectId
+
+        while True:
+            query: Dict[str, Any] = {"botId": bot_id}
+            if cursor:
+                key = _decode_cursor(cursor)
+                created = datetime.fromtimestamp(key["t"] / 1000, tz=timezone.utc)
+                last_id = ObjectId(key["id"]) if ObjectId.is_valid(key["id"]) else key["id"]
+                query["$or"] = [{"createdAt": {"$lt": created}},
+                                {"createdAt": created, "_id": {"$lt": last_id}}]
+            docs = list(db[kind].find(query).sort([("createdAt", -1), ("_id", -1)]).limit(page_size + 1))
+            more = len(docs) > page_size
+            docs = docs[:page_size]
+            cursor = _encode_cursor(docs[-1]) if more else None
+            yield docs, cursor
+            if not more:
+                return
+    return pages
+
+
+def _nedb_signature(kind: str) -> str:
+    try:
+        stat = nedb_path(kind).stat()
+    except OSError:
+        return "missing"
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+_nedb_indexes: Dict[str, Tuple[str, Dict[str, List[int]]]] = {}
+_nedb_lock = threading.Lock()
+
+
+def _nedb_index(kind: str) -> Tuple[str, Dict[str, List[int]]]:
+    """
+    botId -> file offsets of that bot's live documents, built in one pass
+    and shared by every worker, so N bots cost one scan rather than N.
+    """
+    with _nedb_lock:
+        signature = _nedb_signature(kind)
+        cached = _nedb_indexes.get(kind)
+        if cached and cached[0] == signature:
+            return cached
+
+        latest: Dict[Any, Optional[Tuple[int, Any]]] = {}
+        path = nedb_path(kind)
+        if path.exists():
+            with path.open("rb") as f:
+                offset = 0
+                for raw in f:
+                    line_offset, offset = offset, offset + len(raw)
+                    try:
+                        doc = json.loads(raw)
+                    except ValueError:
+                        continue
+                    if isinstance(doc, dict) and "_id" in doc:
+                        latest[doc["_id"]] = None if doc.get("$$deleted") else (line_offset, doc.get("botId"))
+
+        by_bot: Dict[str, List[int]] = {}
+        for entry in latest.values():
+            if entry:
+                by_bot.setdefault(entry[1], []).append(entry[0])
+        for offsets in by_bot.values():
+            offsets.sort()
+        _nedb_indexes[kind] = (signature, by_bot)
+        return signature, by_bot
+
+
+def nedb_pager(bot_id: str, kind: str, page_size: int = PAGE_SIZE) -> Callable[[Optional[str]], Iterator[Page]]:
+    """
+    Datafile order, with "<signature>|<documents done>" as the cursor. NeDB
+    keeps no sort index on disk, so a resume is only exact while the file is
+    unchanged; otherwise the pager raises StaleCursor and the bot restarts.
+    """
+    def pages(cursor: Optional[str]) -> Iterator[Page]:
+        signature, by_bot = _nedb_index(kind)
+        skip = 0
+        if cursor:
+            saved, _, done = cursor.rpartition("|")
+            if saved != signature:
+                raise StaleCursor(f"{kind}.db changed since the last run")
+            skip = int(done)
+
+        offsets = by_bot.get(bot_id, [])
+        if skip >= len(offsets):
+            yield [], None
+            return
+        with nedb_path(kind).open("rb") as f:
+            for start in range(skip, len(offsets), page_size):
+                page = []
+                for line_offset in offsets[start:start + page_size]:
+                    f.seek(line_offset)
+                    page.append(parse_nedb_line(f.readline()))
+                done = start + len(page)
+                yield page, f"{signature}|{done}" if done < len(offsets) else None
+    return pages
+
+
+def api_pager(bot_id: str, kind: str, api_url: str, token: str,
+              page_size: int = PAGE_SIZE) -> Callable[[Optional[str]], Iterator[Page]]:
+    """GET /api/chatbot/:botId/{leads,conversations}?cursor=, backing off on 429."""
+    def pages(cursor: Optional[str]) -> Iterator[Page]:
+        import requests
+
+        url = f"{api_url.rstrip('/')}/api/chatbot/{bot_id}/{kind}"
+        with requests.Session() as session:
+            session.headers["Authorization"] = f"Bearer {token}"
+            while True:
+                response = _get_with_retry(session, url, {"cursor": cursor or "", "limit": page_size})
+                body = response.json()
+                cursor = body.get("nextCursor")
+                yield body.get(kind) or [], cursor
+                if not cursor:
+                    return
+    return pages
+
+
+def _get_with_retry(session, url: str, params: Dict[str, Any], attempts: int = 5):
+    for attempt in range(attempts):
+        response = session.get(url, params=params, timeout=30)
+        if response.status_code != 429 and response.status_code < 500:
+            break
+        retry_after = response.headers.get("Retry-After", "")
+        time.sleep(float(retry_after) if retry_after.isdigit() else min(30, 2 ** attempt))
+    if response.status_code != 200:
+        try:
+            message = response.json().get("error")
+        except ValueError:
+            message = response.text[:200]
+        raise RuntimeError(f"{url} -> {response.status_code}: {message}")
+    return response
+
+
+class StaleCursor(Exception):
+    """Saved progress no longer matches the source; the export must restart."""
+
+
+# ------------------------------
+# Export with checkpoints
+# ------------------------------
+
+def _load_state(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(path: Path, state: Dict[str, Any]):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def export_one(bot_id: str, kind: str, pager: Callable[[Optional[str]], Iterator[Page]], source: str,
+               out_dir: Path, fmt: str = "csv", restart: bool = False,
+               log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """
+    Export one bot's leads or conversations to <out_dir>/<bot>/<kind>.<fmt>.
+
+    After each page the file is flushed and <kind>.<fmt>.state.json records
+    the byte length and the cursor of the next page. A resumed run cuts the
+    file back to that length (dropping any half-written page) and continues
+    from the cursor.
+    """
+    bot_dir = out_dir / bot_id
+    bot_dir.mkdir(parents=True, exist_ok=True)
+    out_path = bot_dir / f"{kind}.{fmt}"
+    state_path = bot_dir / f"{kind}.{fmt}.state.json"
+
+    state = None if restart else _load_state(state_path)
+    if state and state.get("done"):
+        return dict(state, skipped=True)
+    if state and (state.get("source") != source or not out_path.exists()):
+        state = None
+    if state is None:
+        state = {"botId": bot_id, "kind": kind, "format": fmt, "source": source, "cursor": None,
+                 "bytes": 0, "documents": 0, "rows": 0, "done": False, "startedAt": _plain(datetime.now(timezone.utc))}
+
+    started = time.perf_counter()
+    try:
+        _write_pages(out_path, state_path, state, pager)
+    except StaleCursor as e:
+        log(f"{bot_id}/{kind}: {e}; starting over")
+        state.update(cursor=None, bytes=0, documents=0, rows=0)
+        _write_pages(out_path, state_path, state, pager)
+
+    state["seconds"] = round(time.perf_counter() - started, 3)
+    _save_state(state_path, state)
+    log(f"{bot_id}/{kind}: {state['documents']} documents, {state['rows']} rows -> {out_path}")
+    return dict(state, path=str(out_path))
+
+
+def _write_pages(out_path: Path, state_path: Path, state: Dict[str, Any], pager):
+    kind, fmt = state["kind"], state["format"]
+    mode = "r+b" if state["bytes"] and out_path.exists() else "wb"
+    with out_path.open(mode) as raw:
+        raw.truncate(state["bytes"])
+        raw.seek(state["bytes"])
+        text = io.TextIOWrapper(raw, encoding="utf-8", newline="", write_through=True)
+        writer = csv.writer(text) if fmt == "csv" else None
+        if writer and not state["bytes"]:
+            writer.writerow(columns(kind))
+
+        for docs, next_cursor in pager(state["cursor"]):
+            for doc in docs:
+                if writer:
+                    for row in csv_rows(kind, _plain(doc)):
+                        writer.writerow(row)
+                        state["rows"] += 1
+                else:
+                    text.write(json.dumps(_plain(doc), ensure_ascii=False, separators=(",", ":")) + "\n")
+                    state["rows"] += 1
+            state["documents"] += len(docs)
+            text.flush()
+            state.update(bytes=raw.tell(), cursor=next_cursor, done=next_cursor is None)
+            _save_state(state_path, state)
+        text.detach()
+
+
+def list_bots(source: str, api_url: str = DEFAULT_API_URL, token: str = "") -> List[str]:
+    if source == "api":
+        import requests
+
+        response = requests.get(f"{api_url.rstrip('/')}/api/chatbot/user/list",
+                                headers={"Authorization": f"Bearer {token}"}, timeout=30)
+        response.raise_for_status()
+        return [bot["botId"] for bot in response.json().get("chatbots", [])]
+    return [doc["botId"] for doc in iter_documents("chatbots", source) if doc.get("botId")]
+
+
+def export_bots(bot_ids: List[str], kinds: Tuple[str, ...] = KINDS, source: str = "auto",
+                out_dir: Path = EXPORT_DIR, fmt: str = "csv", workers: int = 4, restart: bool = False,
+                api_url: str = DEFAULT_API_URL, token: str = "",
+                log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Export every (bot, kind) pair on at most `workers` threads; returns {source, seconds, results, failed}."""
+    if source != "api":
+        source = resolve_source(source)
+    lock = threading.Lock()
+
+    def safe_log(message: str):
+        with lock:
+            log(message)
+
+    # One MongoClient (it pools connections and is thread-safe) for all workers
+    client, db = open_mongo() if source == "mongodb" else (None, None)
+
+    def pager_for(bot_id: str, kind: str):
+        if source == "api":
+            return api_pager(bot_id, kind, api_url, token)
+        return mongo_pager(db, bot_id, kind) if source == "mongodb" else nedb_pager(bot_id, kind)
+
+    started = time.perf_counter()
+    results, failed = [], []
+    try:
+        pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        with pool:
+            futures = {
+                pool.submit(export_one, bot_id, kind, pager_for(bot_id, kind), source, Path(out_dir), fmt, restart, safe_log): (bot_id, kind)
+                for bot_id in bot_ids for kind in kinds
+            }
+            for future in as_completed(futures):
+                bot_id, kind = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    failed.append({"botId": bot_id, "kind": kind, "error": str(e)})
+                    safe_log(f"{bot_id}/{kind}: failed ({e}); rerun to resume")
+    finally:
+        if client:
+            client.close()
+
+    elapsed = time.perf_counter() - started
+    log(f"Exported {len(results)} of {len(futures)} streams from {source} in {elapsed:.2f}s")
+    return {"source": source, "seconds": round(elapsed, 3), "results": results, "failed": failed}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Stream leads and conversations to CSV/JSONL")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--bots", nargs="+", metavar="BOT_ID")
+    target.add_argument("--all", action="store_true", help="Every bot in the store (or every bot of the token's user)")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--source", choices=["auto", "mongodb", "nedb", "api"], default="auto")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--workers", type=int, default=4, help="Bots exported at the same time")
+    parser.add_argument("--out", type=Path, default=EXPORT_DIR)
+    parser.add_argument("--restart", action="store_true", help="Ignore saved progress")
+    parser.add_argument("--api-url", default=os.environ.get("CHATBOT_API_URL", DEFAULT_API_URL))
+    parser.add_argument("--token", default=os.environ.get("CHATBOT_API_TOKEN", ""), help="JWT for --source api (or CHATBOT_API_TOKEN)")
+    args = parser.parse_args(argv)
+
+    if args.source == "api" and not args.token:
+        parser.error("--source api needs --token or CHATBOT_API_TOKEN")
+    bots = args.bots or list_bots(args.source, args.api_url, args.token)
+    result = export_bots(bots, args.kinds, args.source, args.out, args.format, args.workers,
+                         args.restart, args.api_url, args.token)
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,538 @@
+"""
+MongoDB fault-injection proxy.
+
+A TCP proxy between the backend and mongod (127.0.0.1:27018 -> 27017 by
+default) that injects latency, bandwidth caps, connection resets and
+blackholes, either by hand or on a timed schedule. Run alongside the
+traffic replayer (traffic.py) it reports latency and error curves for
+every fault phase, which shows how requests behave when MongoDB gets slow
+or flaps at runtime rather than only at startup.
+
+The backend only goes through the proxy when its MONGODB_URI points at
+it: the control panel and `run --start-server` pass the rewritten URI
+(see server_overrides) when they start the server. mongodb+srv:// URIs
+can't be proxied. They also lift the /api/ rate limit, which would
+otherwise answer most of the load with 429s before it ever reaches
+MongoDB; phases where that still happens are flagged in the report.
+
+Faults:
+    none                    pass traffic through
+    latency  ms, jitter     delay every chunk, each direction
+    bandwidth  kbps         cap throughput per connection and direction
+    reset                   reset every open connection and refuse new ones
+    flap  every             reset every open connection each `every` seconds
+    blackhole               stall every connection (nothing passes) until the fault clears
+
+Usage:
+    python fault_proxy.py proxy [--listen 127.0.0.1:27018] [--upstream 127.0.0.1:27017] [--fault latency --ms 200]
+    python fault_proxy.py run [--schedule standard|quick|FILE.json] (--capture FILE [--speed 5] | --bot BOT_ID [--rate 20])
+                              [--target http://localhost:5000] [--start-server]
+    python fault_proxy.py uri       (MONGODB_URI that goes through the proxy)
+"""
+import argparse
+import csv
+import json
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import traffic
+
+# ------------------------------
+# Configuration
+# ------------------------------
+DEFAULT_LISTEN = ("127.0.0.1", 27018)
+DEFAULT_UPSTREAM = ("127.0.0.1", 27017)
+RESULTS_DIR = Path(__file__).resolve().parent / "exports" / "faults"
+RATE_LIMIT_MAX = 1_000_000  # per window, per client, while an experiment runs
+RATE_LIMITED_SHARE = 0.5  # a phase mostly answered with 429s measured the limiter, not the fault
+FAULT_KINDS = ("none", "latency", "bandwidth", "reset", "flap", "blackhole")
+
+# (phase name, fault kind, seconds, parameters)
+SCHEDULES: Dict[str, List[Tuple[str, str, float, Dict[str, Any]]]] = {
+    "standard": [
+        ("baseline", "none", 20, {}),
+        ("latency 100ms", "latency", 30, {"ms": 100, "jitter": 20}),
+        ("latency 1s", "latency", 30, {"ms": 1000}),
+        ("recovery", "none", 15, {}),
+        ("bandwidth 64kbps", "bandwidth", 30, {"kbps": 64}),
+        ("recovery", "none", 15, {}),
+        ("flap every 5s", "flap", 30, {"every": 5}),
+        ("recovery", "none", 15, {}),
+        ("blackhole", "blackhole", 30, {}),
+        ("recovery", "none", 30, {}),
+    ],
+    "quick": [
+        ("baseline", "none", 5, {}),
+        ("latency 250ms", "latency", 10, {"ms": 250}),
+        ("reset", "reset", 5, {}),
+        ("blackhole", "blackhole", 10, {}),
+        ("recovery", "none", 10, {}),
+    ],
+}
+
+
+def proxied_uri(uri: str, listen: Tuple[str, int] = DEFAULT_LISTEN) -> str:
+    """`uri` with its host(s) replaced by the proxy, connecting directly (no replica set discovery)."""
+    parts = urlsplit(uri)
+    if parts.scheme != "mongodb":
+        raise ValueError("only mongodb:// URIs can be proxied (not mongodb+srv://)")
+    credentials = parts.netloc.rpartition("@")[0]
+    netloc = f"{credentials}@" if credentials else ""
+    netloc += f"{listen[0]}:{listen[1]}"
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k not in ("replicaSet", "directConnection")]
+    query.append(("directConnection", "true"))
+    return urlunsplit((parts.scheme, netloc, parts.path, urlencode(query), parts.fragment))
+
+
+def server_overrides(uri: str, listen: Tuple[str, int] = DEFAULT_LISTEN) -> Dict[str, str]:
+    """Backend environment for an experiment: MongoDB through the proxy, no rate limit in the way."""
+    return {
+        "MONGODB_URI": proxied_uri(uri, listen),
+        # Replayed clients arrive via X-Forwarded-For from loopback
+        "TRUST_PROXY": "loopback",
+        "RATE_LIMIT_MAX": str(RATE_LIMIT_MAX),
+    }
+
+
+# ------------------------------
+# Proxy
+# ------------------------------
+
+class FaultProxy:
+    """Threaded TCP proxy whose behaviour follows the current fault."""
+
+    def __init__(self, listen: Tuple[str, int] = DEFAULT_LISTEN, upstream: Tuple[str, int] = DEFAULT_UPSTREAM,
+                 log: Callable[[str], None] = print):
+        self.listen = listen
+        self.upstream = upstream
+        self.log = log
+        self.fault: Dict[str, Any] = {"kind": "none"}
+        self.stats = {"connections": 0, "active": 0, "resets": 0, "refused": 0, "bytesUp": 0, "bytesDown": 0}
+        self._lock = threading.Lock()
+        self._sockets: set = set()
+        self._reset: set = set()  # sockets being aborted: their peers must see a RST, not a FIN
+        self._server: Optional[socket.socket] = None
+        self._running = threading.Event()
+
+    # Lifecycle
+
+    def start(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(self.listen)
+        server.listen(128)
+        self._server = server
+        self._running.set()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        self.log(f"Fault proxy {self.listen[0]}:{self.listen[1]} -> {self.upstream[0]}:{self.upstream[1]}")
+
+    def stop(self):
+        self._running.clear()
+        if self._server:
+            self._server.close()
+        self.reset_all(count=False)
+
+    @property
+    def running(self) -> bool:
+        return self._running.is_set()
+
+    def set_fault(self, kind: str, **params):
+        if kind not in FAULT_KINDS:
+            raise ValueError(f"unknown fault {kind!r}; expected one of {', '.join(FAULT_KINDS)}")
+        self.fault = dict(params, kind=kind)
+        if kind == "reset":
+            self.reset_all()
+
+    def reset_all(self, count: bool = True):
+        """Abort every open connection with a TCP RST."""
+        with self._lock:
+            sockets = list(self._sockets)
+            self._sockets.clear()
+            self._reset.update(sockets)
+        # Blocked pumps wake up and their connection closes; linger 0 makes that close a RST.
+        # Every socket is armed before any pump wakes, since _connect closes both ends together
+        for sock in sockets:
+            _linger0(sock)
+        for sock in sockets:
+            _shutdown(sock)
+        if count and sockets:
+            self._count("resets", len(sockets) // 2)
+            self.log(f"Reset {len(sockets) // 2} connections")
+
+    # Plumbing
+
+    def _accept_loop(self):
+        while self._running.is_set():
+            try:
+                client, _addr = self._server.accept()
+            except OSError:
+                return
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.fault["kind"] == "reset":
+                self._count("refused")
+                _abort(client)
+                continue
+            self._count("connections")
+            threading.Thread(target=self._connect, args=(client,), daemon=True).start()
+
+    def _connect(self, client: socket.socket):
+        self._track(client)
+        self._stall()
+        with self._lock:
+            reset = client not in self._sockets
+        if reset:
+            # Reset while stalled, before it ever reached mongod
+            self._untrack(client)
+            _abort(client)
+            return
+        try:
+            upstream = socket.create_connection(self.upstream, timeout=5)
+        except OSError:
+            self._untrack(client)
+            _abort(client)
+            return
+        upstream.settimeout(None)
+        upstream.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._track(upstream)
+        self._count("active")
+        downstream = threading.Thread(target=self._pump, args=(upstream, client, "bytesDown"), daemon=True)
+        downstream.start()
+        self._pump(client, upstream, "bytesUp")
+        downstream.join()
+        # Closed only once neither pump can touch them, so their fds can't be reused under a pump;
+        # a reset armed linger 0, which turns this close into a RST
+        for sock in (client, upstream):
+            self._untrack(sock)
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._count("active", -1)
+
+    def _stall(self):
+        # A partition rather than a dead peer: nothing moves, and whatever
+        # TCP has buffered is delivered once the route comes back
+        while self.fault["kind"] == "blackhole" and self._running.is_set():
+            time.sleep(0.05)
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _pump(self, src: socket.socket, dst: socket.socket, counter: str):
+        next_send = time.perf_counter()
+        try:
+            while True:
+                data = src.recv(65536)
+                if not data:
+                    break
+                self._stall()
+                fault = self.fault
+                kind = fault["kind"]
+                if kind == "latency":
+                    time.sleep(max(0.0, fault.get("ms", 0) + random.uniform(-1, 1) * fault.get("jitter", 0)) / 1000.0)
+                elif kind == "bandwidth":
+                    # Serialise at the capped rate, carrying debt over between chunks
+                    now = time.perf_counter()
+                    next_send = max(next_send, now) + len(data) * 8 / (fault.get("kbps", 64) * 1000.0)
+                    time.sleep(max(0.0, next_send - now))
+                dst.sendall(data)
+                self._count(counter, len(data))
+        except OSError:
+            pass
+        finally:
+            # Wake the opposite pump; _connect closes both once it has stopped. A reset
+            # connection is only woken: a FIN here would reach the peer before the RST
+            with self._lock:
+                how = socket.SHUT_RD if src in self._reset or dst in self._reset else socket.SHUT_RDWR
+            for sock in (src, dst):
+                try:
+                    sock.shutdown(how)
+                except OSError:
+                    pass
+
+    def _track(self, sock: socket.socket):
+        with self._lock:
+            self._sockets.add(sock)
+
+    def _untrack(self, sock: socket.socket):
+        with self._lock:
+            self._sockets.discard(sock)
+            self._reset.discard(sock)
+
+
+def _linger0(sock: socket.socket):
+    """Make the next close() send a RST instead of a FIN."""
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    except OSError:
+        pass
+
+
+def _shutdown(sock: socket.socket):
+    """Arm a RST for the next close() and wake any thread blocked reading the socket.
+
+    Only the read side is shut down: SHUT_WR would send a FIN, and the peer
+    would see a clean EOF before the RST.
+    """
+    _linger0(sock)
+    try:
+        sock.shutdown(socket.SHUT_RD)
+    except OSError:
+        pass
+
+
+def _abort(sock: socket.socket):
+    """Reset a socket no pump is reading."""
+    _shutdown(sock)
+    try:
+        sock.close()
+    except OSError:
+        pass
+
+
+# ------------------------------
+# Schedule and experiment
+# ------------------------------
+
+def load_schedule(name_or_path: str) -> List[Tuple[str, str, float, Dict[str, Any]]]:
+    """A preset name, or a JSON list of {name, fault, seconds, ...params}."""
+    if name_or_path in SCHEDULES:
+        return SCHEDULES[name_or_path]
+    phases = []
+    for item in json.loads(Path(name_or_path).read_text(encoding="utf-8")):
+        params = {k: v for k, v in item.items() if k not in ("name", "fault", "seconds")}
+        phases.append((item.get("name") or item["fault"], item["fault"], float(item["seconds"]), params))
+    return phases
+
+
+def run_schedule(proxy: FaultProxy, schedule, stop_event: threading.Event,
+                 log: Callable[[str], None] = print) -> List[Dict[str, Any]]:
+    """Apply each phase in turn; returns the phases with their wall-clock start and end."""
+    timeline = []
+    for name, kind, seconds, params in schedule:
+        if stop_event.is_set():
+            break
+        started = time.time()
+        log(f"Phase '{name}': {kind} {params or ''} for {seconds:g}s")
+        if kind == "flap":
+            proxy.set_fault("none")
+            every = float(params.get("every", 5))
+            deadline = started + seconds
+            while not stop_event.wait(min(every, max(0.0, deadline - time.time()))) and time.time() < deadline:
+                proxy.reset_all()
+        else:
+            proxy.set_fault(kind, **params)
+            stop_event.wait(seconds)
+        timeline.append({"name": name, "fault": kind, "params": params, "start": started, "end": time.time()})
+    proxy.set_fault("none")
+    return timeline
+
+
+def synthetic_load(path: str, rate: float, seconds: float, seed: int = 7) -> List[Dict[str, Any]]:
+    """Poisson arrivals of GET `path` at `rate` per second, in traffic.py's capture format."""
+    rng = random.Random(seed)
+    records, t = [], 0.0
+    while t < seconds:
+        records.append({"t": t, "method": "GET", "route": traffic.route_of(path), "path": path, "reqBytes": 0,
+                        "client": f"{rng.randrange(1 << 24):06x}"})
+        t += rng.expovariate(rate)
+    return records
+
+
+def loop_capture(records: List[Dict[str, Any]], seconds: float, speed: float) -> List[Dict[str, Any]]:
+    """Repeat a capture until it covers `seconds` of replay time at `speed`."""
+    if not records:
+        return records
+    t0 = records[0]["t"]
+    span = max(records[-1]["t"] - t0, 0.001) + 0.001
+    looped, shift = [], 0.0
+    while shift / speed < seconds:
+        for record in records:
+            at = record["t"] - t0 + shift
+            if at / speed >= seconds:
+                break
+            looped.append(dict(record, t=at))
+        shift += span
+    return looped
+
+
+def phase_report(report: Dict[str, Any], timeline: List[Dict[str, Any]], started_at: float) -> Dict[str, Any]:
+    """Split replay samples by fault phase, plus one-second buckets for the curves."""
+    samples = report["samples"]
+    phases = []
+    for phase in timeline:
+        lo, hi = phase["start"] - started_at, phase["end"] - started_at
+        in_phase = [s for s in samples if lo <= s["offset"] < hi]
+        phases.append(dict(phase, **_bucket_stats(in_phase)))
+
+    by_second: Dict[int, List[Dict[str, Any]]] = {}
+    for sample in samples:
+        by_second.setdefault(int(sample["offset"]), []).append(sample)
+    curve = []
+    if samples:
+        for second in range(max(by_second) + 1):
+            bucket = by_second.get(second, [])
+            name = next((p["name"] for p in timeline if p["start"] - started_at <= second < p["end"] - started_at), "")
+            curve.append(dict(second=second, phase=name, **_bucket_stats(bucket)))
+    return {"phases": phases, "curve": curve}
+
+
+def _bucket_stats(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = sorted(s["latencyMs"] for s in samples)
+    errors = sum(1 for s in samples if not isinstance(s["status"], int) or s["status"] >= 500)
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))], 1) if latencies else None
+
+    return {"requests": len(samples), "errors": errors,
+            "errorRate": round(errors / len(samples), 4) if samples else 0.0,
+            "rateLimited": sum(1 for s in samples if s["status"] == 429),
+            "p50": pct(50), "p95": pct(95), "p99": pct(99), "max": round(latencies[-1], 1) if latencies else None}
+
+
+def run_experiment(proxy: FaultProxy, schedule, records: List[Dict[str, Any]], target: str = traffic.DEFAULT_TARGET,
+                   speed: float = 1.0, concurrency: int = 64, stop_event: Optional[threading.Event] = None,
+                   log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Drive the schedule and the load together; returns the replay report with per-phase results."""
+    stop_event = stop_event or threading.Event()
+    total = sum(phase[2] for phase in schedule)
+    load = loop_capture(records, total, speed)
+    timeline: List[Dict[str, Any]] = []
+
+    started_at = time.time()
+    runner = threading.Thread(target=lambda: timeline.extend(run_schedule(proxy, schedule, stop_event, log)), daemon=True)
+    runner.start()
+    report = traffic.replay(load, target, speed, concurrency, stop_event=stop_event, log=log)
+    stop_event.set()
+    runner.join()
+    report.update(phase_report(report, timeline, started_at))
+    report["proxy"] = dict(proxy.stats)
+    return report
+
+
+def format_phases(report: Dict[str, Any]) -> str:
+    lines = [f"{'phase':<22} {'fault':<10} {'reqs':>6} {'err%':>6} {'429':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"]
+    for p in report["phases"]:
+        lines.append(f"{p['name'][:22]:<22} {p['fault']:<10} {p['requests']:>6} {p['errorRate'] * 100:>5.1f}% "
+                     f"{p['rateLimited']:>5} {p['p50'] or '-':>8} {p['p95'] or '-':>8} {p['p99'] or '-':>8} {p['max'] or '-':>8}")
+    for p in report["phases"]:
+        if p["requests"] and p["rateLimited"] / p["requests"] > RATE_LIMITED_SHARE:
+            lines.append(f"warning: {p['rateLimited'] / p['requests']:.0%} of '{p['name']}' was rate limited (429); "
+                         f"restart the backend with server_overrides() so the load reaches MongoDB")
+    stats = report.get("proxy", {})
+    lines.append(f"proxy: {stats.get('connections', 0)} connections, {stats.get('resets', 0)} reset, "
+                 f"{stats.get('refused', 0)} refused")
+    return "\n".join(lines)
+
+
+def save_results(report: Dict[str, Any], out_dir: Path = RESULTS_DIR) -> Path:
+    """Write <stamp>.json (everything but raw samples) and <stamp>_curve.csv; returns the JSON path."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("faults_%Y%m%d_%H%M%S")
+    json_path = out_dir / f"{stamp}.json"
+    json_path.write_text(json.dumps({k: v for k, v in report.items() if k != "samples"}, indent=2), encoding="utf-8")
+    with (out_dir / f"{stamp}_curve.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["second", "phase", "requests", "errors", "errorRate", "rateLimited",
+                                               "p50", "p95", "p99", "max"])
+        writer.writeheader()
+        writer.writerows(report["curve"])
+    return json_path
+
+
+def _address(value: str, default: Tuple[str, int]) -> Tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    return (host or default[0], int(port or default[1]))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inject MongoDB faults and measure the backend")
+    parser.add_argument("--listen", default=f"{DEFAULT_LISTEN[0]}:{DEFAULT_LISTEN[1]}")
+    parser.add_argument("--upstream", default=f"{DEFAULT_UPSTREAM[0]}:{DEFAULT_UPSTREAM[1]}")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    manual = sub.add_parser("proxy", help="Run the proxy with one fault until interrupted")
+    manual.add_argument("--fault", choices=FAULT_KINDS, default="none")
+    manual.add_argument("--ms", type=float, default=200)
+    manual.add_argument("--jitter", type=float, default=0)
+    manual.add_argument("--kbps", type=float, default=64)
+    manual.add_argument("--every", type=float, default=5)
+
+    run = sub.add_parser("run", help="Run a fault schedule under load and report per phase")
+    run.add_argument("--schedule", default="standard", help="standard, quick, or a JSON file")
+    load = run.add_mutually_exclusive_group(required=True)
+    load.add_argument("--capture", type=Path, help="Traffic capture to replay (looped to cover the schedule)")
+    load.add_argument("--bot", help="Synthetic load: GET /api/chatbot/BOT_ID (reads MongoDB)")
+    run.add_argument("--rate", type=float, default=20, help="Synthetic requests per second")
+    run.add_argument("--speed", type=float, default=1.0, help="Replay speed for --capture")
+    run.add_argument("--target", default=traffic.DEFAULT_TARGET)
+    run.add_argument("--start-server", action="store_true", help="Start the backend through the proxy first")
+
+    sub.add_parser("uri", help="Print MONGODB_URI rewritten to go through the proxy")
+    args = parser.parse_args(argv)
+
+    listen = _address(args.listen, DEFAULT_LISTEN)
+    if args.command == "uri":
+        from datastore import get_mongo_uri
+        print(proxied_uri(get_mongo_uri(), listen))
+        return 0
+
+    schedule = None
+    if args.command == "run":
+        try:
+            schedule = load_schedule(args.schedule)
+        except (OSError, ValueError, KeyError) as exc:
+            parser.error(f"--schedule: {exc}")
+
+    proxy = FaultProxy(listen, _address(args.upstream, DEFAULT_UPSTREAM))
+    proxy.start()
+    if args.command == "proxy":
+        proxy.set_fault(args.fault, ms=args.ms, jitter=args.jitter, kbps=args.kbps, every=args.every)
+        stop = threading.Event()
+        try:
+            if args.fault == "flap":
+                run_schedule(proxy, [("flap", "flap", float("inf"), {"every": args.every})], stop)
+            else:
+                stop.wait()
+        except KeyboardInterrupt:
+            pass
+        proxy.stop()
+        return 0
+
+    server = None
+    if args.start_server:
+        import manager_core as core
+        from datastore import get_mongo_uri
+        server = core.start_server(overrides=server_overrides(get_mongo_uri(), listen))
+        for _ in range(30):
+            if core.check_health(timeout=2)["ok"]:
+                break
+            time.sleep(1)
+        else:
+            print(f"Backend did not become healthy; see {server['log']}", file=sys.stderr)
+    try:
+        if args.capture:
+            records = traffic.load_capture(args.capture)
+        else:
+            records = synthetic_load(f"/api/chatbot/{args.bot}", args.rate, sum(p[2] for p in schedule))
+        report = run_experiment(proxy, schedule, records, args.target, args.speed)
+    finally:
+        proxy.stop()
+        if server:
+            import manager_core as core
+            core.stop_server()
+    print(format_phases(report))
+    print(f"Results: {save_results(report)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+"""
+Synthetic tenant and traffic data generator for scale testing.
+
+Produces users, chatbots with knowledge bases (deterministic fake
+embeddings), leads and conversations at production-like volumes and
+streams them straight into NeDB datafiles or MongoDB, so generation never
+holds the dataset in memory. Traffic is skewed: a few hot bots receive
+most conversations and leads, as on the live platform.
+
+Usage:
+    python generate_test_data.py --users 1000 --bots 10000 --messages 50000000 --target nedb
+    python generate_test_data.py --bots 200 --leads 50000 --target mongodb --overwrite
+
+--append numbers new users, bots, leads and sessions after the highest
+synthetic keys already stored, so repeated runs keep the unique indexes
+intact. Every generated account logs in with the password "synthetic123".
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from datastore import DATA_DIR, nedb_line, open_mongo
+
+# ------------------------------
+# Configuration
+# ------------------------------
+# Unique keys per store; --append continues numbering after the highest one already stored
+KEY_PATTERNS = {
+    "users": r'"email":"synthetic(\d+)@example\.test"',
+    "chatbots": r'"botId":"bot_syn(\d{8})"',
+    "leads": r'"leadId":"lead_syn(\d{10})"',
+    "conversations": r'"sessionId":"sess_syn(\d+)"',
+}
+# bcrypt (cost 10) of "synthetic123"
+PASSWORD_HASH = "$2a$10$hIxzFcqxAbnImy649EQvM.5BAoC8qcT3U6U6aW78ASxUz.5IYv5Q."
+MONGO_BATCH = 1000
+PROGRESS_EVERY = 100_000
+
+WORDS = (
+    "apartment villa plot commercial office rent sale price location parking garden pool "
+    "bedroom bathroom kitchen installment possession transfer society block phase road "
+    "school hospital market mosque park security electricity gas water corner facing "
+    "furnished square yards marla kanal contact visit schedule payment plan booking"
+).split()
+CITIES = ["Lahore", "Karachi", "Islamabad", "Rawalpindi", "Dubai", "Faisalabad", "Multan"]
+PLANS = ["free"] * 6 + ["starter"] * 2 + ["pro", "business"]
+LEAD_STATUSES = ["new"] * 5 + ["contacted"] * 2 + ["qualified", "converted", "lost"]
+USER_LINES = [
+    "Hi, I am looking for a {w1} in {city}",
+    "What is the {w1} of the {w2}?",
+    "Do you have any {w1} near {w2}?",
+    "Can I schedule a visit this week?",
+    "Is {w1} available on {w2} plan?",
+    "Please share your contact number",
+]
+
+
+# ------------------------------
+# Helpers
+# ------------------------------
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    """Unit vector seeded by the text, so the same chunk always embeds the same."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim)
+    vec /= np.linalg.norm(vec)
+    return np.round(vec, 6).tolist()
+
+
+class _Generator:
+    def __init__(self, seed, target: str, start: datetime, days: int):
+        self.rng = np.random.default_rng(seed)
+        self.target = target
+        self.start = start
+        self.span = days * 86400
+
+    def new_id(self) -> Any:
+        raw = self.rng.bytes(12)
+        if self.target == "mongodb":
+            from bson import ObjectId
+            return ObjectId(raw)
+        return raw.hex()[:16]
+
+    def when(self) -> datetime:
+        return self.start + timedelta(seconds=float(self.rng.uniform(0, self.span)))
+
+    def words(self, n: int) -> str:
+        return " ".join(str(w) for w in self.rng.choice(WORDS, size=n))
+
+    def user_line(self) -> str:
+        template = USER_LINES[int(self.rng.integers(len(USER_LINES)))]
+        return template.format(w1=str(self.rng.choice(WORDS)), w2=str(self.rng.choice(WORDS)),
+                               city=str(self.rng.choice(CITIES)))
+
+    def hot_weights(self, n: int) -> np.ndarray:
+        """Pareto-shaped traffic share per bot (a few bots get most of it)."""
+        weights = self.rng.pareto(1.2, size=n) + 1e-3
+        return weights / weights.sum()
+
+
+# ------------------------------
+# Sinks
+# ------------------------------
+
+class _NeDBSink:
+    def __init__(self, path: Path, overwrite: bool):
+        self.path = path
+        self.count = 0
+        self._f = path.open("w" if overwrite else "a", encoding="utf-8", newline="\n")
+
+    def write(self, doc: Dict[str, Any]):
+        self._f.write(nedb_line(doc) + "\n")
+        self.count += 1
+
+    def close(self):
+        self._f.close()
+
+
+class _MongoSink:
+    def __init__(self, db, collection: str, overwrite: bool):
+        self.collection = db[collection]
+        if overwrite:
+            self.collection.delete_many({})
+        self.count = 0
+        self._batch: List[Dict[str, Any]] = []
+
+    def write(self, doc: Dict[str, Any]):
+        self._batch.append(doc)
+        if len(self._batch) >= MONGO_BATCH:
+            self._flush()
+
+    def _flush(self):
+        if self._batch:
+            self.collection.insert_many(self._batch, ordered=False)
+            self.count += len(self._batch)
+            self._batch = []
+
+    def close(self):
+        self._flush()
+
+
+def _has_documents(path: Path) -> bool:
+    if not path.exists():
+        return False
+    with path.open("rb") as f:
+        return any(b'"_id"' in line for line in f)
+
+
+def _nedb_offsets(data_dir: Path) -> Dict[str, int]:
+    """One past the highest synthetic key in each datafile (0 when there is none)."""
+    offsets = {}
+    for store, pattern in KEY_PATTERNS.items():
+        path, regex, top = data_dir / f"{store}.db", re.compile(pattern.encode()), -1
+        if path.exists():
+            with path.open("rb") as f:
+                for line in f:
+                    m = regex.search(line)
+                    if m:
+                        top = max(top, int(m.group(1)))
+        offsets[store] = top + 1
+    return offsets
+
+
+def _mongo_offsets(db) -> Dict[str, int]:
+    """Same as _nedb_offsets(); padded keys are read off their unique index."""
+    def last(collection: str, field: str, prefix: str, width: int) -> int:
+        doc = db[collection].find_one({field: {"$regex": f"^{prefix}\\d{{{width}}}$"}}, {field: 1},
+                                      sort=[(field, -1)])
+        return int(doc[field][len(prefix):]) + 1 if doc else 0
+
+    emails = db["users"].find({"email": {"$regex": r"^synthetic\d+@example\.test$"}}, {"email": 1})
+    return {
+        "users": max((int(d["email"][9:].split("@")[0]) + 1 for d in emails), default=0),
+        "chatbots": last("chatbots", "botId", "bot_syn", 8),
+        "leads": last("leads", "leadId", "lead_syn", 10),
+        # sessionId is not unique, so the count is enough to keep new sessions apart
+        "conversations": db["conversations"].estimated_document_count(),
+    }
+
+
+# ------------------------------
+# Generation
+# ------------------------------
+
+def generate(users: int, bots: int, chunks_per_bot: int, dim: int, leads: int, messages: int,
+             messages_per_conversation: int = 8, days: int = 90, seed: int = 42, target: str = "nedb",
+             data_dir: Path = DATA_DIR, overwrite: bool = False, append: bool = False, log=print) -> Dict[str, int]:
+    stores = ("users", "chatbots", "leads", "conversations")
+    client = None
+    if target == "nedb":
+        data_dir.mkdir(parents=True, exist_ok=True)
+        if not (overwrite or append):
+            busy = [s for s in stores if _has_documents(data_dir / f"{s}.db")]
+            if busy:
+                raise RuntimeError(f"{', '.join(busy)} already contain documents; pass --append or --overwrite")
+        offsets = _nedb_offsets(data_dir) if append else dict.fromkeys(stores, 0)
+        sinks = {s: _NeDBSink(data_dir / f"{s}.db", overwrite) for s in stores}
+    else:
+        client, db = open_mongo()
+        if not (overwrite or append) and any(db[s].estimated_document_count() for s in stores):
+            client.close()
+            raise RuntimeError("MongoDB already contains documents; pass --append or --overwrite")
+        offsets = _mongo_offsets(db) if append else dict.fromkeys(stores, 0)
+        sinks = {s: _MongoSink(db, s, overwrite) for s in stores}
+    if any(offsets.values()):
+        log("Appending after " + ", ".join(f"{offsets[s]:,} {s}" for s in stores))
+
+    # The offsets also move the seed, so an appended run draws fresh _ids
+    gen = _Generator([seed] + [offsets[s] for s in stores], target, datetime.now(timezone.utc) - timedelta(days=days), days)
+    started = time.perf_counter()
+
+    def progress(label: str, n: int):
+        if n and n % PROGRESS_EVERY == 0:
+            log(f"  {label}: {n:,} ({time.perf_counter() - started:.0f}s)")
+
+    try:
+        # Users
+        user_ids: List[str] = []
+        for i in range(offsets["users"], offsets["users"] + users):
+            uid = gen.new_id()
+            user_ids.append(str(uid))
+            created = gen.when()
+            plan = PLANS[int(gen.rng.integers(len(PLANS)))]
+            sinks["users"].write({
+                "_id": uid, "email": f"synthetic{i}@example.test", "password": PASSWORD_HASH,
+                "name": f"Synthetic User {i}", "role": "user", "plan": plan,
+                "chatbotLimit": 50, "conversationLimit": 100000, "messagesUsed": 0,
+                "subscription": {"plan": plan, "status": "active"},
+                "createdAt": created, "lastResetDate": created,
+            })
+            progress("users", len(user_ids))
+        log(f"Users: {users:,}")
+
+        # Chatbots are written after their traffic, so stats.totalMessages can match it
+        bot_ids = [f"bot_syn{i:08d}" for i in range(offsets["chatbots"], offsets["chatbots"] + bots)]
+        bot_owners = [user_ids[int(gen.rng.integers(len(user_ids)))] if user_ids else "synthetic" for _ in bot_ids]
+        sent = np.zeros(bots, dtype=np.int64)
+        if bot_ids:
+            sent = _write_traffic(gen, sinks, bot_ids, bot_owners, leads, messages, messages_per_conversation,
+                                  offsets, progress, log, started)
+
+        # Chatbots with knowledge bases
+        for k, (bot_id, owner) in enumerate(zip(bot_ids, bot_owners)):
+            i = offsets["chatbots"] + k
+            chunks = []
+            for c in range(chunks_per_bot):
+                text = f"{bot_id} chunk {c}: {gen.words(60)}"
+                chunks.append({"text": text, "embedding": fake_embedding(text, dim), "metadata": {"chunkIndex": c}})
+            created = gen.when()
+            sinks["chatbots"].write({
+                "_id": gen.new_id(), "botId": bot_id, "userId": owner, "name": f"Synthetic Bot {i}",
+                "welcomeMessage": "Hello! How can I help you today?",
+                "knowledgeBase": [{"id": f"kb_{bot_id}", "source": "text", "filename": f"{bot_id}.txt",
+                                   "content": "", "chunks": chunks, "uploadedAt": created}] if chunks else [],
+                "stats": {"totalConversations": 0, "totalMessages": int(sent[k]), "leadsGenerated": 0},
+                "isPublished": True, "isActive": True, "createdAt": created, "updatedAt": created,
+            })
+            progress("chatbots", k + 1)
+        log(f"Chatbots: {bots:,} ({bots * chunks_per_bot:,} chunks, dim {dim})")
+    finally:
+        for sink in sinks.values():
+            sink.close()
+        if client is not None:
+            client.close()
+
+    log(f"Done in {time.perf_counter() - started:.1f}s")
+    return {s: sinks[s].count for s in stores}
+
+
+def _write_traffic(gen: _Generator, sinks: Dict[str, Any], bot_ids: List[str], bot_owners: List[str],
+                   leads: int, messages: int, messages_per_conversation: int, offsets: Dict[str, int],
+                   progress, log, started: float) -> np.ndarray:
+    """Write leads and conversations; returns the visitor messages each bot received.
+
+    That is what the chat route counts in stats.totalMessages: one per
+    request, i.e. per user message.
+    """
+    weights = gen.hot_weights(len(bot_ids))
+    sent = np.zeros(len(bot_ids), dtype=np.int64)
+
+    # Leads (each carries a short chat, like the widget's chat route)
+    for i, b in enumerate(gen.rng.choice(len(bot_ids), size=leads, p=weights), start=offsets["leads"]):
+        created = gen.when()
+        msgs, ts = [], created
+        for _ in range(int(gen.rng.integers(1, 4))):
+            msgs.append({"role": "user", "content": gen.user_line(), "timestamp": ts})
+            ts += timedelta(milliseconds=float(gen.rng.lognormal(7.3, 0.5)))
+            msgs.append({"role": "assistant", "content": gen.words(30), "timestamp": ts})
+            ts += timedelta(seconds=float(gen.rng.exponential(30)))
+        sent[b] += len(msgs) // 2
+        captured = gen.rng.random() < 0.4
+        sinks["leads"].write({
+            "_id": gen.new_id(), "leadId": f"lead_syn{i:010d}", "botId": bot_ids[b], "userId": bot_owners[b],
+            "name": f"Visitor {i}", "email": f"visitor{i}@example.test",
+            "phone": f"+92300{int(gen.rng.integers(1000000, 9999999))}",
+            "status": LEAD_STATUSES[int(gen.rng.integers(len(LEAD_STATUSES)))],
+            "qualityScore": int(gen.rng.integers(1, 6)), "sessionId": f"sess_lead{i}",
+            "messages": msgs, "preferredLocation": str(gen.rng.choice(CITIES)),
+            "notificationsSent": {"whatsapp": bool(captured), "email": False, "webhook": False,
+                                  "sentAt": ts if captured else None},
+            "createdAt": created, "updatedAt": ts,
+        })
+        progress("leads", i + 1 - offsets["leads"])
+    log(f"Leads: {leads:,}")
+
+    # Conversations; bots are picked 10k at a time so only one batch of
+    # picks is held in memory
+    written = 0
+    conv = 0
+    first = offsets["conversations"]
+    while written < messages:
+        picks = gen.rng.choice(len(bot_ids), size=10_000, p=weights)
+        for b in picks:
+            if written >= messages:
+                break
+            # Usually at least one exchange; only the last conversation may be cut to a single message
+            n = min(messages - written, max(2, int(gen.rng.poisson(messages_per_conversation))))
+            created = gen.when()
+            msgs, ts = [], created
+            for m in range(n):
+                user = m % 2 == 0
+                msgs.append({"type": "user" if user else "bot",
+                             "content": gen.user_line() if user else gen.words(25), "timestamp": ts})
+                ts += timedelta(milliseconds=float(gen.rng.lognormal(7.3, 0.5))) if user \
+                    else timedelta(seconds=float(gen.rng.exponential(20)))
+            sinks["conversations"].write({
+                "_id": gen.new_id(), "botId": bot_ids[b], "sessionId": f"sess_syn{first + conv}",
+                "messages": msgs, "userInfo": {"ip": "127.0.0.1", "userAgent": "synthetic"},
+                "createdAt": created,
+            })
+            written += n
+            sent[b] += (n + 1) // 2
+            conv += 1
+            if conv % PROGRESS_EVERY == 0:
+                log(f"  conversations: {conv:,} ({written:,} messages, {time.perf_counter() - started:.0f}s)")
+    log(f"Conversations: {conv:,} ({written:,} messages)")
+    return sent
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic tenants and traffic for scale testing")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--bots", type=int, default=500)
+    parser.add_argument("--chunks-per-bot", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension (text-embedding-3-small: 1536)")
+    parser.add_argument("--leads", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=200_000, help="Total conversation messages")
+    parser.add_argument("--messages-per-conversation", type=int, default=8)
+    parser.add_argument("--days", type=int, default=90, help="Spread records over the last N days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--target", choices=["nedb", "mongodb"], default="nedb")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="NeDB datafile directory")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--overwrite", action="store_true", help="Replace existing data")
+    mode.add_argument("--append", action="store_true", help="Add to existing data")
+    args = parser.parse_args(argv)
+
+    try:
+        counts = generate(args.users, args.bots, args.chunks_per_bot, args.dim, args.leads, args.messages,
+                          args.messages_per_conversation, args.days, args.seed, args.target,
+                          args.data_dir, args.overwrite, args.append)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(counts)
+    if args.target == "nedb":
+        print(f"Restart the backend to load the new data from {args.data_dir}{os.sep}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,132 @@
+import argparse
 import requests
+import socket
 import sys
+import threading
 import time
+from urllib.parse import urlparse
+
+import metrics_exporter as metrics
 
 # Configuration
 SERVICES = {
     'Backend API': 'http://localhost:5000/api/health',
     'Frontend (Local)': 'http://localhost:3000', # Assuming standard React/Static port
 }
+MONGO_HOST = ('localhost', 27017)
+
+# One MongoClient per URI for the life of the process, so pings reuse its pooled connection
+_mongo_clients = {}
+_mongo_lock = threading.Lock()
 
-def check_service(name, url):
-    print(f"Checking {name}...", end=" ")
+def check_service(name, url, quiet=False):
+    if not quiet:
+        print(f"Checking {name}...", end=" ")
+    started = time.perf_counter()
+    healthy = False
     try:
         response = requests.get(url, timeout=3)
         if response.status_code == 200:
-            print(f"✅ UP ({response.status_code})")
-            return True
+            message = f"✅ UP ({response.status_code})"
+            healthy = True
         else:
-            print(f"⚠️ WARN ({response.status_code})")
-            return False
+            message = f"⚠️ WARN ({response.status_code})"
     except requests.exceptions.ConnectionError:
-        print(f"❌ DOWN (Connection Refused)")
-        return False
+        message = "❌ DOWN (Connection Refused)"
     except Exception as e:
-        print(f"❌ ERROR ({str(e)})")
-        return False
+        message = f"❌ ERROR ({str(e)})"
+
+    metrics.HEALTH_LATENCY.observe(time.perf_counter() - started, service=name)
+    metrics.HEALTH_UP.set(1 if healthy else 0, service=name)
+    if not quiet:
+        print(message)
+    return healthy
+
+def _mongo_client(uri, timeout):
+    """The process's client for `uri`; a new one is connected with an untimed ping first."""
+    from datastore import open_mongo
+    with _mongo_lock:
+        client = _mongo_clients.get(uri)
+        if client is None:
+            client, _db = open_mongo(uri, timeout_ms=int(timeout * 1000))
+            try:
+                client.admin.command('ping')
+            except Exception:
+                client.close()
+                raise
+            _mongo_clients[uri] = client
+        return client
+
+def ping_mongo(uri=None, timeout=3):
+    """
+    Round-trip time of a MongoDB ping in seconds, or None if unreachable.
+    Uses the server's ping command on a long-lived client when pymongo is
+    installed, so only the round trip is timed (MONGO_PING). Otherwise it
+    times a TCP connect to the MongoDB port, recorded as MONGO_CONNECT.
+    """
+    elapsed = None
+    try:
+        from datastore import get_mongo_uri
+        uri = uri or get_mongo_uri()
+        client = _mongo_client(uri, timeout)
+        started = time.perf_counter()
+        client.admin.command('ping')
+        elapsed = time.perf_counter() - started
+        metrics.MONGO_PING.observe(elapsed)
+    except ImportError:
+        host = MONGO_HOST
+        if uri:
+            parsed = urlparse(uri.split(',')[0])
+            host = (parsed.hostname or MONGO_HOST[0], parsed.port or MONGO_HOST[1])
+        started = time.perf_counter()
+        try:
+            with socket.create_connection(host, timeout=timeout):
+                elapsed = time.perf_counter() - started
+            metrics.MONGO_CONNECT.observe(elapsed)
+        except OSError:
+            pass
+    except Exception:
+        # Unreachable; the cached client reconnects on its own once MongoDB is back
+        pass
+
+    metrics.MONGO_UP.set(0 if elapsed is None else 1)
+    return elapsed
+
+def monitor(interval=15, stop_event=None, services=None):
+    """Check every service and MongoDB each `interval` seconds until stop_event is set."""
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        for name, url in (services or SERVICES).items():
+            check_service(name, url, quiet=True)
+        ping_mongo()
+        stop_event.wait(interval)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chatbot Builder health check")
+    parser.add_argument('--watch', type=int, metavar='SECONDS', help="Keep checking at this interval and serve metrics")
+    parser.add_argument('--metrics-port', type=int, default=metrics.DEFAULT_PORT)
+    args = parser.parse_args()
+
+    if args.watch:
+        metrics.start(port=args.metrics_port)
+        print(f"🏥 Monitoring every {args.watch}s; metrics on http://{metrics.DEFAULT_HOST}:{args.metrics_port}/metrics")
+        try:
+            monitor(args.watch)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
     print("\n🏥 Chatbot Builder - Health Check")
     print("=================================")
-    
+
     all_healthy = True
     for name, url in SERVICES.items():
         if not check_service(name, url):
             all_healthy = False
-            
+
+    ping = ping_mongo()
+    print(f"MongoDB ping: {'❌ unreachable' if ping is None else f'{ping * 1000:.1f}ms'}")
+
     print("\nSummary:")
     if all_healthy:
         print("✅ All systems operational!")
@@ -0,0 +1,237 @@
+"""
+Headless front end for the API manager and control panel operations.
+
+Starts without tkinter or reportlab (both are only imported by the
+commands that need them), never prompts, prints JSON with --json and exits
+non-zero on failure, so it can be driven from scripts and run on many hosts
+at once.
+
+Usage:
+    python manage.py [--json] [--env PATH] env show [--missing] [--reveal]
+    python manage.py env set KEY=VALUE [KEY=VALUE ...]
+    python manage.py env export csv|pdf [--out FILE]
+    python manage.py server start [--inspect] [--wait SECONDS] | stop | status
+    python manage.py db backup [--out DIR] | restore DIR --yes | clear --yes
+    python manage.py admin promote EMAIL [EMAIL ...] [--role admin|user] [--dry-run]
+    python manage.py admin reset-default
+    python manage.py health
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import manager_core as core
+
+
+# ------------------------------
+# Commands (each returns (ok, result))
+# ------------------------------
+
+def cmd_env_show(args) -> tuple:
+    env = core.load_env(args.env)
+    rows = []
+    for item in core.get_merged_config(env):
+        raw = env.get(item["var"], "")
+        if args.missing and raw:
+            continue
+        rows.append({"var": item["var"], "category": item["category"], "required": item["required"],
+                     "present": bool(raw), "value": raw if args.reveal else core.mask_value(raw)})
+    missing = [row["var"] for row in rows if row["required"] and not row["present"]]
+    if not args.json:
+        for row in rows:
+            flag = "*" if row["required"] else " "
+            print(f"{flag} {row['var']:<28} {row['category']:<10} {row['value'] or '-'}")
+    return not missing, {"envPath": str(args.env or core.ENV_PATH), "missingRequired": missing, "vars": rows}
+
+
+def cmd_env_set(args) -> tuple:
+    updates = {}
+    for pair in args.pairs:
+        key, sep, value = pair.partition("=")
+        if not sep or not key.strip():
+            raise core.OperationError(f"Expected KEY=VALUE, got {pair!r}")
+        updates[key.strip()] = value
+    core.write_env(updates, args.env)
+    if not args.json:
+        print(f"Updated {', '.join(updates)} in {args.env or core.ENV_PATH}")
+    return True, {"updated": sorted(updates)}
+
+
+def cmd_env_export(args) -> tuple:
+    out = args.out or core.export_path(args.format)
+    rows = core.collect_rows(args.env)
+    if args.format == "pdf":
+        core.export_pdf(rows, out)
+    else:
+        core.export_csv(rows, out)
+    if not args.json:
+        print(f"{args.format.upper()} exported to {out}")
+    return True, {"path": str(out), "rows": len(rows)}
+
+
+def cmd_server_start(args) -> tuple:
+    result = core.start_server(inspector=args.inspect)
+    if not args.json:
+        print(f"Server started (pid {result['pid']}), logging to {result['log']}")
+    if args.wait:
+        deadline = time.time() + args.wait
+        health: Dict[str, Any] = {}
+        while time.time() < deadline:
+            health = core.check_health(timeout=2)
+            if health["ok"] or not core.read_server_pid():
+                break
+            time.sleep(0.5)
+        result["health"] = health
+        if not args.json:
+            print("Health check: " + ("OK" if health.get("ok") else f"failed ({health.get('error') or health.get('status')})"))
+        return bool(health.get("ok")), result
+    return True, result
+
+
+def cmd_server_stop(args) -> tuple:
+    result = core.stop_server()
+    if not args.json:
+        print(result.get("message") or (f"Server stopped (pid {result['pid']})" if result["stopped"] else f"Server (pid {result['pid']}) did not stop"))
+    return result["stopped"] or "message" in result, result
+
+
+def cmd_server_status(args) -> tuple:
+    result = core.server_status()
+    if not args.json:
+        print(f"Managed process: {result['pid'] or 'none'}")
+        health = result["health"]
+        print(f"Health: {'UP' if health['ok'] else 'DOWN'} ({health.get('status') or health.get('error')}, {health['ms']}ms)")
+    return result["health"]["ok"], result
+
+
+def cmd_db_backup(args) -> tuple:
+    path = core.backup_database(args.out, source=args.source, log=_logger(args))
+    return True, {"path": str(path)}
+
+
+def cmd_db_restore(args) -> tuple:
+    _require_yes(args, "restore replaces all current data")
+    core.restore_database(args.path, source=args.source, log=_logger(args))
+    return True, {"path": str(args.path)}
+
+
+def cmd_db_clear(args) -> tuple:
+    _require_yes(args, "clear deletes all data")
+    core.clear_database(source=args.source, log=_logger(args))
+    return True, {}
+
+
+def cmd_admin_promote(args) -> tuple:
+    from bulk_admin import UNCHANGED, UPDATED, WOULD_UPDATE
+
+    result = core.set_roles(args.emails, args.role, dry_run=args.dry_run, log=_logger(args))
+    if not args.json:
+        for row in result["rows"]:
+            print(f"{row['email']:<40} {row['status']:<12} {row['message']}")
+    ok = all(row["status"] in (UPDATED, UNCHANGED, WOULD_UPDATE) for row in result["rows"])
+    return ok, result
+
+
+def cmd_admin_reset(args) -> tuple:
+    core.reset_default_admin(log=_logger(args))
+    return True, {}
+
+
+def cmd_health(args) -> tuple:
+    from health_check import SERVICES, ping_mongo
+
+    services = {name: core.check_health(url, timeout=3) for name, url in SERVICES.items()}
+    ping = ping_mongo()
+    if not args.json:
+        for name, health in services.items():
+            print(f"{name:<18} {'UP' if health['ok'] else 'DOWN'} ({health.get('status') or health.get('error')})")
+        print(f"{'MongoDB':<18} {'unreachable' if ping is None else f'{ping * 1000:.1f}ms'}")
+    result = {"services": services, "mongoPingMs": None if ping is None else round(ping * 1000, 1)}
+    return services["Backend API"]["ok"], result
+
+
+# ------------------------------
+# Helpers
+# ------------------------------
+
+def _logger(args):
+    # Keep stdout clean for --json consumers
+    return (lambda msg: print(msg, file=sys.stderr)) if args.json else print
+
+
+def _require_yes(args, what: str):
+    if not args.yes:
+        raise core.OperationError(f"Refusing: {what}. Pass --yes to confirm.")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Chatbot Builder operations without the GUI")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON on stdout")
+    parser.add_argument("--env", type=Path, help=f"Path of the .env file (default {core.ENV_PATH})")
+    groups = parser.add_subparsers(dest="group", required=True)
+
+    env = groups.add_parser("env", help="Read, change and export backend/.env").add_subparsers(dest="action", required=True)
+    show = env.add_parser("show")
+    show.add_argument("--missing", action="store_true", help="Only variables without a value")
+    show.add_argument("--reveal", action="store_true", help="Print values unmasked")
+    show.set_defaults(func=cmd_env_show)
+    set_ = env.add_parser("set")
+    set_.add_argument("pairs", nargs="+", metavar="KEY=VALUE")
+    set_.set_defaults(func=cmd_env_set)
+    export = env.add_parser("export")
+    export.add_argument("format", choices=["csv", "pdf"])
+    export.add_argument("--out", type=Path)
+    export.set_defaults(func=cmd_env_export)
+
+    server = groups.add_parser("server", help="Run the backend detached").add_subparsers(dest="action", required=True)
+    start = server.add_parser("start")
+    start.add_argument("--inspect", action="store_true", help="Start node with the inspector enabled")
+    start.add_argument("--wait", type=float, metavar="SECONDS", help="Wait until /api/health answers")
+    start.set_defaults(func=cmd_server_start)
+    server.add_parser("stop").set_defaults(func=cmd_server_stop)
+    server.add_parser("status").set_defaults(func=cmd_server_status)
+
+    db = groups.add_parser("db", help="Backup, restore or clear the database").add_subparsers(dest="action", required=True)
+    backup = db.add_parser("backup")
+    backup.add_argument("--out", type=Path)
+    backup.set_defaults(func=cmd_db_backup)
+    restore = db.add_parser("restore")
+    restore.add_argument("path", type=Path)
+    restore.add_argument("--yes", action="store_true")
+    restore.set_defaults(func=cmd_db_restore)
+    clear = db.add_parser("clear")
+    clear.add_argument("--yes", action="store_true")
+    clear.set_defaults(func=cmd_db_clear)
+    for sub in (backup, restore, clear):
+        sub.add_argument("--source", choices=["auto", "mongodb", "nedb"], default="auto")
+
+    admin = groups.add_parser("admin", help="Admin accounts").add_subparsers(dest="action", required=True)
+    promote = admin.add_parser("promote")
+    promote.add_argument("emails", nargs="+")
+    promote.add_argument("--role", choices=["admin", "user"], default="admin")
+    promote.add_argument("--dry-run", action="store_true")
+    promote.set_defaults(func=cmd_admin_promote)
+    admin.add_parser("reset-default").set_defaults(func=cmd_admin_reset)
+
+    groups.add_parser("health", help="Check the API and MongoDB").set_defaults(func=cmd_health)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        ok, result = args.func(args)
+        error = None
+    except Exception as e:
+        ok, result, error = False, {}, str(e)
+        print(f"Error: {error}", file=sys.stderr)
+    if args.json:
+        print(json.dumps({"ok": ok, "error": error, **result}, default=str, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,575 @@
+"""
+GUI-free operations shared by the API manager, the control panel and the
+headless CLI (manage.py).
+
+Nothing here imports tkinter; python-dotenv, reportlab, requests and
+pymongo are imported inside the functions that need them, so scripts that
+only touch one operation start quickly.
+"""
+import csv
+import datetime
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# ------------------------------
+# Project-aware paths
+# ------------------------------
+BASE_DIR = Path(__file__).resolve().parents[1]
+BACKEND_DIR = BASE_DIR / "backend"
+ENV_PATH = BACKEND_DIR / ".env"
+DATA_DIR = BACKEND_DIR / "data"
+EXPORTS_DIR = Path(__file__).resolve().parent / "exports"
+BACKUPS_DIR = BASE_DIR / "backups"
+RUN_DIR = Path(__file__).resolve().parent / "cache" / "run"
+SERVER_PID_FILE = RUN_DIR / "server.pid"
+SERVER_LOG_FILE = RUN_DIR / "server.log"
+
+DB_NAME = "chatbot-builder"
+HEALTH_URL = "http://localhost:5000/api/health"
+
+# ------------------------------
+# Configuration of variables
+# ------------------------------
+CONFIG: List[Dict[str, Any]] = [
+    # Core (Required)
+    {"category": "Core", "service": "Server", "var": "PORT", "required": False, "desc": "Backend port (default 5000)"},
+    {"category": "Core", "service": "MongoDB", "var": "MONGODB_URI", "required": True, "desc": "Database connection string"},
+    {"category": "Core", "service": "JWT", "var": "JWT_SECRET", "required": True, "desc": "Auth token signing secret"},
+    {"category": "Core", "service": "Environment", "var": "NODE_ENV", "required": False, "desc": "development / production"},
+    {"category": "Core", "service": "Frontend", "var": "FRONTEND_URL", "required": False, "desc": "URL for CORS (e.g. https://myapp.com)"},
+
+    # AI (Required)
+    {"category": "AI", "service": "OpenAI", "var": "OPENAI_API_KEY", "required": True, "desc": "OpenAI API Key"},
+    {"category": "AI", "service": "OpenAI", "var": "OPENAI_MODEL", "required": False, "desc": "Model (e.g. gpt-4o-mini)"},
+    {"category": "AI", "service": "OpenAI", "var": "OPENAI_EMBEDDING_MODEL", "required": False, "desc": "Embedding model"},
+    {"category": "AI", "service": "Embedding Cache", "var": "EMBEDDING_CACHE_URL", "required": False, "desc": "Local cache (e.g. http://127.0.0.1:5055)"},
+    {"category": "AI", "service": "Retrieval", "var": "RETRIEVAL_URL", "required": False, "desc": "Top-k sidecar (e.g. http://127.0.0.1:5056)"},
+
+    # Billing (Optional)
+    {"category": "Billing", "service": "Stripe", "var": "STRIPE_SECRET_KEY", "required": False, "desc": "Stripe Secret Key"},
+    {"category": "Billing", "service": "Stripe", "var": "STRIPE_WEBHOOK_SECRET", "required": False, "desc": "Stripe Webhook Secret"},
+
+    # Email (Optional)
+    {"category": "Email", "service": "SMTP", "var": "EMAIL_SERVICE", "required": False, "desc": "Service (e.g. gmail)"},
+    {"category": "Email", "service": "SMTP", "var": "EMAIL_USER", "required": False, "desc": "Email username"},
+    {"category": "Email", "service": "SMTP", "var": "EMAIL_PASSWORD", "required": False, "desc": "Email password"},
+    {"category": "Email", "service": "SMTP", "var": "EMAIL_FROM", "required": False, "desc": "Sender address"},
+
+    # WhatsApp (Optional)
+    {"category": "WhatsApp", "service": "Twilio", "var": "TWILIO_ACCOUNT_SID", "required": False, "desc": "Twilio Account SID"},
+    {"category": "WhatsApp", "service": "Twilio", "var": "TWILIO_AUTH_TOKEN", "required": False, "desc": "Twilio Auth Token"},
+    {"category": "WhatsApp", "service": "Twilio", "var": "WHATSAPP_PHONE_NUMBER", "required": False, "desc": "Sender number"},
+]
+
+CATEGORIES = ["All"] + sorted(list({item["category"] for item in CONFIG}))
+
+
+class OperationError(Exception):
+    """An operation failed in a way worth reporting to the user as-is."""
+
+
+# ------------------------------
+# .env helpers
+# ------------------------------
+
+def get_merged_config(env_values: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    Merges the hardcoded CONFIG with any extra keys found in the .env file.
+    """
+    known_vars = {item["var"] for item in CONFIG}
+    merged = list(CONFIG)
+
+    # Add any keys found in .env that aren't in CONFIG
+    for key in env_values:
+        if key not in known_vars:
+            merged.append({
+                "category": "Custom",
+                "service": "Detected",
+                "var": key,
+                "required": False,
+                "desc": "Auto-detected from .env"
+            })
+
+    return merged
+
+
+def load_env(env_path: Optional[Path] = None) -> Dict[str, str]:
+    env_path = env_path or ENV_PATH
+    if env_path.exists():
+        from dotenv import dotenv_values
+        return {k: str(v) for k, v in dotenv_values(env_path).items() if k}
+    return {}
+
+
+def mask_value(val: str) -> str:
+    if not val:
+        return ""
+    v = str(val)
+    if len(v) <= 8:
+        return "*" * len(v)
+    return f"{v[:4]}***{v[-4:]}"
+
+
+def write_env(updates: Dict[str, str], env_path: Optional[Path] = None):
+    """Update or append keys, keeping comments and order; the file is replaced atomically."""
+    env_path = env_path or ENV_PATH
+    env_path.parent.mkdir(parents=True, exist_ok=True)
+    existing_lines: List[str] = []
+    existing_map: Dict[str, int] = {}
+
+    if env_path.exists():
+        content = env_path.read_text(encoding="utf-8")
+        existing_lines = content.splitlines()
+        for idx, line in enumerate(existing_lines):
+            if not line or line.strip().startswith("#"):
+                continue
+            if "=" in line:
+                key = line.split("=", 1)[0].strip()
+                existing_map[key] = idx
+
+    # Apply updates
+    for key, value in updates.items():
+        if value is None:
+            continue
+        line_val = value
+        # Always quote for safety
+        if not (line_val.startswith('"') and line_val.endswith('"')):
+            line_val = f'"{line_val}"'
+        new_line = f"{key}={line_val}"
+        if key in existing_map:
+            existing_lines[existing_map[key]] = new_line
+        else:
+            existing_lines.append(new_line)
+
+    # Ensure file ends with newline; write next to the target and swap it in
+    # so concurrent readers never see a half-written file
+    final_text = "\n".join(existing_lines) + "\n"
+    fd, tmp = tempfile.mkstemp(prefix=".env.", dir=env_path.parent)
+    with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+        f.write(final_text)
+    os.replace(tmp, env_path)
+
+
+def collect_rows(env_path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Every known and detected key with presence and a masked value, for exports."""
+    rows = []
+    env_now = load_env(env_path)
+    # Use merged config to include custom keys in export
+    full_config = get_merged_config(env_now)
+
+    for item in full_config:
+        raw = env_now.get(item["var"], "")
+        rows.append({
+            **item,
+            "present": bool(raw),
+            "masked": mask_value(raw)
+        })
+    return rows
+
+
+def export_path(extension: str) -> Path:
+    """A fresh file in tools/exports (pid suffix keeps concurrent runs apart)."""
+    EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = EXPORTS_DIR / f"apis_{ts}.{extension}"
+    if path.exists():
+        path = EXPORTS_DIR / f"apis_{ts}_{os.getpid()}.{extension}"
+    return path
+
+
+def export_csv(rows: List[Dict[str, Any]], out_path: Path):
+    with out_path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Category", "Service", "Var", "Required", "Present", "Value (masked)"])
+        for r in rows:
+            writer.writerow([
+                r["category"], r["service"], r["var"],
+                "Yes" if r["required"] else "No",
+                "Yes" if r.get("present") else "No",
+                r.get("masked", "")
+            ])
+
+
+def export_pdf(rows: List[Dict[str, Any]], out_path: Path):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    doc = SimpleDocTemplate(str(out_path), pagesize=A4, title="API Keys Status")
+    styles = getSampleStyleSheet()
+    story = []
+    story.append(Paragraph("API Keys Status - Chatbot Builder", styles["Title"]))
+    story.append(Spacer(1, 12))
+
+    data = [["Category", "Service", "Var", "Required", "Present", "Value (masked)"]]
+    for r in rows:
+        data.append([
+            r["category"], r["service"], r["var"],
+            "Yes" if r["required"] else "No",
+            "Yes" if r.get("present") else "No",
+            r.get("masked", "")
+        ])
+
+    table = Table(data, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.black),
+        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0,0), (-1,-1), 9),
+        ('BOTTOMPADDING', (0,0), (-1,0), 6),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
+    ]))
+    story.append(table)
+
+    story.append(Spacer(1, 12))
+    story.append(Paragraph(
+        "Note: Values are masked for safety. Use the GUI to view/edit actual values.",
+        styles["Normal"]
+    ))
+
+    doc.build(story)
+
+
+# ------------------------------
+# Server process
+# ------------------------------
+
+def server_command(inspector: bool = False) -> List[str]:
+    """`npm start`, or node directly when the inspector is wanted (so npm's node doesn't take the port)."""
+    if inspector:
+        from profiler import INSPECTOR_HOST, INSPECTOR_PORT
+        return ["node", f"--inspect={INSPECTOR_HOST}:{INSPECTOR_PORT}", "server.js"]
+    return [shutil.which("npm") or "npm", "start"]
+
+
+def server_env(access_log: bool = True, overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """The backend's environment; process variables win over backend/.env, so overrides apply."""
+    env = dict(os.environ)
+    if access_log:
+        env["ACCESS_LOG"] = "1"
+    env.update(overrides or {})
+    return env
+
+
+def terminate_tree(pid: int, timeout: float = 5.0, started: Optional[str] = None) -> bool:
+    """
+    Stop a process and everything it started; True if it is gone. With
+    `started` (see process_started()) a pid that now belongs to another
+    process counts as gone and is left alone.
+    """
+    if started and process_started(pid) != started:
+        return True
+    if sys.platform == "win32":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], capture_output=True)
+        return not pid_alive(pid)
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            procs = root.children(recursive=True) + [root]
+        except psutil.NoSuchProcess:
+            return True
+        for proc in procs:
+            try:
+                proc.send_signal(signal.SIGTERM)
+            except psutil.NoSuchProcess:
+                pass
+        _gone, alive = psutil.wait_procs(procs, timeout=timeout)
+        for proc in alive:
+            try:
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+        return True
+
+    # Without psutil rely on the process group created by start_server(); a pid
+    # that doesn't lead its own group only gets signalled itself
+    try:
+        if os.getpgid(pid) != pid:
+            raise PermissionError
+        os.killpg(pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return True
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if not pid_alive(pid):
+            return True
+        time.sleep(0.1)
+    try:
+        if os.getpgid(pid) == pid:
+            os.killpg(pid, signal.SIGKILL)
+        else:
+            os.kill(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    return not pid_alive(pid)
+
+
+def pid_alive(pid: int) -> bool:
+    if sys.platform == "win32":
+        result = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/NH"], capture_output=True, text=True)
+        return str(pid) in result.stdout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        # Zombies (exited, not yet reaped) still accept signal 0
+        with open(f"/proc/{pid}/stat", encoding="ascii") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except OSError:
+        return True
+
+
+def process_started(pid: int) -> Optional[str]:
+    """
+    When the process started, as an opaque token (kernel start ticks on
+    Linux, psutil's create time elsewhere). A recycled pid gets a different
+    token; None if the process is gone or its start time can't be read.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii") as f:
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        pass
+    try:
+        import psutil
+        return f"{psutil.Process(pid).create_time():.3f}"
+    except Exception:
+        return None
+
+
+def read_server_record() -> Optional[Tuple[int, str]]:
+    """(pid, start token) of the recorded backend if that very process is still running."""
+    try:
+        lines = SERVER_PID_FILE.read_text().split()
+        pid = int(lines[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    started = lines[1] if len(lines) > 1 else ""
+    if not pid_alive(pid):
+        return None
+    # A pidfile left behind by a crash can name a pid the OS has since handed to something else
+    if started and process_started(pid) != started:
+        return None
+    return pid, started
+
+
+def read_server_pid() -> Optional[int]:
+    record = read_server_record()
+    return record[0] if record else None
+
+
+def write_server_pid(pid: Optional[int]):
+    """Record (or with None, forget) the backend pid so every front end sees the same server."""
+    if pid is None:
+        SERVER_PID_FILE.unlink(missing_ok=True)
+        return
+    RUN_DIR.mkdir(parents=True, exist_ok=True)
+    SERVER_PID_FILE.write_text(f"{pid}\n{process_started(pid) or ''}\n")
+
+
+def start_server(inspector: bool = False, access_log: bool = True,
+                 overrides: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Start the backend detached, logging to tools/cache/run/server.log."""
+    pid = read_server_pid()
+    if pid:
+        raise OperationError(f"Server already running (pid {pid})")
+    RUN_DIR.mkdir(parents=True, exist_ok=True)
+    kwargs: Dict[str, Any] = {}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+    else:
+        kwargs["start_new_session"] = True
+    with SERVER_LOG_FILE.open("ab") as log_file:
+        proc = subprocess.Popen(server_command(inspector), cwd=BACKEND_DIR, env=server_env(access_log, overrides),
+                                stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT, **kwargs)
+    write_server_pid(proc.pid)
+    return {"pid": proc.pid, "log": str(SERVER_LOG_FILE)}
+
+
+def stop_server() -> Dict[str, Any]:
+    record = read_server_record()
+    if not record:
+        write_server_pid(None)
+        return {"stopped": False, "message": "Server is not running"}
+    pid, started = record
+    stopped = terminate_tree(pid, started=started)
+    if stopped:
+        write_server_pid(None)
+    return {"stopped": stopped, "pid": pid}
+
+
+def check_health(url: str = HEALTH_URL, timeout: float = 5.0) -> Dict[str, Any]:
+    """GET the health endpoint; never raises."""
+    import requests
+
+    started = time.perf_counter()
+    try:
+        response = requests.get(url, timeout=timeout)
+        body: Any = response.json() if "json" in response.headers.get("Content-Type", "") else response.text
+        return {"ok": response.status_code == 200, "status": response.status_code, "body": body,
+                "ms": round((time.perf_counter() - started) * 1000, 1)}
+    except Exception as e:
+        return {"ok": False, "status": None, "error": str(e), "ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+def server_status() -> Dict[str, Any]:
+    pid = read_server_pid()
+    return {"pid": pid, "managed": pid is not None, "health": check_health(timeout=3)}
+
+
+# ------------------------------
+# Database
+# ------------------------------
+
+def _run(cmd: List[str], log: Callable[[str], None], cwd: Optional[Path] = None,
+         cancel: Optional[threading.Event] = None) -> subprocess.CompletedProcess:
+    """Run a tool to completion; setting `cancel` stops it (and its children) early."""
+    exe = shutil.which(cmd[0])
+    if not exe:
+        raise OperationError(f"{cmd[0]} not found in PATH")
+    # Own process group, so cancelling can stop the whole tree without touching ours
+    kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if sys.platform == "win32" else {"start_new_session": True}
+    proc = subprocess.Popen([exe] + cmd[1:], cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, encoding="utf-8", errors="replace", **kwargs)
+    while True:
+        try:
+            stdout, stderr = proc.communicate(timeout=0.25)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel is not None and cancel.is_set():
+                terminate_tree(proc.pid)
+                proc.communicate()
+                raise OperationError(f"{cmd[0]} cancelled")
+    output = (stdout + stderr).strip()
+    if output:
+        log(output)
+    if proc.returncode != 0:
+        raise OperationError(f"{cmd[0]} exited with code {proc.returncode}")
+    return subprocess.CompletedProcess(proc.args, proc.returncode, stdout, stderr)
+
+
+def backup_database(out_dir: Optional[Path] = None, source: str = "auto", log: Callable[[str], None] = print,
+                    cancel: Optional[threading.Event] = None) -> Path:
+    """mongodump on MongoDB, a copy of the datafiles on NeDB; returns the backup folder."""
+    from datastore import get_mongo_uri, resolve_source
+
+    source = resolve_source(source)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    target = Path(out_dir) if out_dir else BACKUPS_DIR / f"backup_{timestamp}"
+    if source == "mongodb":
+        _run(["mongodump", f"--uri={get_mongo_uri()}", f"--out={target}"], log, cancel=cancel)
+    else:
+        target.mkdir(parents=True, exist_ok=True)
+        for path in DATA_DIR.glob("*.db"):
+            if cancel is not None and cancel.is_set():
+                raise OperationError(f"Backup cancelled; {target} is incomplete")
+            shutil.copy2(path, target / path.name)
+    log(f"Backup completed ({source}): {target}")
+    return target
+
+
+def restore_database(backup: Path, source: str = "auto", log: Callable[[str], None] = print,
+                     cancel: Optional[threading.Event] = None):
+    """Replace the current data with a backup made by backup_database()."""
+    from datastore import get_mongo_uri, resolve_source
+
+    backup = Path(backup)
+    if not backup.is_dir():
+        raise OperationError(f"Backup folder not found: {backup}")
+    nedb_files = list(backup.glob("*.db"))
+    if nedb_files:
+        if read_server_pid():
+            raise OperationError("Stop the server before restoring NeDB datafiles")
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        for path in nedb_files:
+            shutil.copy2(path, DATA_DIR / path.name)
+        log(f"Restored {len(nedb_files)} NeDB datafiles from {backup}")
+        return
+
+    if resolve_source(source) != "mongodb":
+        raise OperationError("MongoDB is not reachable; cannot restore a mongodump backup")
+    if (backup / DB_NAME).is_dir():
+        # The dump root written by backup_database()
+        target = [f"--nsInclude={DB_NAME}.*", f"--dir={backup}"]
+    else:
+        # The database folder itself was picked
+        target = [f"--nsFrom={backup.name}.*", f"--nsTo={DB_NAME}.*", f"--dir={backup.parent}",
+                  f"--nsInclude={backup.name}.*"]
+    try:
+        _run(["mongorestore", f"--uri={get_mongo_uri()}", "--drop"] + target, log, cancel=cancel)
+    except OperationError:
+        if cancel is not None and cancel.is_set():
+            log("⚠️ Restore cancelled part way; collections restored so far were replaced")
+        raise
+    log(f"Database restored from {backup}")
+
+
+def clear_database(source: str = "auto", log: Callable[[str], None] = print):
+    """Drop the MongoDB database, or delete the NeDB datafiles."""
+    from datastore import open_mongo, resolve_source
+
+    if resolve_source(source) == "nedb":
+        if read_server_pid():
+            raise OperationError("Stop the server before clearing NeDB datafiles")
+        removed = [path.name for path in DATA_DIR.glob("*.db")]
+        for name in removed:
+            (DATA_DIR / name).unlink()
+        log(f"Deleted NeDB datafiles: {', '.join(removed) or 'none'}")
+        return
+    client, db = open_mongo()
+    try:
+        client.drop_database(db.name)
+    finally:
+        client.close()
+    log(f"Dropped database {db.name}")
+
+
+# ------------------------------
+# Admin accounts
+# ------------------------------
+
+def set_roles(emails: List[str], role: str = "admin", dry_run: bool = False,
+              log: Callable[[str], None] = print) -> Dict[str, Any]:
+    from bulk_admin import apply_roles, parse_rows
+
+    return apply_roles(parse_rows("\n".join(emails), role), dry_run=dry_run, log=log)
+
+
+def reset_default_admin(log: Callable[[str], None] = print, cancel: Optional[threading.Event] = None):
+    """Re-create admin@chatbotbuilder.com through the backend script (it hashes the password with bcryptjs)."""
+    _run(["npm", "run", "create-admin"], log, cwd=BACKEND_DIR, cancel=cancel)
+
+
+def tool_versions() -> Dict[str, str]:
+    versions = {}
+    for tool in ("node", "npm"):
+        exe = shutil.which(tool)
+        if not exe:
+            versions[tool] = "Not installed"
+            continue
+        try:
+            versions[tool] = subprocess.run([exe, "--version"], capture_output=True, text=True).stdout.strip()
+        except OSError:
+            versions[tool] = "Not installed"
+    return versions
@@ -0,0 +1,430 @@
+"""
+In-process metrics for the control panel and tools, served in the
+Prometheus text exposition format.
+
+The health monitor (health_check.py), the server supervisor and its log
+parser (project_manager.py) record into the module-level REGISTRY; start()
+serves it on http://127.0.0.1:9464/metrics so every box running the control
+panel can be scraped.
+
+Usage:
+    python metrics_exporter.py [--host 127.0.0.1] [--port 9464]
+        (standalone: serves the process metrics and anything fed via
+         `python metrics_exporter.py --tail server.log`)
+
+Request metrics come from the backend's access log lines, written when the
+server runs with ACCESS_LOG=1:
+    [access] GET /api/chatbot/:botId 200 12.4ms req=0 res=1834 path=/api/chatbot/bot_x
+"""
+import argparse
+import math
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# ------------------------------
+# Configuration
+# ------------------------------
+DEFAULT_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.environ.get("METRICS_PORT", "9464"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PING_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 3.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ------------------------------
+# Metric types
+# ------------------------------
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def remove(self, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+
+    def value(self, **labels: str) -> Optional[float]:
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket..., count in +Inf], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """A set of metrics plus collectors that refresh gauges at scrape time."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrics collector error: {e}", file=sys.stderr)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# ------------------------------
+# Platform metrics
+# ------------------------------
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "chatbot_http_requests_total", "Backend requests parsed from the access log.", ("method", "route", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "chatbot_http_request_duration_seconds", "Backend request latency by route.", ("method", "route"))
+HTTP_RESPONSE_BYTES = REGISTRY.counter(
+    "chatbot_http_response_bytes_total", "Response bytes written by the backend.", ("route",))
+LOG_LINES = REGISTRY.counter(
+    "chatbot_server_log_lines_total", "Server output lines seen by the supervisor.", ("level",))
+
+SERVER_UP = REGISTRY.gauge("chatbot_server_up", "1 while the supervised backend process is running.")
+SERVER_STARTS = REGISTRY.counter("chatbot_server_starts_total", "Backend processes launched by the supervisor.")
+SERVER_RESTARTS = REGISTRY.counter("chatbot_server_restarts_total", "Backend restarts requested from the supervisor.")
+SERVER_EXITS = REGISTRY.counter("chatbot_server_exits_total", "Backend process exits by exit code.", ("code",))
+SERVER_RSS = REGISTRY.gauge("chatbot_server_rss_bytes", "Resident memory of the backend process tree.")
+
+MONGO_UP = REGISTRY.gauge("chatbot_mongo_up", "1 if the last MongoDB ping succeeded.")
+MONGO_PING = REGISTRY.histogram(
+    "chatbot_mongo_ping_seconds", "MongoDB ping round-trip time.", buckets=PING_BUCKETS)
+MONGO_CONNECT = REGISTRY.histogram(
+    "chatbot_mongo_connect_seconds", "TCP connect time to the MongoDB port (checks without pymongo).",
+    buckets=PING_BUCKETS)
+
+HEALTH_UP = REGISTRY.gauge("chatbot_health_up", "1 if the last health check of a service passed.", ("service",))
+HEALTH_LATENCY = REGISTRY.histogram(
+    "chatbot_health_check_seconds", "Health check response time.", ("service",))
+
+JOB_DURATION = REGISTRY.histogram(
+    "chatbot_control_job_seconds", "Control panel background jobs by kind and outcome.", ("kind", "state"),
+    buckets=JOB_BUCKETS)
+JOB_WAIT = REGISTRY.histogram(
+    "chatbot_control_job_wait_seconds", "Time control panel jobs spent queued.", ("kind",), buckets=JOB_BUCKETS)
+
+
+# ------------------------------
+# Feeds
+# ------------------------------
+ACCESS_LINE = re.compile(
+    r"\[access\] (?P<method>[A-Z]+) (?P<route>\S+) (?P<status>\d{3}) (?P<ms>[\d.]+)ms"
+    r"(?: req=(?P<req>\d+))?(?: res=(?P<res>\d+))?(?: path=(?P<path>\S+))?"
+    r"(?: at=(?P<at>\d+))?(?: client=(?P<client>\w+))?"
+)
+
+
+def parse_access_line(line: str) -> Optional[Dict[str, object]]:
+    """Parse one backend access log line; None for any other output."""
+    match = ACCESS_LINE.search(line)
+    if not match:
+        return None
+    return {
+        "method": match.group("method"),
+        "route": match.group("route"),
+        "status": int(match.group("status")),
+        "ms": float(match.group("ms")),
+        "reqBytes": int(match.group("req") or 0),
+        "resBytes": int(match.group("res") or 0),
+        "path": match.group("path") or match.group("route"),
+        "at": int(match.group("at")) / 1000.0 if match.group("at") else None,
+        "client": match.group("client"),
+    }
+
+
+def observe_log_line(line: str) -> Optional[Dict[str, object]]:
+    """Feed one line of server output into the metrics; returns the parsed access record, if any."""
+    record = parse_access_line(line)
+    if record is None:
+        lowered = line.lower()
+        level = "error" if ("error" in lowered or "❌" in line) else "warn" if ("warn" in lowered or "⚠" in line) else "info"
+        LOG_LINES.inc(level=level)
+        return None
+    HTTP_REQUESTS.inc(method=record["method"], route=record["route"], status=str(record["status"]))
+    HTTP_LATENCY.observe(record["ms"] / 1000.0, method=record["method"], route=record["route"])
+    HTTP_RESPONSE_BYTES.inc(record["resBytes"], route=record["route"])
+    return record
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """Resident bytes of a process and its children (psutil, or /proc for the process alone)."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        try:
+            proc = psutil.Process(pid)
+            procs = [proc] + proc.children(recursive=True)
+        except psutil.Error:
+            return None
+        total = 0
+        for p in procs:
+            try:
+                total += p.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+_tracked_pid: Optional[int] = None
+
+
+def track_process(pid: Optional[int]):
+    """Sample the RSS of this process tree on every scrape (None stops tracking)."""
+    global _tracked_pid
+    _tracked_pid = pid
+    SERVER_UP.set(1 if pid else 0)
+    if pid is None:
+        SERVER_RSS.remove()
+
+
+def _collect_rss():
+    if _tracked_pid is None:
+        return
+    rss = process_tree_rss(_tracked_pid)
+    if rss is not None:
+        SERVER_RSS.set(rss)
+
+
+REGISTRY.add_collector(_collect_rss)
+
+
+# ------------------------------
+# HTTP exposition
+# ------------------------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread; raises OSError if the port is taken."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
+
+
+def _tail(path: str, stop: threading.Event):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        f.seek(0, os.SEEK_END)
+        while not stop.is_set():
+            line = f.readline()
+            if line:
+                observe_log_line(line)
+            else:
+                time.sleep(0.5)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve Chatbot Builder metrics in Prometheus format")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--tail", help="Follow a server log file and record its access lines")
+    parser.add_argument("--pid", type=int, help="Report the RSS of this backend process tree")
+    args = parser.parse_args(argv)
+
+    server = start(args.host, args.port)
+    print(f"Metrics exporter on http://{args.host}:{args.port}/metrics")
+    if args.pid:
+        track_process(args.pid)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        if args.tail:
+            _tail(args.tail, stop)
+        else:
+            while not stop.wait(1):
+                pass
+    except KeyboardInterrupt:
+        pass
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
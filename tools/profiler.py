@@ -0,0 +1,511 @@
+"""
+CPU and heap profiling for the backend.
+
+Two ways to capture:
+  * attach  - talk to the node inspector on 127.0.0.1:9229 (the control panel
+              can start the server with it enabled, and on Linux/macOS a
+              running node process is switched on with SIGUSR1) and record a
+              CPU profile and a sampling heap profile for N seconds.
+  * run     - start `node --cpu-prof --heap-prof server.js` for N seconds and
+              stop it; node writes .cpuprofile/.heapprofile files on exit.
+
+Either way the profiles are converted into collapsed stacks (flamegraph.pl /
+speedscope input), a self-contained SVG flamegraph and a top-N self-time
+table.
+
+Usage:
+    python profiler.py attach [--duration 30] [--no-heap] [--port 9229] [--pid PID]
+    python profiler.py run [--duration 30]
+    python profiler.py report PROFILE [--top 25]
+"""
+import argparse
+import base64
+import html
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# ------------------------------
+# Configuration
+# ------------------------------
+BASE_DIR = Path(__file__).resolve().parents[1]
+BACKEND_DIR = BASE_DIR / "backend"
+PROFILES_DIR = Path(__file__).resolve().parent / "exports" / "profiles"
+INSPECTOR_HOST = "127.0.0.1"
+INSPECTOR_PORT = 9229
+CPU_SAMPLING_US = 1000
+HEAP_SAMPLING_BYTES = 32 * 1024
+
+
+# ------------------------------
+# Inspector protocol (minimal WebSocket client)
+# ------------------------------
+
+class InspectorSession:
+    """Just enough of RFC 6455 to send DevTools protocol commands to node."""
+
+    def __init__(self, ws_url: str, timeout: float = 10.0):
+        rest = ws_url.split("://", 1)[1]
+        hostport, _, path = rest.partition("/")
+        host, _, port = hostport.partition(":")
+        self.sock = socket.create_connection((host, int(port or 80)), timeout=timeout)
+        self._buffer = b""
+        self._next_id = 0
+
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        self.sock.sendall((
+            f"GET /{path} HTTP/1.1\r\nHost: {hostport}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode("ascii"))
+        while b"\r\n\r\n" not in self._buffer:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("Inspector closed the connection during handshake")
+            self._buffer += chunk
+        head, self._buffer = self._buffer.split(b"\r\n\r\n", 1)
+        if b" 101 " not in head.split(b"\r\n", 1)[0]:
+            raise ConnectionError(f"Inspector refused WebSocket upgrade: {head.splitlines()[0]!r}")
+
+    def _recv_exact(self, n: int) -> bytes:
+        while len(self._buffer) < n:
+            chunk = self.sock.recv(max(65536, n - len(self._buffer)))
+            if not chunk:
+                raise ConnectionError("Inspector connection closed")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        return data
+
+    def _send_frame(self, opcode: int, payload: bytes):
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 1 << 16:
+            header.append(0x80 | 126)
+            header += length.to_bytes(2, "big")
+        else:
+            header.append(0x80 | 127)
+            header += length.to_bytes(8, "big")
+        mask = os.urandom(4)
+        header += mask
+        self.sock.sendall(bytes(header) + bytes(b ^ mask[i % 4] for i, b in enumerate(payload)))
+
+    def _recv_message(self) -> str:
+        parts: List[bytes] = []
+        while True:
+            b1, b2 = self._recv_exact(2)
+            opcode, length = b1 & 0x0F, b2 & 0x7F
+            if length == 126:
+                length = int.from_bytes(self._recv_exact(2), "big")
+            elif length == 127:
+                length = int.from_bytes(self._recv_exact(8), "big")
+            mask = self._recv_exact(4) if b2 & 0x80 else None
+            payload = self._recv_exact(length)
+            if mask:
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+            if opcode == 0x8:
+                raise ConnectionError("Inspector closed the session")
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+                continue
+            if opcode in (0x0, 0x1, 0x2):
+                parts.append(payload)
+                if b1 & 0x80:
+                    return b"".join(parts).decode("utf-8")
+
+    def call(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: float = 60.0) -> Dict[str, Any]:
+        self._next_id += 1
+        msg_id = self._next_id
+        self._send_frame(0x1, json.dumps({"id": msg_id, "method": method, "params": params or {}}).encode("utf-8"))
+        self.sock.settimeout(timeout)
+        while True:
+            message = json.loads(self._recv_message())
+            if message.get("id") != msg_id:
+                continue  # events
+            if "error" in message:
+                raise RuntimeError(f"{method} failed: {message['error'].get('message')}")
+            return message.get("result", {})
+
+    def close(self):
+        try:
+            self._send_frame(0x8, b"")
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def inspector_targets(host: str = INSPECTOR_HOST, port: int = INSPECTOR_PORT, timeout: float = 2.0) -> List[Dict[str, Any]]:
+    with urllib.request.urlopen(f"http://{host}:{port}/json/list", timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def find_node_pid(root_pid: int) -> Optional[int]:
+    """The node process under the supervisor's `npm start` shell (or root_pid itself)."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        try:
+            root = psutil.Process(root_pid)
+            for proc in [root] + root.children(recursive=True):
+                if "node" in proc.name().lower():
+                    return proc.pid
+        except psutil.Error:
+            return None
+        return None
+
+    # /proc fallback: breadth-first over parent pids
+    parents: Dict[int, List[int]] = defaultdict(list)
+    names: Dict[int, str] = {}
+    for entry in Path("/proc").glob("[0-9]*"):
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        name = stat[stat.index("(") + 1:stat.rindex(")")]
+        ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        names[int(entry.name)] = name
+        parents[ppid].append(int(entry.name))
+    queue = [root_pid]
+    while queue:
+        pid = queue.pop(0)
+        if "node" in names.get(pid, ""):
+            return pid
+        queue.extend(parents.get(pid, []))
+    return None
+
+
+def activate_inspector(pid: int, host: str = INSPECTOR_HOST, port: int = INSPECTOR_PORT, wait: float = 5.0):
+    """Open the inspector of a running node process (SIGUSR1; not available on Windows)."""
+    if not hasattr(signal, "SIGUSR1"):
+        raise RuntimeError("Attaching to a running server needs SIGUSR1; start it with the inspector enabled instead")
+    os.kill(pid, signal.SIGUSR1)
+    deadline = time.time() + wait
+    while time.time() < deadline:
+        try:
+            if inspector_targets(host, port):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Inspector did not come up on {host}:{port}")
+
+
+def capture_attach(duration: float, out_dir: Path, heap: bool = True, host: str = INSPECTOR_HOST,
+                   port: int = INSPECTOR_PORT, pid: Optional[int] = None, log=print) -> List[Path]:
+    """Record profiles from a live server through the inspector protocol."""
+    try:
+        targets = inspector_targets(host, port)
+    except OSError:
+        if pid is None:
+            raise RuntimeError(f"No node inspector on {host}:{port}; start the server with profiling enabled")
+        node_pid = find_node_pid(pid)
+        if node_pid is None:
+            raise RuntimeError(f"No node process found under pid {pid}")
+        log(f"Activating inspector on node pid {node_pid}...")
+        activate_inspector(node_pid, host, port)
+        targets = inspector_targets(host, port)
+    if not targets:
+        raise RuntimeError("Inspector has no debuggable targets")
+
+    session = InspectorSession(targets[0]["webSocketDebuggerUrl"])
+    try:
+        session.call("Profiler.enable")
+        session.call("Profiler.setSamplingInterval", {"interval": CPU_SAMPLING_US})
+        session.call("Profiler.start")
+        if heap:
+            session.call("HeapProfiler.enable")
+            session.call("HeapProfiler.startSampling", {"samplingInterval": HEAP_SAMPLING_BYTES})
+        log(f"Profiling for {duration:g}s...")
+        time.sleep(duration)
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        written = []
+        cpu = session.call("Profiler.stop")["profile"]
+        path = out_dir / f"CPU.{stamp}.cpuprofile"
+        path.write_text(json.dumps(cpu), encoding="utf-8")
+        written.append(path)
+        if heap:
+            sampled = session.call("HeapProfiler.stopSampling")["profile"]
+            path = out_dir / f"Heap.{stamp}.heapprofile"
+            path.write_text(json.dumps(sampled), encoding="utf-8")
+            written.append(path)
+        session.call("Profiler.disable")
+    finally:
+        session.close()
+    return written
+
+
+def capture_run(duration: float, out_dir: Path, heap: bool = True, log=print) -> List[Path]:
+    """Start a profiled server directly (not through npm), stop it after `duration`."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    before = set(out_dir.iterdir())
+    cmd = ["node", "--cpu-prof", f"--cpu-prof-dir={out_dir}"]
+    if heap:
+        cmd += ["--heap-prof", f"--heap-prof-dir={out_dir}"]
+    cmd.append("server.js")
+
+    kwargs: Dict[str, Any] = {}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, **kwargs)
+    log(f"Started profiled server (pid {proc.pid}) for {duration:g}s...")
+    try:
+        proc.wait(timeout=duration)
+        log(f"Server exited early with code {proc.returncode}")
+    except subprocess.TimeoutExpired:
+        # server.js exits via process.exit on these signals, which is what
+        # makes node write the profiles
+        proc.send_signal(signal.CTRL_BREAK_EVENT if sys.platform == "win32" else signal.SIGINT)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            raise RuntimeError("Profiled server did not exit; no profiles were written")
+    return sorted(p for p in set(out_dir.iterdir()) - before if p.suffix in (".cpuprofile", ".heapprofile"))
+
+
+# ------------------------------
+# Analysis
+# ------------------------------
+
+def _frame_name(call_frame: Dict[str, Any]) -> str:
+    name = call_frame.get("functionName") or "(anonymous)"
+    url = call_frame.get("url") or ""
+    if url:
+        url = url.rsplit("/", 1)[-1]
+        return f"{name} ({url}:{call_frame.get('lineNumber', -1) + 1})"
+    return name
+
+
+def _cpu_weights(profile: Dict[str, Any]) -> Tuple[Dict[int, float], str]:
+    """Self time in ms per node id."""
+    weights: Dict[int, float] = defaultdict(float)
+    samples, deltas = profile.get("samples") or [], profile.get("timeDeltas") or []
+    if samples and len(deltas) == len(samples):
+        # timeDeltas[i] is the gap before sample i, so sample i lasted until i+1
+        for i, node_id in enumerate(samples):
+            gap = deltas[i + 1] if i + 1 < len(deltas) else (profile["endTime"] - profile["startTime"]) / len(samples)
+            weights[node_id] += max(gap, 0) / 1000.0
+    else:
+        interval_ms = (profile["endTime"] - profile["startTime"]) / 1000.0 / max(1, sum(n.get("hitCount", 0) for n in profile["nodes"]))
+        for node in profile["nodes"]:
+            weights[node["id"]] += node.get("hitCount", 0) * interval_ms
+    return weights, "ms"
+
+
+def _heap_nodes(head: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes, stack = [], [head]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get("children") or [])
+    return nodes
+
+
+def load_profile(path: Path) -> Dict[str, Any]:
+    """
+    Normalise a .cpuprofile or .heapprofile into
+    {kind, unit, nodes: {id: (name, parent_id)}, weights: {id: self value}}.
+    """
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    nodes: Dict[int, Tuple[str, Optional[int]]] = {}
+    if "head" in data:
+        flat = _heap_nodes(data["head"])
+        parent: Dict[int, int] = {}
+        for node in flat:
+            for child in node.get("children") or []:
+                parent[child["id"]] = node["id"]
+        for node in flat:
+            nodes[node["id"]] = (_frame_name(node["callFrame"]), parent.get(node["id"]))
+        weights = {node["id"]: node.get("selfSize", 0) / 1024.0 for node in flat}
+        return {"kind": "heap", "unit": "KB", "nodes": nodes, "weights": weights}
+
+    parent = {}
+    for node in data["nodes"]:
+        for child in node.get("children") or []:
+            parent[child] = node["id"]
+    for node in data["nodes"]:
+        nodes[node["id"]] = (_frame_name(node["callFrame"]), parent.get(node["id"]))
+    weights, unit = _cpu_weights(data)
+    return {"kind": "cpu", "unit": unit, "nodes": nodes, "weights": dict(weights)}
+
+
+def _stack(nodes: Dict[int, Tuple[str, Optional[int]]], node_id: int, cache: Dict[int, Tuple[str, ...]]) -> Tuple[str, ...]:
+    if node_id in cache:
+        return cache[node_id]
+    chain, current = [], node_id
+    while current is not None and current not in cache:
+        chain.append(current)
+        current = nodes[current][1]
+    prefix = cache.get(current, ()) if current is not None else ()
+    for nid in reversed(chain):
+        name = nodes[nid][0]
+        prefix = prefix if name == "(root)" else prefix + (name,)
+        cache[nid] = prefix
+    return cache[node_id]
+
+
+def collapse(profile: Dict[str, Any]) -> Dict[Tuple[str, ...], float]:
+    """Weight per full stack (root first)."""
+    stacks: Dict[Tuple[str, ...], float] = defaultdict(float)
+    cache: Dict[int, Tuple[str, ...]] = {}
+    for node_id, weight in profile["weights"].items():
+        if weight > 0:
+            stack = _stack(profile["nodes"], node_id, cache) or ("(root)",)
+            stacks[stack] += weight
+    return stacks
+
+
+def top_functions(stacks: Dict[Tuple[str, ...], float], n: int = 25) -> List[Dict[str, Any]]:
+    """Top-N frames by self weight, with inclusive (total) weight alongside."""
+    self_w: Dict[str, float] = defaultdict(float)
+    total_w: Dict[str, float] = defaultdict(float)
+    grand = sum(stacks.values()) or 1.0
+    for stack, weight in stacks.items():
+        self_w[stack[-1]] += weight
+        for name in set(stack):
+            total_w[name] += weight
+    rows = sorted(self_w.items(), key=lambda item: item[1], reverse=True)[:n]
+    return [{
+        "function": name,
+        "self": round(weight, 3),
+        "selfPct": round(100.0 * weight / grand, 2),
+        "total": round(total_w[name], 3),
+        "totalPct": round(100.0 * total_w[name] / grand, 2),
+    } for name, weight in rows]
+
+
+def write_collapsed(stacks: Dict[Tuple[str, ...], float], path: Path, scale: float = 1000.0):
+    """Brendan Gregg's folded format; weights are scaled to integers (µs for CPU, bytes for heap)."""
+    with path.open("w", encoding="utf-8") as f:
+        for stack, weight in sorted(stacks.items()):
+            value = int(round(weight * scale))
+            if value > 0:
+                f.write(";".join(frame.replace(";", ":") for frame in stack) + f" {value}\n")
+
+
+def write_flamegraph_svg(stacks: Dict[Tuple[str, ...], float], path: Path, title: str, unit: str,
+                         width: int = 1200, row_height: int = 17, min_width: float = 0.5):
+    """A static SVG flamegraph (root at the bottom), hover titles show the weights."""
+    tree: Dict[str, Any] = {"children": {}, "value": 0.0}
+    for stack, weight in stacks.items():
+        node = tree
+        node["value"] += weight
+        for frame in stack:
+            node = node["children"].setdefault(frame, {"children": {}, "value": 0.0})
+            node["value"] += weight
+
+    total = tree["value"] or 1.0
+    rects: List[Tuple[str, float, float, int, float]] = []
+    depth_max = [0]
+
+    def layout(node: Dict[str, Any], x: float, depth: int):
+        for name, child in sorted(node["children"].items()):
+            w = child["value"] / total * width
+            if w >= min_width:
+                depth_max[0] = max(depth_max[0], depth)
+                rects.append((name, child["value"], x, depth, w))
+                layout(child, x, depth + 1)
+            x += w
+
+    layout(tree, 0.0, 0)
+    height = (depth_max[0] + 1) * row_height + 40
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="Verdana" font-size="11">',
+        f'<text x="{width / 2}" y="20" text-anchor="middle" font-size="15">{html.escape(title)}</text>',
+    ]
+    for name, value, x, depth, w in rects:
+        y = height - (depth + 1) * row_height
+        hue = 10 + (zlib.crc32(name.encode("utf-8")) % 40)
+        label = html.escape(name)
+        parts.append(
+            f'<g><title>{label} ({value:,.1f} {unit}, {100 * value / total:.2f}%)</title>'
+            f'<rect x="{x:.2f}" y="{y}" width="{w:.2f}" height="{row_height - 1}" fill="hsl({hue},85%,60%)" rx="2"/>'
+        )
+        max_chars = int(w / 7)
+        if max_chars > 3:
+            text = label if len(name) <= max_chars else html.escape(name[:max_chars - 2]) + ".."
+            parts.append(f'<text x="{x + 3:.2f}" y="{y + row_height - 5}">{text}</text>')
+        parts.append("</g>")
+    parts.append("</svg>")
+    path.write_text("\n".join(parts), encoding="utf-8")
+
+
+def report(path: Path, top: int = 25) -> Dict[str, Any]:
+    """Write .collapsed and .svg next to a profile; return the summary shown in the Profiling tab."""
+    path = Path(path)
+    profile = load_profile(path)
+    stacks = collapse(profile)
+    collapsed = path.with_suffix(".collapsed")
+    svg = path.with_suffix(".svg")
+    write_collapsed(stacks, collapsed, 1024.0 if profile["kind"] == "heap" else 1000.0)
+    write_flamegraph_svg(stacks, svg, f"{profile['kind'].upper()} profile - {path.name}", profile["unit"])
+    return {
+        "profile": str(path),
+        "kind": profile["kind"],
+        "unit": profile["unit"],
+        "total": round(sum(stacks.values()), 3),
+        "collapsed": str(collapsed),
+        "flamegraph": str(svg),
+        "top": top_functions(stacks, top),
+    }
+
+
+def format_table(summary: Dict[str, Any]) -> str:
+    unit = summary["unit"]
+    lines = [f"{summary['kind'].upper()} {Path(summary['profile']).name}: {summary['total']:,.1f} {unit} total",
+             f"{'self ' + unit:>12} {'self%':>7} {'total ' + unit:>12} {'total%':>7}  function"]
+    for row in summary["top"]:
+        lines.append(f"{row['self']:>12,.1f} {row['selfPct']:>6.2f}% {row['total']:>12,.1f} {row['totalPct']:>6.2f}%  {row['function']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Capture and summarise backend CPU/heap profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name, helptext in (("attach", "Profile a running server through the node inspector"),
+                           ("run", "Start a profiled server for the duration, then stop it")):
+        p = sub.add_parser(name, help=helptext)
+        p.add_argument("--duration", type=float, default=30.0, help="Seconds to record")
+        p.add_argument("--no-heap", action="store_true", help="CPU profile only")
+        p.add_argument("--out", type=Path, default=PROFILES_DIR)
+        p.add_argument("--top", type=int, default=25)
+        if name == "attach":
+            p.add_argument("--port", type=int, default=INSPECTOR_PORT)
+            p.add_argument("--pid", type=int, help="Activate the inspector of this process tree via SIGUSR1")
+
+    p_report = sub.add_parser("report", help="Summarise existing .cpuprofile/.heapprofile files")
+    p_report.add_argument("profiles", nargs="+", type=Path)
+    p_report.add_argument("--top", type=int, default=25)
+
+    args = parser.parse_args(argv)
+    if args.command == "attach":
+        paths = capture_attach(args.duration, args.out, heap=not args.no_heap, port=args.port, pid=args.pid)
+    elif args.command == "run":
+        paths = capture_run(args.duration, args.out, heap=not args.no_heap)
+    else:
+        paths = args.profiles
+
+    for path in paths:
+        summary = report(path, args.top)
+        print(format_table(summary))
+        print(f"Flamegraph: {summary['flamegraph']}\nCollapsed stacks: {summary['collapsed']}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,13 +7,217 @@ import sys
 import webbrowser
 import time
 import json
+import itertools
+import queue
 import requests
+from collections import deque
 from datetime import datetime
+from pathlib import Path
+
+import bulk_admin
+import edge_cache
+import fault_proxy
+import health_check
+import manager_core as core
+import metrics_exporter as metrics
+import profiler
+import traffic
 
 # Configuration
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 BACKEND_DIR = os.path.join(PROJECT_ROOT, 'backend')
 FRONTEND_DIR = os.path.join(PROJECT_ROOT, 'frontend')
+JOB_WORKERS = 4
+JOB_HISTORY = 200
+JOB_POLL_MS = 200
+
+
+class JobCancelled(Exception):
+    """Raised from a job that noticed its cancel request."""
+
+
+class Job:
+    """One background operation. Its function receives the job to report progress and check for cancellation."""
+
+    def __init__(self, job_id, kind, name, fn, resources, key, on_done, on_error, scheduler):
+        self.id = job_id
+        self.kind = kind
+        self.name = name
+        self.fn = fn
+        self.resources = frozenset(resources)
+        self.key = key
+        self.on_done = on_done
+        self.on_error = on_error
+        self.state = "queued"
+        self.reported = False  # completion callbacks ran on the UI thread
+        self.progress = None
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self._scheduler = scheduler
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def wait_seconds(self):
+        return (self.started or self.finished or time.time()) - self.submitted
+
+    @property
+    def run_seconds(self):
+        return (self.finished or time.time()) - self.started if self.started else None
+
+    def log(self, message):
+        """Log line for the UI; the latest one also shows as the job's status"""
+        self.message = message.splitlines()[-1] if message else ""
+        self._scheduler._emit(self, "log", message)
+
+    def update(self, progress=None, message=None):
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        self._scheduler._emit(self, "progress", None)
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+
+class JobScheduler:
+    """
+    Bounded worker pool for the control panel's background operations.
+
+    Jobs that name the same resource ("db", "server") never run at the same
+    time, and a job never overtakes an earlier queued job on a resource they
+    share, so a restore queued before a clear runs first. A job with the same
+    key as one already queued or running is refused rather than doubled up.
+    Workers never touch Tk: state changes and log lines are queued and the UI
+    drains them in batches on its own thread (drain()).
+    """
+
+    def __init__(self, workers=JOB_WORKERS, history=JOB_HISTORY):
+        self._cond = threading.Condition()
+        self._queue = []
+        self._running = {}
+        self._busy = set()
+        self._ids = itertools.count(1)
+        self._events = queue.SimpleQueue()
+        self.history = deque(maxlen=history)
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"job-worker-{i + 1}", daemon=True).start()
+
+    def submit(self, kind, fn, name=None, resources=(), key=None, on_done=None, on_error=None):
+        """Queue fn(job); returns the Job, or None if one with the same key is already pending"""
+        key = key or kind
+        with self._cond:
+            if any(job.key == key for job in self._queue + list(self._running.values())):
+                return None
+            job = Job(next(self._ids), kind, name or kind, fn, resources, key, on_done, on_error, self)
+            self._queue.append(job)
+            self._cond.notify_all()
+        self._emit(job, "state", None)
+        return job
+
+    def cancel(self, job_id):
+        """Drop a queued job, or ask a running one to stop; False if it already finished"""
+        with self._cond:
+            for job in self._queue:
+                if job.id == job_id:
+                    self._queue.remove(job)
+                    job.cancel_event.set()
+                    self._finish(job, "cancelled")
+                    self._cond.notify_all()
+                    break
+            else:
+                job = self._running.get(job_id)
+                if job is None:
+                    return False
+                job.cancel_event.set()
+                job.message = "Cancelling..."
+        self._emit(job, "state", None)
+        return True
+
+    def jobs(self):
+        """Queued, running and finished jobs, newest first"""
+        with self._cond:
+            return list(reversed(self._queue)) + list(reversed(list(self._running.values()))) + list(reversed(self.history))
+
+    def clear_history(self):
+        with self._cond:
+            self.history.clear()
+
+    def drain(self):
+        """Everything reported since the last call, in order, as (job, kind, payload)"""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _emit(self, job, kind, payload):
+        self._events.put((job, kind, payload))
+
+    def _next_runnable(self):
+        blocked = set(self._busy)
+        for job in self._queue:
+            if not job.resources & blocked:
+                return job
+            # Later jobs wait behind this one on the resources it wants
+            blocked |= job.resources
+        return None
+
+    def _finish(self, job, state):
+        job.state = state
+        job.finished = time.time()
+        self.history.append(job)
+        metrics.JOB_DURATION.observe(job.run_seconds or 0.0, kind=job.kind, state=state)
+        metrics.JOB_WAIT.observe(job.wait_seconds, kind=job.kind)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_runnable()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_runnable()
+                self._queue.remove(job)
+                self._busy |= job.resources
+                self._running[job.id] = job
+                job.state = "running"
+                job.started = time.time()
+            self._emit(job, "state", None)
+
+            state = "done"
+            try:
+                job.result = job.fn(job)
+            except JobCancelled:
+                state = "cancelled"
+            except Exception as e:
+                job.error = e
+                state = "cancelled" if job.cancelled else "failed"
+
+            with self._cond:
+                del self._running[job.id]
+                self._busy -= job.resources
+                self._finish(job, state)
+                self._cond.notify_all()
+            self._emit(job, "state", None)
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    return f"{int(seconds // 60)}m {int(seconds % 60):02d}s"
+
 
 class ProjectManagerApp:
     def __init__(self, root):
@@ -25,13 +229,21 @@ class ProjectManagerApp:
         self.server_process = None
         self.is_server_running = False
         self.mongo_status = "Unknown"
+        self.stop_requested = False
+        self.traffic_recorder = None
+        self.fault_proxy = None
+        self.fault_job = None
+        self.edge_server = None
+        self.scheduler = JobScheduler()
 
         self.setup_styles()
         self.create_layout()
+        self.poll_jobs()
         
         # Check initial status
         self.check_server_status()
         self.check_mongodb_status()
+        self.start_metrics()
 
     def setup_styles(self):
         style = ttk.Style()
@@ -101,8 +313,14 @@ class ProjectManagerApp:
 
         # Tab 5: Logs
         self.create_logs_tab()
+
+        # Tab 6: Background Jobs
+        self.create_jobs_tab()
+
+        # Tab 7: Profiling
+        self.create_profiling_tab()
         
-        # Tab 6: System Info
+        # Tab 8: System Info
         self.create_system_tab()
 
     def create_operations_tab(self):
@@ -124,6 +342,27 @@ class ProjectManagerApp:
 
         ttk.Button(btn_frame, text="🔄 Restart", command=self.restart_server).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="🏥 Health Check", command=self.check_health, style="Success.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="📦 Build Assets", command=self.build_static_assets).pack(side=tk.LEFT, padx=5)
+
+        # Caching edge proxy for the widget's bot-config fetch
+        edge_frame = ttk.LabelFrame(tab, text="Edge Cache", padding=15)
+        edge_frame.pack(fill=tk.X, pady=(0, 20))
+
+        ttk.Label(edge_frame, text=f"Serves GET /api/chatbot/:botId from memory on {edge_cache.DEFAULT_URL}; point the widget's apiUrl there.").pack(anchor="w", pady=(0, 10))
+
+        edge_btns = ttk.Frame(edge_frame)
+        edge_btns.pack(fill=tk.X)
+        self.btn_edge = ttk.Button(edge_btns, text="⚡ Start Edge Cache", command=self.toggle_edge_cache, style="Primary.TButton")
+        self.btn_edge.pack(side=tk.LEFT, padx=5)
+        ttk.Label(edge_btns, text="TTL:").pack(side=tk.LEFT, padx=(10, 2))
+        self.edge_ttl = tk.IntVar(value=int(edge_cache.DEFAULT_TTL))
+        ttk.Spinbox(edge_btns, from_=1, to=3600, textvariable=self.edge_ttl, width=5).pack(side=tk.LEFT)
+        ttk.Label(edge_btns, text="s").pack(side=tk.LEFT, padx=(2, 10))
+        ttk.Button(edge_btns, text="🧹 Purge", command=self.purge_edge_cache).pack(side=tk.LEFT, padx=5)
+
+        self.edge_status = ttk.Label(edge_frame, text="Edge cache: not running", style="Info.TLabel")
+        self.edge_status.pack(anchor="w", pady=(10, 0))
+        self.refresh_edge_stats()
 
         # Quick Links Section
         links_frame = ttk.LabelFrame(tab, text="Quick Access", padding=15)
@@ -174,6 +413,32 @@ class ProjectManagerApp:
 
         ttk.Button(admin_frame, text="Make Admin", command=self.make_user_admin, style="Primary.TButton").pack(anchor="w")
 
+        # Bulk role changes (one DB connection for the whole list)
+        bulk_frame = ttk.LabelFrame(tab, text="Bulk Role Changes", padding=15)
+        bulk_frame.pack(fill=tk.X, pady=(0, 20))
+
+        ttk.Label(bulk_frame, text="Emails (one per line, or CSV with email[,role] columns):").pack(anchor="w", pady=(0, 5))
+        self.bulk_emails = scrolledtext.ScrolledText(bulk_frame, height=4, font=("Consolas", 9))
+        self.bulk_emails.pack(fill=tk.X, pady=(0, 10))
+
+        bulk_btns = ttk.Frame(bulk_frame)
+        bulk_btns.pack(fill=tk.X)
+        ttk.Button(bulk_btns, text="📂 Load CSV...", command=self.load_bulk_csv).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Label(bulk_btns, text="Role:").pack(side=tk.LEFT, padx=(10, 5))
+        self.bulk_role = ttk.Combobox(bulk_btns, values=bulk_admin.ROLES, state="readonly", width=8)
+        self.bulk_role.set("admin")
+        self.bulk_role.pack(side=tk.LEFT)
+        self.bulk_dry_run = tk.BooleanVar(value=True)
+        ttk.Checkbutton(bulk_btns, text="Dry run", variable=self.bulk_dry_run).pack(side=tk.LEFT, padx=10)
+        ttk.Button(bulk_btns, text="Apply", command=lambda: self.run_bulk_admin(audit=False), style="Primary.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(bulk_btns, text="Audit Roles", command=lambda: self.run_bulk_admin(audit=True)).pack(side=tk.LEFT, padx=5)
+
+        self.bulk_results = ttk.Treeview(bulk_frame, columns=("row", "email", "change", "status"), show="headings", height=5)
+        for col, heading, width in (("row", "Row", 50), ("email", "Email", 300), ("change", "Role", 140), ("status", "Result", 260)):
+            self.bulk_results.heading(col, text=heading)
+            self.bulk_results.column(col, width=width, stretch=(col == "status"))
+        self.bulk_results.pack(fill=tk.X, pady=(10, 0))
+
         # Reset Default Admin
         reset_frame = ttk.LabelFrame(tab, text="Emergency Access", padding=15)
         reset_frame.pack(fill=tk.X, pady=20)
@@ -181,6 +446,27 @@ class ProjectManagerApp:
         ttk.Label(reset_frame, text="Lost access? Re-create the default admin account (admin@chatbotbuilder.com).").pack(anchor="w", pady=(0, 10))
         ttk.Button(reset_frame, text="Reset Default Admin", command=self.reset_default_admin, style="Danger.TButton").pack(anchor="w")
 
+        # Platform stats rollup (serves GET /api/admin/stats)
+        rollup_frame = ttk.LabelFrame(tab, text="Platform Stats Rollup", padding=15)
+        rollup_frame.pack(fill=tk.X, pady=20)
+
+        ttk.Label(rollup_frame, text="Precompute admin dashboard totals. Each run only reads records added since the last one.").pack(anchor="w", pady=(0, 10))
+
+        rollup_btns = ttk.Frame(rollup_frame)
+        rollup_btns.pack(fill=tk.X)
+        ttk.Button(rollup_btns, text="Run Now", command=self.run_stats_rollup, style="Primary.TButton").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(rollup_btns, text="Full Rebuild", command=lambda: self.run_stats_rollup(full=True)).pack(side=tk.LEFT, padx=5)
+
+        self.rollup_auto = tk.BooleanVar(value=False)
+        ttk.Checkbutton(rollup_btns, text="Run every", variable=self.rollup_auto, command=self.schedule_stats_rollup).pack(side=tk.LEFT, padx=(15, 5))
+        self.rollup_interval = tk.IntVar(value=15)
+        ttk.Spinbox(rollup_btns, from_=1, to=1440, width=5, textvariable=self.rollup_interval).pack(side=tk.LEFT)
+        ttk.Label(rollup_btns, text="minutes").pack(side=tk.LEFT, padx=5)
+
+        self.rollup_status = ttk.Label(rollup_frame, text="Last run: never", style="Info.TLabel")
+        self.rollup_status.pack(anchor="w", pady=(10, 0))
+        self.rollup_job = None
+
     def create_database_tab(self):
         tab = ttk.Frame(self.notebook, padding=20)
         self.notebook.add(tab, text="   Database   ")
@@ -207,6 +493,35 @@ class ProjectManagerApp:
         ttk.Button(ops_btn_frame, text="📥 Restore Database", command=self.restore_database, style="Warning.TButton").pack(side=tk.LEFT, padx=5)
         ttk.Button(ops_btn_frame, text="🗑️ Clear All Data", command=self.clear_database, style="Danger.TButton").pack(side=tk.LEFT, padx=5)
 
+        # Fault injection between the backend and MongoDB
+        fault_frame = ttk.LabelFrame(tab, text="Fault Injection", padding=15)
+        fault_frame.pack(fill=tk.X, pady=(0, 20))
+
+        listen = f"{fault_proxy.DEFAULT_LISTEN[0]}:{fault_proxy.DEFAULT_LISTEN[1]}"
+        upstream = f"{fault_proxy.DEFAULT_UPSTREAM[0]}:{fault_proxy.DEFAULT_UPSTREAM[1]}"
+        ttk.Label(fault_frame, text=f"Proxy {listen} → mongod {upstream}. Servers started while the proxy runs connect through it.").pack(anchor="w", pady=(0, 10))
+
+        fault_opts = ttk.Frame(fault_frame)
+        fault_opts.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(fault_opts, text="Schedule:").pack(side=tk.LEFT)
+        self.fault_schedule = tk.StringVar(value="standard")
+        ttk.Combobox(fault_opts, textvariable=self.fault_schedule, values=list(fault_proxy.SCHEDULES), state="readonly", width=10).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(fault_opts, text="Load bot ID:").pack(side=tk.LEFT)
+        self.fault_bot = tk.StringVar()
+        ttk.Entry(fault_opts, textvariable=self.fault_bot, width=28).pack(side=tk.LEFT, padx=5)
+        self.fault_rate = tk.IntVar(value=20)
+        ttk.Spinbox(fault_opts, from_=1, to=500, textvariable=self.fault_rate, width=5).pack(side=tk.LEFT)
+        ttk.Label(fault_opts, text="req/s (or replay a capture)").pack(side=tk.LEFT, padx=5)
+
+        fault_btns = ttk.Frame(fault_frame)
+        fault_btns.pack(fill=tk.X)
+        self.btn_fault_proxy = ttk.Button(fault_btns, text="🔌 Start Proxy", command=self.toggle_fault_proxy)
+        self.btn_fault_proxy.pack(side=tk.LEFT, padx=5)
+        ttk.Button(fault_btns, text="⚡ Run Fault Schedule", command=lambda: self.run_fault_schedule(), style="Primary.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(fault_btns, text="⚡ Run with Capture…", command=lambda: self.run_fault_schedule(capture=True)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(fault_btns, text="⏹ Stop Run", command=self.stop_fault_schedule).pack(side=tk.LEFT, padx=5)
+        ttk.Button(fault_btns, text="📂 Results", command=self.open_fault_results).pack(side=tk.LEFT, padx=5)
+
     def create_env_tab(self):
         tab = ttk.Frame(self.notebook, padding=20)
         self.notebook.add(tab, text="   Environment (.env)   ")
@@ -232,9 +547,98 @@ class ProjectManagerApp:
         ttk.Button(btn_frame, text="🗑️ Clear Logs", command=lambda: self.log_area.delete('1.0', tk.END)).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="💾 Export Logs", command=self.export_logs).pack(side=tk.LEFT, padx=5)
 
+        # Traffic capture (from the access log) and accelerated replay
+        ttk.Separator(btn_frame, orient=tk.VERTICAL).pack(side=tk.LEFT, fill=tk.Y, padx=10)
+        self.traffic_capture = tk.BooleanVar(value=False)
+        ttk.Checkbutton(btn_frame, text="⏺ Record Traffic", variable=self.traffic_capture, command=self.toggle_traffic_capture).pack(side=tk.LEFT, padx=5)
+        ttk.Label(btn_frame, text="Replay speed:").pack(side=tk.LEFT, padx=(10, 2))
+        self.replay_speed = tk.IntVar(value=10)
+        ttk.Spinbox(btn_frame, from_=int(traffic.MIN_SPEED), to=int(traffic.MAX_SPEED), textvariable=self.replay_speed, width=4).pack(side=tk.LEFT)
+        ttk.Label(btn_frame, text="x").pack(side=tk.LEFT, padx=(2, 5))
+        ttk.Button(btn_frame, text="▶ Replay Capture…", command=self.replay_traffic).pack(side=tk.LEFT, padx=5)
+
         self.log_area = scrolledtext.ScrolledText(tab, width=80, height=20, font=("Consolas", 9), bg="#1e1e1e", fg="#d4d4d4")
         self.log_area.pack(fill=tk.BOTH, expand=True)
 
+    def create_jobs_tab(self):
+        tab = ttk.Frame(self.notebook, padding=20)
+        self.notebook.add(tab, text="   Jobs   ")
+
+        btn_frame = ttk.Frame(tab)
+        btn_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Button(btn_frame, text="⏹ Cancel Selected", command=self.cancel_selected_jobs, style="Warning.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="🗑️ Clear Finished", command=self.clear_job_history).pack(side=tk.LEFT, padx=5)
+        ttk.Label(btn_frame, text=f"{JOB_WORKERS} workers · jobs sharing a lock (db, server) run one at a time, in order", style="Info.TLabel").pack(side=tk.LEFT, padx=15)
+
+        columns = ("id", "job", "locks", "state", "queued", "ran", "status")
+        self.jobs_table = ttk.Treeview(tab, columns=columns, show="headings", height=12)
+        for col, heading, width, anchor in (("id", "#", 50, "e"), ("job", "Job", 260, "w"), ("locks", "Locks", 90, "w"),
+                                            ("state", "State", 90, "w"), ("queued", "Queued", 80, "e"),
+                                            ("ran", "Ran", 80, "e"), ("status", "Progress", 420, "w")):
+            self.jobs_table.heading(col, text=heading)
+            self.jobs_table.column(col, width=width, anchor=anchor, stretch=(col == "status"))
+        self.jobs_table.pack(fill=tk.BOTH, expand=True)
+
+        timing_frame = ttk.LabelFrame(tab, text="Timing by Operation", padding=15)
+        timing_frame.pack(fill=tk.X, pady=(20, 0))
+        columns = ("kind", "runs", "failed", "avg", "max", "last")
+        self.job_timing = ttk.Treeview(timing_frame, columns=columns, show="headings", height=6)
+        for col, heading, width, anchor in (("kind", "Operation", 200, "w"), ("runs", "Runs", 70, "e"),
+                                            ("failed", "Failed", 70, "e"), ("avg", "Avg", 90, "e"),
+                                            ("max", "Slowest", 90, "e"), ("last", "Last", 90, "e")):
+            self.job_timing.heading(col, text=heading)
+            self.job_timing.column(col, width=width, anchor=anchor, stretch=(col == "kind"))
+        self.job_timing.pack(fill=tk.X)
+
+    def create_profiling_tab(self):
+        tab = ttk.Frame(self.notebook, padding=20)
+        self.notebook.add(tab, text="   Profiling   ")
+
+        capture_frame = ttk.LabelFrame(tab, text="Capture CPU / Heap Profile", padding=15)
+        capture_frame.pack(fill=tk.X, pady=(0, 15))
+
+        options = ttk.Frame(capture_frame)
+        options.pack(fill=tk.X)
+        ttk.Label(options, text="Duration (seconds):").pack(side=tk.LEFT)
+        self.profile_duration = tk.IntVar(value=30)
+        ttk.Spinbox(options, from_=5, to=600, textvariable=self.profile_duration, width=6).pack(side=tk.LEFT, padx=(5, 15))
+        self.profile_heap = tk.BooleanVar(value=True)
+        ttk.Checkbutton(options, text="Heap sampling", variable=self.profile_heap).pack(side=tk.LEFT, padx=(0, 15))
+        self.inspector_enabled = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options, text=f"Start server with inspector ({profiler.INSPECTOR_HOST}:{profiler.INSPECTOR_PORT})",
+                        variable=self.inspector_enabled).pack(side=tk.LEFT)
+
+        btns = ttk.Frame(capture_frame)
+        btns.pack(fill=tk.X, pady=(10, 0))
+        ttk.Button(btns, text="🎯 Profile Running Server", command=self.profile_running_server, style="Primary.TButton").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(btns, text="🚀 Profiled Start (--cpu-prof)", command=self.profile_fresh_start).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btns, text="📂 Open Profile...", command=self.open_profile).pack(side=tk.LEFT, padx=5)
+
+        self.profile_status = ttk.Label(capture_frame, text="No profile captured yet", style="Info.TLabel")
+        self.profile_status.pack(anchor="w", pady=(10, 0))
+
+        results_frame = ttk.LabelFrame(tab, text="Top Functions by Self Time", padding=15)
+        results_frame.pack(fill=tk.BOTH, expand=True)
+
+        view_frame = ttk.Frame(results_frame)
+        view_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(view_frame, text="Profile:").pack(side=tk.LEFT)
+        self.profile_choice = ttk.Combobox(view_frame, state="readonly", width=60)
+        self.profile_choice.pack(side=tk.LEFT, padx=5)
+        self.profile_choice.bind("<<ComboboxSelected>>", lambda e: self.show_profile(self.profile_choice.current()))
+        ttk.Button(view_frame, text="🔥 Open Flamegraph", command=self.open_flamegraph).pack(side=tk.LEFT, padx=5)
+        ttk.Button(view_frame, text="📁 Open Folder", command=lambda: webbrowser.open(profiler.PROFILES_DIR.as_uri()) if profiler.PROFILES_DIR.exists() else None).pack(side=tk.LEFT, padx=5)
+
+        columns = ("self", "self_pct", "total", "total_pct", "function")
+        self.profile_table = ttk.Treeview(results_frame, columns=columns, show="headings", height=15)
+        for col, heading, width, anchor in (("self", "Self", 100, "e"), ("self_pct", "Self %", 70, "e"),
+                                            ("total", "Total", 100, "e"), ("total_pct", "Total %", 70, "e"),
+                                            ("function", "Function", 600, "w")):
+            self.profile_table.heading(col, text=heading)
+            self.profile_table.column(col, width=width, anchor=anchor, stretch=(col == "function"))
+        self.profile_table.pack(fill=tk.BOTH, expand=True)
+        self.profile_summaries = []
+
     def create_system_tab(self):
         tab = ttk.Frame(self.notebook, padding=20)
         self.notebook.add(tab, text="   System Info   ")
@@ -267,10 +671,104 @@ class ProjectManagerApp:
         self.log_area.see(tk.END)
         print(formatted_msg)  # Also print to console for debugging
 
+    def submit_job(self, kind, fn, name=None, resources=(), key=None, on_done=None, on_error=None):
+        """Queue work on the scheduler; callbacks run on the UI thread once it finishes"""
+        job = self.scheduler.submit(kind, fn, name=name, resources=resources, key=key, on_done=on_done, on_error=on_error)
+        if job is None:
+            self.log(f"⚠️ {name or kind} is already queued or running")
+        return job
+
+    def poll_jobs(self):
+        """Apply what the workers reported since the last tick, then reschedule"""
+        changed = {}
+        for job, kind, payload in self.scheduler.drain():
+            if kind == "log":
+                self.log(payload)
+            changed[job.id] = job
+        for job in self.scheduler.jobs():
+            if job.state == "running":
+                changed.setdefault(job.id, job)
+
+        finished = False
+        for job in changed.values():
+            self.show_job(job)
+            if job.finished and not job.reported:
+                job.reported = True
+                finished = True
+                self.finish_job(job)
+        if finished:
+            self.show_job_timing()
+        self.root.after(JOB_POLL_MS, self.poll_jobs)
+
+    def finish_job(self, job):
+        if job.state == "done":
+            self.log(f"✔ {job.name} finished in {format_seconds(job.run_seconds)}")
+            if job.on_done:
+                job.on_done(job.result)
+        elif job.state == "cancelled":
+            self.log(f"⏹ {job.name} cancelled")
+        elif job.on_error:
+            job.on_error(job.error)
+        else:
+            self.log(f"❌ {job.name} failed: {str(job.error)}")
+
+    def show_job(self, job):
+        status = job.message
+        if job.progress is not None and job.state == "running":
+            status = f"{job.progress:.0%} {status}"
+        elif job.state == "failed":
+            status = str(job.error)
+        values = (job.id, job.name, ", ".join(sorted(job.resources)) or "-", job.state,
+                  format_seconds(job.wait_seconds), format_seconds(job.run_seconds), status)
+        iid = str(job.id)
+        if self.jobs_table.exists(iid):
+            self.jobs_table.item(iid, values=values)
+            return
+        self.jobs_table.insert("", 0, iid=iid, values=values)
+        rows = self.jobs_table.get_children()
+        if len(rows) > JOB_HISTORY + JOB_WORKERS * 4:
+            self.jobs_table.delete(*rows[JOB_HISTORY:])
+
+    def show_job_timing(self):
+        by_kind = {}
+        for job in self.scheduler.history:  # oldest first, so the last run ends up last
+            if job.run_seconds is not None:
+                by_kind.setdefault(job.kind, []).append(job)
+        rows = []
+        for kind, runs in by_kind.items():
+            times = [job.run_seconds for job in runs]
+            failed = sum(1 for job in runs if job.state == "failed")
+            rows.append((max(times), kind, len(runs), failed, sum(times) / len(times), times[-1]))
+        self.job_timing.delete(*self.job_timing.get_children())
+        # Slowest operations first
+        for slowest, kind, count, failed, avg, last in sorted(rows, reverse=True):
+            self.job_timing.insert("", tk.END, values=(kind, count, failed, format_seconds(avg), format_seconds(slowest), format_seconds(last)))
+
+    def cancel_selected_jobs(self):
+        selected = self.jobs_table.selection()
+        if not selected:
+            messagebox.showinfo("Jobs", "Select a queued or running job to cancel.")
+            return
+        for iid in selected:
+            if not self.scheduler.cancel(int(iid)):
+                self.log(f"⚠️ Job #{iid} has already finished")
+
+    def clear_job_history(self):
+        self.scheduler.clear_history()
+        for iid in self.jobs_table.get_children():
+            if self.jobs_table.set(iid, "state") in ("done", "failed", "cancelled"):
+                self.jobs_table.delete(iid)
+        self.show_job_timing()
+
     def start_server(self):
         if self.is_server_running:
             self.log("⚠️ Server is already running!")
             return
+        pid = core.read_server_pid()
+        if pid:
+            # Started by manage.py or another panel; a second one would fail on the port
+            self.log(f"⚠️ Server is already running (pid {pid}); stop it with 'python manage.py server stop'")
+            return
 
         self.log("=" * 60)
         self.log("Starting server...")
@@ -299,15 +797,17 @@ class ProjectManagerApp:
                 if install_result.stderr:
                     self.root.after(0, self.log, f"STDERR: {install_result.stderr}")
             
-            # Use npm start in backend directory
-            cmd = "npm start"
+            # Use npm start in backend directory; run node directly when the
+            # inspector is wanted so npm's own node process doesn't claim the port
+            cmd = core.server_command(self.inspector_enabled.get())
             
             try:
-                self.root.after(0, self.log, f"Executing: {cmd}")
+                self.root.after(0, self.log, f"Executing: {' '.join(cmd)}")
                 self.server_process = subprocess.Popen(
                     cmd, 
-                    shell=True, 
                     cwd=BACKEND_DIR,
+                    env=core.server_env(overrides=self.fault_overrides()),
+                    start_new_session=sys.platform != "win32",
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,  # Merge stderr into stdout
                     universal_newlines=True,
@@ -317,6 +817,10 @@ class ProjectManagerApp:
                 )
                 
                 self.is_server_running = True
+                self.stop_requested = False
+                core.write_server_pid(self.server_process.pid)
+                metrics.SERVER_STARTS.inc()
+                metrics.track_process(self.server_process.pid)
                 self.root.after(0, self.update_ui_state, True)
                 self.root.after(0, self.log, "✅ Server process started. Waiting for output...")
                 
@@ -326,14 +830,23 @@ class ProjectManagerApp:
                         if not line:
                             break
                         cleaned_line = line.strip()
-                        if cleaned_line:
+                        # Access lines feed the metrics exporter (and a traffic capture) instead of the log view
+                        if not cleaned_line:
+                            continue
+                        record = metrics.observe_log_line(cleaned_line)
+                        if record is None:
                             self.root.after(0, self.log, cleaned_line)
+                        elif self.traffic_recorder:
+                            self.traffic_recorder.add_access_record(record)
                 except Exception as read_error:
                     self.root.after(0, self.log, f"Error reading output: {str(read_error)}")
                 
                 # Wait for process to end
                 self.server_process.wait()
                 return_code = self.server_process.returncode
+                metrics.SERVER_EXITS.inc(code="stopped" if self.stop_requested else str(return_code))
+                metrics.track_process(None)
+                core.write_server_pid(None)
                 
                 # If process ends
                 self.is_server_running = False
@@ -348,7 +861,7 @@ class ProjectManagerApp:
 
         threading.Thread(target=run_process, daemon=True).start()
 
-    def stop_server(self):
+    def stop_server(self, then=None):
         if not self.is_server_running or not self.server_process:
             self.log("⚠️ No server process is running")
             return
@@ -356,33 +869,38 @@ class ProjectManagerApp:
         self.log("=" * 60)
         self.log("Stopping server...")
         self.log("=" * 60)
-        
-        try:
-            # This is tricky on Windows with shell=True, often kills only the shell, not the node process.
-            # We'll try a forceful kill of node.exe for this project context
-            if sys.platform == "win32":
-                self.log("Killing all Node.js processes...")
-                result = subprocess.run("taskkill /F /IM node.exe", shell=True, capture_output=True, text=True)
-                self.log(result.stdout)
-                if result.stderr:
-                    self.log(f"STDERR: {result.stderr}")
-            else:
-                self.log("Terminating server process...")
-                self.server_process.terminate()
-                self.server_process.wait(timeout=5)
-        except Exception as e:
+        self.stop_requested = True
+        pid = self.server_process.pid
+
+        def stop(job):
+            # npm start leaves node as a child (grandchild on Windows), so stop the whole tree
+            job.log("Terminating server process tree...")
+            if not core.terminate_tree(pid):
+                job.log("⚠️ Some server processes did not exit")
+
+        def stopped(_result=None):
+            self.is_server_running = False
+            self.update_ui_state(False)
+            self.log("✅ Server stopped successfully")
+            if then:
+                then()
+
+        def failed(e):
             self.log(f"Error stopping server: {str(e)}")
-        
-        self.is_server_running = False
-        self.update_ui_state(False)
-        self.log("✅ Server stopped successfully")
+            stopped()
+
+        self.submit_job("stop-server", stop, name="Stop server", resources=("server",), on_done=stopped, on_error=failed)
 
     def restart_server(self):
         self.log("=" * 60)
         self.log("🔄 Restarting server...")
         self.log("=" * 60)
-        self.stop_server()
-        self.root.after(3000, self.start_server)
+        metrics.SERVER_RESTARTS.inc()
+        if self.is_server_running and self.server_process:
+            # Start again once the old process tree is gone and its port is free
+            self.stop_server(then=lambda: self.root.after(1000, self.start_server))
+        else:
+            self.start_server()
 
     def update_ui_state(self, running):
         if running:
@@ -443,62 +961,61 @@ class ProjectManagerApp:
         self.log("🗄️ Checking MongoDB status...")
         self.log("=" * 60)
         
-        def check():
-            try:
-                self.log("Attempting to connect to MongoDB on localhost:27017...")
-                # Try to connect via the API health endpoint or direct MongoDB check
-                # For simplicity, we'll check if MongoDB port is open
-                import socket
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(3)
-                result = sock.connect_ex(('localhost', 27017))
-                sock.close()
-                
-                self.root.after(0, self.log, f"Connection result code: {result} (0 = success)")
-                
-                if result == 0:
-                    self.mongo_status = "Connected"
-                    self.root.after(0, lambda: self.db_status_indicator.config(text="MongoDB: ✅ Connected", foreground="green"))
-                    self.root.after(0, lambda: self.db_status_label.config(text="Status: ✅ MongoDB is running on localhost:27017"))
-                    self.root.after(0, self.log, "✅ MongoDB is accessible")
-                else:
-                    self.mongo_status = "Disconnected"
-                    self.root.after(0, lambda: self.db_status_indicator.config(text="MongoDB: ❌ Offline", foreground="red"))
-                    self.root.after(0, lambda: self.db_status_label.config(text="Status: ❌ MongoDB is not accessible on port 27017"))
-                    self.root.after(0, self.log, "❌ MongoDB is not accessible. Make sure MongoDB is installed and running.")
-            except Exception as e:
-                self.mongo_status = "Error"
-                self.root.after(0, lambda: self.db_status_indicator.config(text="MongoDB: ⚠️ Error", foreground="orange"))
-                self.root.after(0, lambda: self.db_status_label.config(text=f"Status: Error - {str(e)}"))
-                self.root.after(0, self.log, f"❌ Error checking MongoDB: {str(e)}")
-        
-        threading.Thread(target=check, daemon=True).start()
+        def check(job):
+            job.log("Attempting to connect to MongoDB on localhost:27017...")
+            # Try to connect via the API health endpoint or direct MongoDB check
+            # For simplicity, we'll check if MongoDB port is open
+            import socket
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.settimeout(3)
+            started = time.perf_counter()
+            result = sock.connect_ex(('localhost', 27017))
+            elapsed = time.perf_counter() - started
+            sock.close()
+
+            job.log(f"Connection result code: {result} (0 = success)")
+            metrics.MONGO_UP.set(1 if result == 0 else 0)
+            if result == 0:
+                metrics.MONGO_CONNECT.observe(elapsed)
+            return result
+
+        def show(result):
+            if result == 0:
+                self.mongo_status = "Connected"
+                self.db_status_indicator.config(text="MongoDB: ✅ Connected", foreground="green")
+                self.db_status_label.config(text="Status: ✅ MongoDB is running on localhost:27017")
+                self.log("✅ MongoDB is accessible")
+            else:
+                self.mongo_status = "Disconnected"
+                self.db_status_indicator.config(text="MongoDB: ❌ Offline", foreground="red")
+                self.db_status_label.config(text="Status: ❌ MongoDB is not accessible on port 27017")
+                self.log("❌ MongoDB is not accessible. Make sure MongoDB is installed and running.")
+
+        def failed(e):
+            self.mongo_status = "Error"
+            self.db_status_indicator.config(text="MongoDB: ⚠️ Error", foreground="orange")
+            self.db_status_label.config(text=f"Status: Error - {str(e)}")
+            self.log(f"❌ Error checking MongoDB: {str(e)}")
+
+        self.submit_job("mongo-status", check, name="MongoDB status check", on_done=show, on_error=failed)
 
     def backup_database(self):
         if not messagebox.askyesno("Confirm Backup", "Create a backup of the database?"):
             return
         
         self.log("Creating database backup...")
-        backup_dir = os.path.join(PROJECT_ROOT, "backups")
-        os.makedirs(backup_dir, exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = os.path.join(backup_dir, f"backup_{timestamp}")
         
-        def run_backup():
-            try:
-                cmd = f'mongodump --db=chatbot-builder --out="{backup_file}"'
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                self.root.after(0, self.log, f"Backup completed: {backup_file}")
-                self.root.after(0, messagebox.showinfo, "Success", f"Database backed up to:\n{backup_file}")
-            except Exception as e:
-                self.root.after(0, self.log, f"Backup failed: {str(e)}")
-                self.root.after(0, messagebox.showerror, "Error", f"Backup failed: {str(e)}")
-        
-        threading.Thread(target=run_backup, daemon=True).start()
+        def failed(e):
+            self.log(f"Backup failed: {str(e)}")
+            messagebox.showerror("Error", f"Backup failed: {str(e)}")
+
+        self.submit_job("backup", lambda job: core.backup_database(log=job.log, cancel=job.cancel_event),
+                        name="Backup database", resources=("db",),
+                        on_done=lambda backup_dir: messagebox.showinfo("Success", f"Database backed up to:\n{backup_dir}"),
+                        on_error=failed)
 
     def restore_database(self):
-        backup_file = filedialog.askdirectory(title="Select Backup Folder")
+        backup_file = filedialog.askdirectory(title="Select Backup Folder", initialdir=str(core.BACKUPS_DIR))
         if not backup_file:
             return
         
@@ -507,17 +1024,15 @@ class ProjectManagerApp:
         
         self.log(f"Restoring database from {backup_file}...")
         
-        def run_restore():
-            try:
-                cmd = f'mongorestore --db=chatbot-builder "{backup_file}"'
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                self.root.after(0, self.log, "Database restored successfully")
-                self.root.after(0, messagebox.showinfo, "Success", "Database restored!")
-            except Exception as e:
-                self.root.after(0, self.log, f"Restore failed: {str(e)}")
-                self.root.after(0, messagebox.showerror, "Error", f"Restore failed: {str(e)}")
-        
-        threading.Thread(target=run_restore, daemon=True).start()
+        def failed(e):
+            self.log(f"Restore failed: {str(e)}")
+            messagebox.showerror("Error", f"Restore failed: {str(e)}")
+
+        # Holds the server lock too, so a profiled start can't load half-restored NeDB files
+        self.submit_job("restore", lambda job: core.restore_database(backup_file, log=job.log, cancel=job.cancel_event),
+                        name=f"Restore {os.path.basename(backup_file)}", resources=("db", "server"),
+                        on_done=lambda _result: messagebox.showinfo("Success", "Database restored!"),
+                        on_error=failed)
 
     def clear_database(self):
         if not messagebox.askyesno("⚠️ DANGER", "This will DELETE ALL DATA from the database!\n\nAre you absolutely sure?"):
@@ -529,17 +1044,246 @@ class ProjectManagerApp:
         
         self.log("Clearing database...")
         
-        def run_clear():
-            try:
-                cmd = 'mongo chatbot-builder --eval "db.dropDatabase()"'
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                self.root.after(0, self.log, "Database cleared")
-                self.root.after(0, messagebox.showinfo, "Done", "All data has been deleted")
-            except Exception as e:
-                self.root.after(0, self.log, f"Clear failed: {str(e)}")
-                self.root.after(0, messagebox.showerror, "Error", str(e))
-        
-        threading.Thread(target=run_clear, daemon=True).start()
+        def failed(e):
+            self.log(f"Clear failed: {str(e)}")
+            messagebox.showerror("Error", str(e))
+
+        self.submit_job("clear", lambda job: core.clear_database(log=job.log),
+                        name="Clear database", resources=("db", "server"),
+                        on_done=lambda _result: messagebox.showinfo("Done", "All data has been deleted"),
+                        on_error=failed)
+
+    def profile_running_server(self):
+        if not self.is_server_running or not self.server_process:
+            messagebox.showwarning("Server Not Running", "Start the server first, or use Profiled Start.")
+            return
+        self.run_profile_capture("attach")
+
+    def profile_fresh_start(self):
+        if self.is_server_running:
+            messagebox.showwarning("Server Running", "Stop the server first; the profiled server needs its port.")
+            return
+        self.run_profile_capture("run")
+
+    def run_profile_capture(self, mode):
+        duration = max(1, self.profile_duration.get())
+        heap = self.profile_heap.get()
+        pid = self.server_process.pid if self.server_process else None
+        self.profile_status.config(text=f"Profiling for {duration}s...")
+        self.log(f"📈 Capturing {'CPU + heap' if heap else 'CPU'} profile for {duration}s ({mode})...")
+
+        def capture(job):
+            if mode == "attach":
+                paths = profiler.capture_attach(duration, profiler.PROFILES_DIR, heap=heap, pid=pid, log=job.log)
+            else:
+                paths = profiler.capture_run(duration, profiler.PROFILES_DIR, heap=heap, log=job.log)
+            return [profiler.report(path) for path in paths]
+
+        def failed(e):
+            self.log(f"❌ Profiling failed: {str(e)}")
+            self.profile_status.config(text=f"Profiling failed: {str(e)}")
+
+        self.submit_job("profile", capture, name=f"Profile capture ({mode}, {duration}s)", resources=("server",),
+                        on_done=self.load_profile_summaries, on_error=failed)
+
+    def open_profile(self):
+        paths = filedialog.askopenfilenames(
+            initialdir=str(profiler.PROFILES_DIR) if profiler.PROFILES_DIR.exists() else PROJECT_ROOT,
+            filetypes=[("Node profiles", "*.cpuprofile *.heapprofile"), ("All files", "*.*")])
+        if not paths:
+            return
+
+        self.submit_job("profile-report", lambda job: [profiler.report(path) for path in paths],
+                        name=f"Analyse {len(paths)} profile(s)", on_done=self.load_profile_summaries,
+                        on_error=lambda e: self.log(f"❌ Could not read profile: {str(e)}"))
+
+    def load_profile_summaries(self, summaries):
+        if not summaries:
+            self.profile_status.config(text="No profiles were written")
+            return
+        self.profile_summaries = summaries
+        self.profile_choice.config(values=[f"{s['kind'].upper()}: {os.path.basename(s['profile'])}" for s in summaries])
+        self.profile_choice.current(0)
+        self.show_profile(0)
+        for summary in summaries:
+            self.log(f"✅ {summary['kind'].upper()} profile: {summary['profile']}")
+            self.log(f"   Flamegraph: {summary['flamegraph']} | Collapsed stacks: {summary['collapsed']}")
+
+    def show_profile(self, index):
+        summary = self.profile_summaries[index]
+        unit = summary["unit"]
+        self.profile_table.heading("self", text=f"Self ({unit})")
+        self.profile_table.heading("total", text=f"Total ({unit})")
+        self.profile_table.delete(*self.profile_table.get_children())
+        for row in summary["top"]:
+            self.profile_table.insert("", tk.END, values=(
+                f"{row['self']:,.1f}", f"{row['selfPct']:.2f}%", f"{row['total']:,.1f}", f"{row['totalPct']:.2f}%", row["function"]))
+        self.profile_status.config(text=f"{summary['kind'].upper()} profile, {summary['total']:,.1f} {unit} sampled - {summary['profile']}")
+
+    def open_flamegraph(self):
+        index = self.profile_choice.current()
+        if index < 0 or not self.profile_summaries:
+            return
+        webbrowser.open(Path(self.profile_summaries[index]["flamegraph"]).as_uri())
+
+    def toggle_traffic_capture(self):
+        if self.traffic_capture.get():
+            self.traffic_recorder = traffic.TrafficRecorder(traffic.new_capture_path())
+            self.log(f"⏺ Recording traffic to {self.traffic_recorder.path}")
+            if not self.is_server_running:
+                self.log("⚠️ Requests are recorded once the server is started from this panel")
+        elif self.traffic_recorder:
+            recorder, self.traffic_recorder = self.traffic_recorder, None
+            recorder.close()
+            self.log(f"⏹ Recorded {recorder.count} requests to {recorder.path}")
+            if recorder.untimed:
+                self.log(f"⚠️ Skipped {recorder.untimed} access lines without an arrival time; restart the backend so it logs at=")
+
+    def replay_traffic(self):
+        path = filedialog.askopenfilename(
+            title="Select Traffic Capture",
+            initialdir=str(traffic.CAPTURE_DIR) if traffic.CAPTURE_DIR.exists() else PROJECT_ROOT,
+            filetypes=[("Traffic capture", "*.jsonl"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        if not self.is_server_running:
+            messagebox.showwarning("Server Not Running", "Start the server before replaying traffic.")
+            return
+        speed = max(traffic.MIN_SPEED, min(traffic.MAX_SPEED, float(self.replay_speed.get())))
+
+        def run_replay(job):
+            records = traffic.load_capture(path)
+            return traffic.replay(records, speed=speed, stop_event=job.cancel_event, log=job.log)
+
+        def show(report):
+            for line in traffic.format_report(report).splitlines():
+                self.log(line)
+
+        self.submit_job("replay", run_replay, name=f"Replay {os.path.basename(path)} at {speed:g}x", on_done=show,
+                        on_error=lambda e: self.log(f"❌ Replay failed: {str(e)}"))
+
+    def fault_overrides(self):
+        """Point the backend at the fault proxy (and lift the rate limit) while it is running."""
+        if not (self.fault_proxy and self.fault_proxy.running):
+            return None
+        from datastore import get_mongo_uri
+        try:
+            overrides = fault_proxy.server_overrides(get_mongo_uri(), self.fault_proxy.listen)
+        except ValueError as e:
+            self.root.after(0, self.log, f"⚠️ Not using the fault proxy: {str(e)}")
+            return None
+        self.root.after(0, self.log, f"🔌 MongoDB via fault proxy: {overrides['MONGODB_URI']} (rate limit lifted for load runs)")
+        return overrides
+
+    def toggle_fault_proxy(self):
+        if self.fault_proxy and self.fault_proxy.running:
+            self.fault_proxy.stop()
+            self.fault_proxy = None
+            self.btn_fault_proxy.config(text="🔌 Start Proxy")
+            self.log("🔌 Fault proxy stopped")
+            if self.is_server_running:
+                self.log("⚠️ Restart the server to connect to MongoDB directly again")
+            return
+        try:
+            self.fault_proxy = fault_proxy.FaultProxy(log=lambda msg: self.root.after(0, self.log, msg))
+            self.fault_proxy.start()
+        except OSError as e:
+            self.fault_proxy = None
+            messagebox.showerror("Error", f"Could not start the fault proxy: {str(e)}")
+            return
+        self.btn_fault_proxy.config(text="🔌 Stop Proxy")
+        if self.is_server_running:
+            self.log("⚠️ Restart the server so it connects through the proxy")
+
+    def run_fault_schedule(self, capture=False):
+        if not (self.fault_proxy and self.fault_proxy.running):
+            messagebox.showwarning("Proxy Not Running", "Start the proxy, then (re)start the server so it connects through it.")
+            return
+        if not self.is_server_running:
+            messagebox.showwarning("Server Not Running", "Start the server through the proxy first.")
+            return
+        schedule = fault_proxy.SCHEDULES[self.fault_schedule.get()]
+        if capture:
+            path = filedialog.askopenfilename(
+                title="Select Traffic Capture",
+                initialdir=str(traffic.CAPTURE_DIR) if traffic.CAPTURE_DIR.exists() else PROJECT_ROOT,
+                filetypes=[("Traffic capture", "*.jsonl"), ("All files", "*.*")]
+            )
+            if not path:
+                return
+        else:
+            bot_id = self.fault_bot.get().strip()
+            if not bot_id:
+                messagebox.showwarning("Missing Bot", "Enter a bot ID to load, or run with a capture.")
+                return
+        self.log("=" * 60)
+        self.log(f"⚡ Running the '{self.fault_schedule.get()}' fault schedule ({sum(p[2] for p in schedule):.0f}s)...")
+
+        proxy = self.fault_proxy
+        rate = max(1, self.fault_rate.get())
+
+        def run_schedule(job):
+            if capture:
+                records = traffic.load_capture(path)
+            else:
+                records = fault_proxy.synthetic_load(f"/api/chatbot/{bot_id}", rate, sum(p[2] for p in schedule))
+            report = fault_proxy.run_experiment(proxy, schedule, records, stop_event=job.cancel_event, log=job.log)
+            return report, fault_proxy.save_results(report)
+
+        def show(result):
+            report, saved = result
+            for line in fault_proxy.format_phases(report).splitlines():
+                self.log(line)
+            self.log(f"✅ Results saved to {saved}")
+
+        self.fault_job = self.submit_job("fault-schedule", run_schedule, name=f"Fault schedule '{self.fault_schedule.get()}'",
+                                         on_done=show, on_error=lambda e: self.log(f"❌ Fault schedule failed: {str(e)}"))
+
+    def stop_fault_schedule(self):
+        if self.fault_job and self.scheduler.cancel(self.fault_job.id):
+            self.log("⏹ Stopping the fault schedule...")
+
+    def open_fault_results(self):
+        fault_proxy.RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        webbrowser.open(fault_proxy.RESULTS_DIR.as_uri())
+
+    def toggle_edge_cache(self):
+        if self.edge_server:
+            server, self.edge_server = self.edge_server, None
+            threading.Thread(target=lambda: (server.shutdown(), server.server_close()), daemon=True).start()
+            self.btn_edge.config(text="⚡ Start Edge Cache")
+            self.log(f"⚡ Edge cache stopped ({edge_cache.format_stats(server.cache.stats())})")
+            return
+        try:
+            cache = edge_cache.EdgeCache(ttl=max(1, self.edge_ttl.get()))
+            self.edge_server = edge_cache.make_server(target=traffic.DEFAULT_TARGET, cache=cache)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not start the edge cache on port {edge_cache.DEFAULT_PORT}: {str(e)}")
+            return
+        threading.Thread(target=self.edge_server.serve_forever, daemon=True).start()
+        self.btn_edge.config(text="⏹ Stop Edge Cache")
+        self.log(f"⚡ Edge cache on {edge_cache.DEFAULT_URL} -> {traffic.DEFAULT_TARGET} (TTL {cache.ttl}s)")
+
+    def purge_edge_cache(self):
+        if self.edge_server:
+            self.log(f"🧹 Purged {self.edge_server.cache.invalidate()} cached bot configs")
+        else:
+            self.log("⚠️ The edge cache is not running from this panel")
+
+    def refresh_edge_stats(self):
+        """Show hit/miss counters; a proxy started outside the panel is read over HTTP"""
+        def show(stats):
+            if stats is None:
+                self.edge_status.config(text="Edge cache: not running")
+            else:
+                self.edge_status.config(text=f"Edge cache: {edge_cache.format_stats(stats)}")
+
+        if self.edge_server:
+            show(self.edge_server.cache.stats())
+        else:
+            threading.Thread(target=lambda: self.root.after(0, show, edge_cache.fetch_stats(timeout=1)), daemon=True).start()
+        self.root.after(3000, self.refresh_edge_stats)
 
     def export_logs(self):
         log_content = self.log_area.get('1.0', tk.END)
@@ -557,18 +1301,10 @@ class ProjectManagerApp:
                 messagebox.showerror("Error", f"Failed to export logs: {str(e)}")
 
     def get_node_version(self):
-        try:
-            result = subprocess.run("node --version", shell=True, capture_output=True, text=True)
-            return result.stdout.strip()
-        except:
-            return "Not installed"
+        return core.tool_versions()["node"]
 
     def get_npm_version(self):
-        try:
-            result = subprocess.run("npm --version", shell=True, capture_output=True, text=True)
-            return result.stdout.strip()
-        except:
-            return "Not installed"
+        return core.tool_versions()["npm"]
 
     def check_server_status(self):
         # Simple check if node is running (not perfect but works for solo dev)
@@ -581,53 +1317,122 @@ class ProjectManagerApp:
             messagebox.showwarning("Input Error", "Please enter an email address.")
             return
 
+        if self.is_server_running and self.mongo_status != "Connected":
+            messagebox.showwarning("Stop Server", "The server is using NeDB and keeps users.db in memory.\nStop the server before changing roles.")
+            return
+
         if messagebox.askyesno("Confirm", f"Make {email} an Admin?"):
             self.log(f"Promoting {email} to Admin...")
             
-            def run_script():
-                try:
-                    result = subprocess.run(
-                        f"npm run make-admin {email}", 
-                        shell=True, 
-                        cwd=BACKEND_DIR,
-                        capture_output=True,
-                        text=True
-                    )
-                    self.root.after(0, self.log, result.stdout)
-                    if result.stderr:
-                        self.root.after(0, self.log, f"Error: {result.stderr}")
-                    
-                    if result.returncode == 0:
-                        self.root.after(0, messagebox.showinfo, "Success", f"{email} is now an Admin.")
-                    else:
-                        self.root.after(0, messagebox.showerror, "Error", "Failed to update user role.")
-                except Exception as e:
-                    self.root.after(0, self.log, f"Script error: {str(e)}")
-
-            threading.Thread(target=run_script, daemon=True).start()
+            def show(row):
+                self.log(f"{row['email']}: {row['status']} {row['message']}")
+                if row["status"] in (bulk_admin.UPDATED, bulk_admin.UNCHANGED):
+                    messagebox.showinfo("Success", f"{email} is now an Admin.")
+                else:
+                    messagebox.showerror("Error", f"Failed to update user role: {row['message']}")
+
+            self.submit_job("promote", lambda job: core.set_roles([email], "admin", log=job.log)["rows"][0],
+                            name=f"Promote {email}", resources=("db",), key=f"promote:{email}",
+                            on_done=show, on_error=lambda e: self.log(f"Update error: {str(e)}"))
+
+    def load_bulk_csv(self):
+        path = filedialog.askopenfilename(filetypes=[("CSV / text", "*.csv *.txt"), ("All files", "*.*")])
+        if path:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                self.bulk_emails.delete("1.0", tk.END)
+                self.bulk_emails.insert("1.0", f.read())
+
+    def run_bulk_admin(self, audit=False):
+        rows = bulk_admin.parse_rows(self.bulk_emails.get("1.0", tk.END), self.bulk_role.get())
+        if not rows:
+            messagebox.showwarning("Input Error", "Enter at least one email address.")
+            return
+        dry_run = self.bulk_dry_run.get()
+        if not audit and not dry_run:
+            if not messagebox.askyesno("Confirm", f"Apply role changes for {len(rows)} rows?"):
+                return
+            if self.is_server_running and self.mongo_status != "Connected":
+                messagebox.showwarning("Stop Server", "The server is using NeDB and keeps users.db in memory.\nStop the server before applying bulk changes.")
+                return
+        self.log(f"Bulk {'audit' if audit else 'role update'} for {len(rows)} rows{' (dry run)' if dry_run and not audit else ''}...")
+
+        self.submit_job("bulk-roles", lambda job: bulk_admin.apply_roles(rows, audit=audit, dry_run=dry_run, log=job.log),
+                        name=f"Bulk {'audit' if audit else 'role update'} ({len(rows)} rows)", resources=("db",),
+                        on_done=self.show_bulk_results, on_error=lambda e: self.log(f"❌ Bulk update failed: {str(e)}"))
+
+    def show_bulk_results(self, result):
+        self.bulk_results.delete(*self.bulk_results.get_children())
+        for row in result["rows"]:
+            change = f"{row['previousRole'] or '-'} → {row['role']}"
+            self.bulk_results.insert("", tk.END, values=(row["row"], row["email"], change, f"{row['status']}: {row['message']}"))
+        summary = ", ".join(f"{n} {status}" for status, n in result["counts"].items())
+        self.log(f"✅ Bulk result ({result['source']}, {result['seconds']}s): {summary}")
 
     def reset_default_admin(self):
         if messagebox.askyesno("Confirm", "Reset/Create default admin (admin@chatbotbuilder.com)?"):
             self.log("Resetting default admin...")
             
-            def run_script():
-                try:
-                    result = subprocess.run(
-                        "npm run create-admin", 
-                        shell=True, 
-                        cwd=BACKEND_DIR,
-                        capture_output=True,
-                        text=True
-                    )
-                    self.root.after(0, self.log, result.stdout)
-                    self.root.after(0, messagebox.showinfo, "Success", "Default admin restored.")
-                except Exception as e:
-                    self.root.after(0, self.log, f"Error: {str(e)}")
-
-            threading.Thread(target=run_script, daemon=True).start()
+            self.submit_job("reset-admin", lambda job: core.reset_default_admin(log=job.log, cancel=job.cancel_event),
+                            name="Reset default admin", resources=("db",),
+                            on_done=lambda _result: messagebox.showinfo("Success", "Default admin restored."),
+                            on_error=lambda e: self.log(f"Error: {str(e)}"))
+
+    def run_stats_rollup(self, full=False):
+        self.log(f"Running {'full' if full else 'incremental'} stats rollup...")
+
+        def run_rollup(job):
+            from stats_rollup import run_rollup as rollup
+            return rollup(full=full, log=job.log)
+
+        def show(result):
+            totals = result["totals"]
+            summary = f"Last run: {datetime.now().strftime('%H:%M:%S')} - {totals['users']} users, {totals['chatbots']} chatbots, {totals['leads']} leads, {totals['messages']} messages"
+            self.rollup_status.config(text=summary)
+
+        def failed(e):
+            self.log(f"❌ Stats rollup failed: {str(e)}")
+            self.rollup_status.config(text=f"Last run failed: {str(e)}")
+
+        self.submit_job("stats-rollup", run_rollup, name=f"{'Full' if full else 'Incremental'} stats rollup",
+                        resources=("db",), on_done=show, on_error=failed)
+
+    def build_static_assets(self, clean=False):
+        self.log("Building static assets (minify, fingerprint, precompress)...")
+
+        def run_build(job):
+            from build_assets import build
+            return build(clean=clean, log=job.log)
+
+        self.submit_job("build-assets", run_build, name="Build static assets",
+                        on_done=lambda stats: self.log(f"✅ Static assets ready: {stats['built']} rebuilt, {stats['reused']} unchanged"),
+                        on_error=lambda e: self.log(f"❌ Asset build failed: {str(e)}"))
+
+    def schedule_stats_rollup(self):
+        if self.rollup_job:
+            self.root.after_cancel(self.rollup_job)
+            self.rollup_job = None
+        if not self.rollup_auto.get():
+            return
+
+        def tick():
+            self.run_stats_rollup()
+            self.rollup_job = self.root.after(max(1, self.rollup_interval.get()) * 60 * 1000, tick)
+
+        tick()
+
+    def start_metrics(self):
+        """Serve /metrics and keep the health monitor feeding it in the background"""
+        try:
+            metrics.start()
+            self.log(f"📈 Metrics exporter on http://{metrics.DEFAULT_HOST}:{metrics.DEFAULT_PORT}/metrics")
+        except OSError as e:
+            self.log(f"⚠️ Metrics exporter not started (port {metrics.DEFAULT_PORT}): {str(e)}")
+            return
+        self.health_monitor = threading.Event()
+        threading.Thread(target=health_check.monitor, args=(15, self.health_monitor, {'Backend API': health_check.SERVICES['Backend API']}), daemon=True).start()
 
     def load_env(self):
-        env_path = os.path.join(BACKEND_DIR, '.env')
+        env_path = core.ENV_PATH
         if os.path.exists(env_path):
             with open(env_path, 'r') as f:
                 content = f.read()
@@ -637,7 +1442,7 @@ class ProjectManagerApp:
             self.env_editor.insert('1.0', "# No .env file found")
 
     def save_env(self):
-        env_path = os.path.join(BACKEND_DIR, '.env')
+        env_path = core.ENV_PATH
         content = self.env_editor.get('1.0', tk.END)
         try:
             with open(env_path, 'w') as f:
@@ -0,0 +1,484 @@
+"""
+Vectorised top-k retrieval sidecar for chatbot knowledge bases.
+
+Each bot's chunk embeddings are stored as one contiguous, pre-normalized
+float32 matrix (memory-mapped from disk), so a query is a single
+matrix-vector product plus argpartition instead of a per-chunk cosine loop.
+Bots above ANN_THRESHOLD chunks also get an IVF (k-means inverted file)
+index that only scores the closest clusters.
+
+Usage:
+    python retrieval_engine.py serve [--port 5056]
+    python retrieval_engine.py build [--source auto|mongodb|nedb] [--bot BOT_ID]
+
+The backend queries `serve` when RETRIEVAL_URL is set and pushes a bot's
+chunks whenever its knowledge base revision changes.
+"""
+import argparse
+import hashlib
+from array import array
+import json
+import re
+import shutil
+import signal
+import sys
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# ------------------------------
+# Configuration
+# ------------------------------
+INDEX_DIR = Path(__file__).resolve().parent / "cache" / "retrieval"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5056
+
+ANN_THRESHOLD = 200_000  # chunks before an IVF index is built
+ANN_NPROBE = 16  # clusters scanned per query
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 50_000
+BLOCK_ROWS = 16_384  # rows scored per block when assigning clusters
+
+_BOT_ID = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+# ------------------------------
+# Helpers
+# ------------------------------
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def knowledge_base_revision(knowledge_base: List[Dict[str, Any]]) -> str:
+    """
+    Same fingerprint as retrievalService.revisionOf() in the backend: per
+    document its id, chunk count and embedding dimension, plus the float64
+    bits of the first and last component of every embedding, so re-embedding
+    (another model, edited text) changes the revision without hashing whole
+    vectors on every query.
+    """
+    digest = hashlib.sha1()
+    for doc in knowledge_base or []:
+        chunks = doc.get("chunks") or []
+        dim = len(chunks[0].get("embedding") or []) if chunks else 0
+        digest.update(f"{doc.get('id') or ''}:{len(chunks)}:{dim}|".encode("utf-8"))
+        sample = array("d")
+        for chunk in chunks:
+            embedding = chunk.get("embedding") or []
+            sample.extend((embedding[0], embedding[-1]) if embedding else (0.0, 0.0))
+        digest.update(sample.tobytes())
+    return digest.hexdigest()
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + BLOCK_ROWS])
+        labels[start:start + BLOCK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def train_ivf(vectors: np.ndarray, nlist: int, seed: int = 0):
+    """
+    Spherical k-means over a sample of rows, then assign every row.
+
+    Returns (centroids, order, offsets): `order` lists row ids grouped by
+    cluster, and cluster c owns order[offsets[c]:offsets[c + 1]].
+    """
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    sample = np.asarray(vectors[np.sort(rng.choice(n, size=min(n, KMEANS_SAMPLE), replace=False))])
+    centroids = sample[rng.choice(sample.shape[0], size=min(nlist, sample.shape[0]), replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        assign = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        centroids = normalize_rows(sums)
+
+    labels = _assign(vectors, centroids)
+    order = np.argsort(labels, kind="stable").astype(np.int64)
+    offsets = np.zeros(centroids.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=centroids.shape[0]), out=offsets[1:])
+    return centroids.astype(np.float32), order, offsets
+
+
+# ------------------------------
+# Per-bot index
+# ------------------------------
+
+class IndexClosed(Exception):
+    """The index was replaced or dropped before the search could start."""
+
+
+class BotIndex:
+    """
+    On-disk layout (one directory per bot):
+        header.json   dim, count, revision
+        vectors.f32   count x dim float32, rows L2-normalized
+        chunks.jsonl  {"text", "source", "metadata"} per row
+        offsets.npy   byte offset of each row in chunks.jsonl
+        ivf.npz       optional centroids / order / offsets
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        header = json.loads((path / "header.json").read_text(encoding="utf-8"))
+        self.dim: int = header["dim"]
+        self.count: int = header["count"]
+        self.revision: str = header.get("revision", "")
+
+        self.vectors = np.memmap(path / "vectors.f32", dtype=np.float32, mode="r",
+                                 shape=(self.count, self.dim)) if self.count else np.empty((0, self.dim), np.float32)
+        self.chunk_offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        self._chunks = (path / "chunks.jsonl").open("rb")
+        self._read_lock = threading.Lock()
+        self._readers = 0
+        self._closing = False
+
+        self.ivf = None
+        if (path / "ivf.npz").exists():
+            with np.load(path / "ivf.npz") as data:
+                self.ivf = (data["centroids"], data["order"], data["offsets"])
+
+    @classmethod
+    def build(cls, path: Path, revision: str, chunks: Iterable[Dict[str, Any]],
+              ann_threshold: int = ANN_THRESHOLD) -> "BotIndex":
+        """Write a fresh index from {"text", "embedding", "source", "metadata"} dicts."""
+        path.mkdir(parents=True, exist_ok=True)
+        dim = 0
+        count = 0
+        offsets: List[int] = []
+
+        with (path / "vectors.f32").open("wb") as vec_f, (path / "chunks.jsonl").open("wb") as chunk_f:
+            for chunk in chunks:
+                embedding = chunk.get("embedding")
+                if not embedding:
+                    continue
+                vec = np.asarray(embedding, dtype=np.float32)
+                if not dim:
+                    dim = vec.shape[0]
+                if vec.shape[0] != dim:
+                    continue  # mixed models; keep the first dimension seen
+                norm = float(np.linalg.norm(vec))
+                vec_f.write((vec / norm if norm else vec).tobytes())
+
+                offsets.append(chunk_f.tell())
+                chunk_f.write(json.dumps({
+                    "text": chunk.get("text", ""),
+                    "source": chunk.get("source"),
+                    "metadata": chunk.get("metadata"),
+                }, default=str).encode("utf-8") + b"\n")
+                count += 1
+
+        np.save(path / "offsets.npy", np.asarray(offsets, dtype=np.int64))
+        (path / "header.json").write_text(json.dumps({"dim": dim, "count": count, "revision": revision}),
+                                          encoding="utf-8")
+
+        if count >= ann_threshold:
+            vectors = np.memmap(path / "vectors.f32", dtype=np.float32, mode="r", shape=(count, dim))
+            nlist = max(1, int(np.sqrt(count)))
+            centroids, order, list_offsets = train_ivf(vectors, nlist)
+            np.savez(path / "ivf.npz", centroids=centroids, order=order, offsets=list_offsets)
+            del vectors
+
+        return cls(path)
+
+    def _chunk(self, row: int) -> Dict[str, Any]:
+        with self._read_lock:
+            self._chunks.seek(int(self.chunk_offsets[row]))
+            return json.loads(self._chunks.readline())
+
+    def search(self, embedding: List[float], k: int = 3, exact: bool = False,
+               nprobe: int = ANN_NPROBE) -> List[Dict[str, Any]]:
+        with self._read_lock:
+            if self._closing:
+                raise IndexClosed(self.path.name)
+            self._readers += 1
+        try:
+            if not self.count:
+                return []
+            query = np.asarray(embedding, dtype=np.float32)
+            if query.shape[0] != self.dim:
+                raise ValueError(f"Query has {query.shape[0]} dimensions, index has {self.dim}")
+            norm = float(np.linalg.norm(query))
+            if norm:
+                query = query / norm
+
+            if self.ivf is not None and not exact:
+                centroids, order, offsets = self.ivf
+                probes = top_k(centroids @ query, nprobe)
+                rows = np.sort(np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probes]))
+                scores = self.vectors[rows] @ query
+                best = rows[top_k(scores, k)]
+                best_scores = self.vectors[best] @ query
+            else:
+                scores = self.vectors @ query
+                best = top_k(scores, k)
+                best_scores = scores[best]
+
+            results = []
+            for row, score in zip(best.tolist(), best_scores.tolist()):
+                chunk = self._chunk(row)
+                chunk["similarity"] = score
+                results.append(chunk)
+            return results
+        finally:
+            with self._read_lock:
+                self._readers -= 1
+                release = self._closing and not self._readers
+            if release:
+                self._release()
+
+    def close(self):
+        """Unmap the vectors and close chunks.jsonl once in-flight searches are done."""
+        with self._read_lock:
+            self._closing = True
+            release = not self._readers
+        if release:
+            self._release()
+
+    def _release(self):
+        self._chunks.close()
+        self.vectors = None
+        self.chunk_offsets = None
+
+
+def chunks_from_knowledge_base(knowledge_base: List[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+    """Flatten a chatbot's knowledgeBase array in the order aiService walks it."""
+    for doc in knowledge_base or []:
+        for chunk in doc.get("chunks") or []:
+            yield {
+                "text": chunk.get("text", ""),
+                "embedding": chunk.get("embedding"),
+                "source": doc.get("filename"),
+                "metadata": chunk.get("metadata"),
+            }
+
+
+# ------------------------------
+# Index registry
+# ------------------------------
+
+class RetrievalEngine:
+    """Loads bot indexes lazily and swaps rebuilt ones in atomically."""
+
+    def __init__(self, index_dir: Path = INDEX_DIR):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, BotIndex] = {}
+
+    def get(self, bot_id: str) -> Optional[BotIndex]:
+        with self._lock:
+            index = self._indexes.get(bot_id)
+            if index is None and (self.index_dir / bot_id / "header.json").exists():
+                index = self._indexes[bot_id] = BotIndex(self.index_dir / bot_id)
+            return index
+
+    def put(self, bot_id: str, revision: str, chunks: Iterable[Dict[str, Any]]) -> BotIndex:
+        staging = self.index_dir / f".{bot_id}.{uuid.uuid4().hex}"
+        BotIndex.build(staging, revision, chunks).close()
+
+        target = self.index_dir / bot_id
+        retired = self.index_dir / f".{bot_id}.old.{uuid.uuid4().hex}"
+        with self._lock:
+            old = self._indexes.pop(bot_id, None)
+            if target.exists():
+                target.rename(retired)
+            staging.rename(target)
+            index = self._indexes[bot_id] = BotIndex(target)
+        if old is not None:
+            # Searches already running on it finish first; the maps and file handle go with the last one
+            old.close()
+        shutil.rmtree(retired, ignore_errors=True)
+        return index
+
+    def drop(self, bot_id: str) -> bool:
+        with self._lock:
+            old = self._indexes.pop(bot_id, None)
+            target = self.index_dir / bot_id
+            existed = target.exists()
+            shutil.rmtree(target, ignore_errors=True)
+        if old is not None:
+            old.close()
+        return existed
+
+    def close(self):
+        with self._lock:
+            for index in self._indexes.values():
+                index.close()
+            self._indexes.clear()
+
+
+# ------------------------------
+# HTTP service (localhost only)
+# ------------------------------
+
+class _RetrievalRequestHandler(BaseHTTPRequestHandler):
+    engine: RetrievalEngine = None  # set by serve()
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Optional[Dict[str, Any]]:
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def _route(self):
+        """Split /bots/<botId>[/search] into (botId, action)."""
+        parts = self.path.strip("/").split("/")
+        if len(parts) in (2, 3) and parts[0] == "bots" and _BOT_ID.match(parts[1]):
+            return parts[1], parts[2] if len(parts) == 3 else ""
+        return None, None
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+            return
+        bot_id, action = self._route()
+        index = self.engine.get(bot_id) if bot_id and not action else None
+        if index is None:
+            self._send_json(404, {"error": "Index not found"})
+            return
+        self._send_json(200, {"botId": bot_id, "count": index.count, "dim": index.dim,
+                              "revision": index.revision, "ann": index.ivf is not None})
+
+    def do_PUT(self):
+        bot_id, action = self._route()
+        data = self._read_json()
+        if not bot_id or action or data is None:
+            self._send_json(400, {"error": "Expected PUT /bots/<botId> with a JSON body"})
+            return
+        index = self.engine.put(bot_id, str(data.get("revision", "")),
+                                chunks_from_knowledge_base(data.get("knowledgeBase") or []))
+        self._send_json(200, {"botId": bot_id, "count": index.count, "revision": index.revision})
+
+    def do_DELETE(self):
+        bot_id, action = self._route()
+        if not bot_id or action:
+            self._send_json(404, {"error": "Not found"})
+            return
+        self._send_json(200, {"deleted": self.engine.drop(bot_id)})
+
+    def do_POST(self):
+        bot_id, action = self._route()
+        data = self._read_json()
+        if not bot_id or action != "search" or data is None or not isinstance(data.get("embedding"), list):
+            self._send_json(400, {"error": "Expected POST /bots/<botId>/search with 'embedding'"})
+            return
+
+        # A concurrent PUT can close the index between get() and search(); look it up again once
+        for attempt in range(2):
+            index = self.engine.get(bot_id)
+            if index is None:
+                self._send_json(404, {"error": "Index not found"})
+                return
+            revision = data.get("revision")
+            if revision is not None and revision != index.revision:
+                self._send_json(409, {"error": "Index is stale", "revision": index.revision})
+                return
+            try:
+                results = index.search(data["embedding"], int(data.get("topK", 3)), bool(data.get("exact")))
+            except IndexClosed:
+                continue
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._send_json(200, {"results": results})
+            return
+        self._send_json(409, {"error": "Index is being replaced"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, index_dir: Path = INDEX_DIR):
+    engine = RetrievalEngine(index_dir)
+    handler = type("RetrievalRequestHandler", (_RetrievalRequestHandler,), {"engine": engine})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, interrupt)
+    print(f"Retrieval engine listening on http://{host}:{port} ({index_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        engine.close()
+
+
+def build_from_database(index_dir: Path = INDEX_DIR, source: str = "auto", bot_id: Optional[str] = None) -> int:
+    """Index every chatbot (or one) straight from MongoDB / NeDB."""
+    from datastore import iter_documents
+
+    engine = RetrievalEngine(index_dir)
+    built = 0
+    query = {"botId": bot_id} if bot_id else None
+    for bot in iter_documents("chatbots", source, query):
+        if not _BOT_ID.match(str(bot.get("botId", ""))):
+            continue
+        knowledge_base = bot.get("knowledgeBase") or []
+        index = engine.put(bot["botId"], knowledge_base_revision(knowledge_base),
+                           chunks_from_knowledge_base(knowledge_base))
+        print(f"{bot['botId']}: {index.count} chunks{' (ANN)' if index.ivf is not None else ''}")
+        built += 1
+    engine.close()
+    return built
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Vectorised top-k retrieval sidecar")
+    parser.add_argument("--dir", type=Path, default=INDEX_DIR, help="Index directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="Run the localhost retrieval service")
+    p_serve.add_argument("--host", default=DEFAULT_HOST)
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    p_build = sub.add_parser("build", help="Build indexes from the database")
+    p_build.add_argument("--source", choices=["auto", "mongodb", "nedb"], default="auto")
+    p_build.add_argument("--bot", help="Only index this botId")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(args.host, args.port, args.dir)
+    else:
+        print(f"Indexed {build_from_database(args.dir, args.source, args.bot)} chatbot(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Incremental platform stats rollup for GET /api/admin/stats.
+
+The headline user, admin, chatbot and lead totals are recounted on every
+run (index or metadata counts on MongoDB), so deletions and role changes
+show up straight away. Only the per-day sign-up buckets and the message
+total are incremental: each run reads users, chatbots and leads created
+since the last checkpoint, plus chatbots updated since then, with just the
+fields it needs. The rollup is stored where the backend reads it: the
+`statsrollups` collection on MongoDB, or backend/data/stats_rollup.json on
+NeDB.
+
+Usage:
+    python stats_rollup.py [--source auto|mongodb|nedb] [--full]
+
+Per-day buckets keep counting records that were later deleted; --full
+rebuilds them from scratch.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from datastore import DATA_DIR, count_documents, iter_documents, open_mongo, resolve_source
+
+# ------------------------------
+# Configuration
+# ------------------------------
+ROLLUP_FILE = DATA_DIR / "stats_rollup.json"
+ROLLUP_COLLECTION = "statsrollups"
+ROLLUP_ID = "platform"
+DAILY_RETENTION = 400  # days of per-day counters kept
+# Accounts without a role are regular users, as in the User model
+USER_ROLE = {"role": {"$in": ["user", None]}}
+
+
+def _empty_rollup() -> Dict[str, Any]:
+    return {
+        "_id": ROLLUP_ID,
+        "version": 1,
+        "generatedAt": None,
+        "totals": {"users": 0, "admins": 0, "chatbots": 0, "leads": 0, "messages": 0},
+        "daily": {},
+        "checkpoints": {},
+        "botMessages": {},
+    }
+
+
+def _as_utc(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str):
+        try:
+            return _as_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+        except ValueError:
+            return None
+    return None
+
+
+# ------------------------------
+# Storage
+# ------------------------------
+
+def load_rollup(source: str) -> Dict[str, Any]:
+    if source == "mongodb":
+        client, db = open_mongo()
+        try:
+            doc = db[ROLLUP_COLLECTION].find_one({"_id": ROLLUP_ID})
+        finally:
+            client.close()
+        return doc or _empty_rollup()
+    if ROLLUP_FILE.exists():
+        return json.loads(ROLLUP_FILE.read_text(encoding="utf-8"))
+    return _empty_rollup()
+
+
+def save_rollup(source: str, rollup: Dict[str, Any]):
+    if source == "mongodb":
+        client, db = open_mongo()
+        try:
+            db[ROLLUP_COLLECTION].replace_one({"_id": ROLLUP_ID}, rollup, upsert=True)
+        finally:
+            client.close()
+        return
+    ROLLUP_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ROLLUP_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(rollup, default=str), encoding="utf-8")
+    tmp.replace(ROLLUP_FILE)
+
+
+# ------------------------------
+# Incremental scans
+# ------------------------------
+
+def _scan_since(store: str, source: str, checkpoint: Optional[Dict[str, Any]], field: str,
+                result: Dict[str, Any], projection: List[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield documents whose `field` is at or after the checkpoint, skipping the
+    ids already processed at exactly the checkpoint time. The new checkpoint
+    is left in result["checkpoint"]. On MongoDB the range and sort run on the
+    models' {field: 1} index.
+    """
+    since = _as_utc(checkpoint["at"]) if checkpoint else None
+    seen = set(checkpoint.get("ids", [])) if checkpoint else set()
+    query = {field: {"$gte": since}} if since else None
+
+    newest, newest_ids = since, set(seen)
+    for doc in iter_documents(store, source, query, sort=[(field, 1)], projection=[field] + projection):
+        ts = _as_utc(doc.get(field))
+        doc_id = str(doc.get("_id"))
+        if since is not None and ts == since and doc_id in seen:
+            continue
+        yield doc
+        if ts is None:
+            continue
+        if newest is None or ts > newest:
+            newest, newest_ids = ts, {doc_id}
+        elif ts == newest:
+            newest_ids.add(doc_id)
+
+    result["checkpoint"] = {"at": newest.isoformat(), "ids": sorted(newest_ids)} if newest else checkpoint
+
+
+def run_rollup(source: str = "auto", full: bool = False, log: Callable[[str], None] = print) -> Dict[str, Any]:
+    source = resolve_source(source)
+    started = time.perf_counter()
+    rollup = _empty_rollup() if full else load_rollup(source)
+    totals, daily, checkpoints = rollup["totals"], rollup["daily"], rollup["checkpoints"]
+    processed: Dict[str, int] = {}
+
+    def bump(day: str, key: str):
+        counters = daily.setdefault(day, {"users": 0, "chatbots": 0, "leads": 0})
+        counters[key] += 1
+
+    # Live counts, so deletions and role changes never drift
+    users = count_documents("users", source, USER_ROLE)
+    totals.update(users=users, admins=count_documents("users", source) - users,
+                  chatbots=count_documents("chatbots", source), leads=count_documents("leads", source))
+
+    for store in ("users", "chatbots", "leads"):
+        result: Dict[str, Any] = {}
+        count = 0
+        for doc in _scan_since(store, source, checkpoints.get(store), "createdAt", result,
+                               ["role"] if store == "users" else []):
+            count += 1
+            created = _as_utc(doc.get("createdAt"))
+            if created is not None and (store != "users" or doc.get("role", "user") == "user"):
+                bump(created.strftime("%Y-%m-%d"), store)
+        checkpoints[store] = result.get("checkpoint")
+        processed[store] = count
+
+    # Message totals live on each chatbot and change in place, so keep the
+    # last value seen per bot, refreshed for bots updated since last time.
+    result = {}
+    bot_messages = rollup["botMessages"]
+    updated = 0
+    for bot in _scan_since("chatbots", source, checkpoints.get("chatbotUpdates"), "updatedAt", result,
+                           ["botId", "stats.totalMessages"]):
+        bot_id = str(bot.get("botId") or bot.get("_id"))
+        bot_messages[bot_id] = int((bot.get("stats") or {}).get("totalMessages") or 0)
+        updated += 1
+    checkpoints["chatbotUpdates"] = result.get("checkpoint")
+    processed["chatbotUpdates"] = updated
+
+    # Deleted bots take their messages with them
+    existing = {str(bot.get("botId") or bot.get("_id")) for bot in iter_documents("chatbots", source, projection=["botId"])}
+    for bot_id in set(bot_messages) - existing:
+        del bot_messages[bot_id]
+    totals["messages"] = sum(bot_messages.values())
+
+    for day in sorted(daily)[:-DAILY_RETENTION]:
+        del daily[day]
+
+    rollup["generatedAt"] = datetime.now(timezone.utc).isoformat()
+    save_rollup(source, rollup)
+
+    elapsed = time.perf_counter() - started
+    log(f"Stats rollup ({source}) processed {processed} in {elapsed:.2f}s; totals {totals}")
+    return rollup
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Incrementally roll up platform stats for the admin dashboard")
+    parser.add_argument("--source", choices=["auto", "mongodb", "nedb"], default="auto")
+    parser.add_argument("--full", action="store_true", help="Discard checkpoints and rebuild from scratch")
+    args = parser.parse_args(argv)
+    run_rollup(args.source, args.full)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
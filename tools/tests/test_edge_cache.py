@@ -0,0 +1,91 @@
+"""
+Edge cache CORS: one cached bot config served to several embedding sites.
+
+Run with: python -m pytest tools/tests
+"""
+import http.client
+import json
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import edge_cache  # noqa: E402
+
+
+class _ReflectingBackend(BaseHTTPRequestHandler):
+    """Answers like server.js's cors(): echoes Origin, credentials, Vary: Origin."""
+    protocol_version = "HTTP/1.1"
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        type(self).requests += 1
+        body = json.dumps({"botId": self.path.rsplit("/", 1)[-1], "name": "Bot"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        origin = self.headers.get("Origin")
+        if origin:
+            self.send_header("Access-Control-Allow-Origin", origin)
+        self.send_header("Access-Control-Allow-Credentials", "true")
+        self.send_header("Vary", "Origin")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class EdgeCacheCorsTest(unittest.TestCase):
+    def setUp(self):
+        _ReflectingBackend.requests = 0
+        self.backend = _serve(ThreadingHTTPServer(("127.0.0.1", 0), _ReflectingBackend))
+        target = f"http://127.0.0.1:{self.backend.server_address[1]}"
+        self.proxy = _serve(edge_cache.make_server("127.0.0.1", 0, target))
+        self.proxy.RequestHandlerClass.allowed_origins = None  # development policy, whatever backend/.env says
+
+    def tearDown(self):
+        for server in (self.proxy, self.backend):
+            server.shutdown()
+            server.server_close()
+
+    def get(self, origin=None):
+        conn = http.client.HTTPConnection("127.0.0.1", self.proxy.server_address[1], timeout=5)
+        conn.request("GET", "/api/chatbot/bot_cors", headers={"Origin": origin} if origin else {})
+        response = conn.getresponse()
+        response.read()
+        conn.close()
+        return response
+
+    def test_each_origin_gets_its_own_allow_origin(self):
+        first = self.get("https://siteA.com")
+        second = self.get("https://siteB.com")
+        anonymous = self.get()
+
+        self.assertEqual(first.getheader("X-Edge-Cache"), "MISS")
+        self.assertEqual(second.getheader("X-Edge-Cache"), "HIT")
+        self.assertEqual(_ReflectingBackend.requests, 1)
+        self.assertEqual(first.getheader("Access-Control-Allow-Origin"), "https://siteA.com")
+        self.assertEqual(second.getheader("Access-Control-Allow-Origin"), "https://siteB.com")
+        self.assertIsNone(anonymous.getheader("Access-Control-Allow-Origin"))
+        self.assertIn("Origin", second.getheader("Vary"))
+        self.assertEqual(len(second.msg.get_all("Access-Control-Allow-Credentials")), 1)
+
+    def test_production_allow_list(self):
+        self.proxy.RequestHandlerClass.allowed_origins = frozenset({"https://siteA.com"})
+        self.get("https://siteA.com")
+        refused = self.get("https://siteB.com")
+        self.assertEqual(refused.getheader("X-Edge-Cache"), "HIT")
+        self.assertIsNone(refused.getheader("Access-Control-Allow-Origin"))
+
+
+if __name__ == "__main__":
+    unittest.main()
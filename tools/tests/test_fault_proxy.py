@@ -0,0 +1,81 @@
+"""
+Fault proxy resets: clients must see a RST, never a clean EOF first.
+
+Run with: python -m pytest tools/tests
+"""
+import socket
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fault_proxy  # noqa: E402
+
+
+def _echo_server() -> socket.socket:
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+
+    def handle(conn):
+        with conn:
+            try:
+                while True:
+                    data = conn.recv(65536)
+                    if not data:
+                        return
+                    conn.sendall(data)
+            except OSError:
+                pass
+
+    def accept():
+        while True:
+            try:
+                conn, _addr = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return server
+
+
+class FaultProxyResetTest(unittest.TestCase):
+    def setUp(self):
+        self.upstream = _echo_server()
+        self.proxy = fault_proxy.FaultProxy(("127.0.0.1", 0), self.upstream.getsockname(), log=lambda message: None)
+        self.proxy.start()
+        self.address = self.proxy._server.getsockname()
+
+    def tearDown(self):
+        self.proxy.stop()
+        self.upstream.close()
+
+    def connect(self) -> socket.socket:
+        client = socket.create_connection(self.address, timeout=5)
+        client.sendall(b"ping")
+        self.assertEqual(client.recv(16), b"ping")
+        return client
+
+    def test_reset_reaches_a_waiting_client_as_rst(self):
+        # The pumps wake in either order; repeat so both orders are exercised
+        for _ in range(20):
+            client = self.connect()
+            self.proxy.set_fault("reset")
+            with client, self.assertRaises(ConnectionResetError):
+                client.recv(16)
+            self.proxy.set_fault("none")
+
+    def test_reset_refuses_new_connections_with_rst(self):
+        self.proxy.set_fault("reset")
+        # The RST can land before create_connection() has even returned
+        with self.assertRaises(ConnectionResetError):
+            with socket.create_connection(self.address, timeout=5) as client:
+                client.recv(16)
+        self.assertEqual(self.proxy.stats["refused"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,514 @@
+"""
+Traffic capture and accelerated replay.
+
+Captures real request timing, route and payload size, then re-issues that
+traffic against a local backend 1x-50x faster with the same inter-arrival
+pattern (widget loads bursting into chat posts), to size rate limits and
+capacity with realistic load.
+
+Capture sources:
+    - the supervised backend's access log (ACCESS_LOG=1): the control panel's
+      Record Traffic switch, or `capture` over a saved log / stdin
+    - a recording proxy in front of the backend, which also keeps request
+      bodies with --bodies
+
+Access lines without the arrival time (at=) are skipped with a warning,
+since their print time would collapse the inter-arrival gaps. Both
+sources name routes after the backend's Express routes (/api/chat/:botId).
+
+Replayed requests without a recorded body get a synthetic one of the
+recorded size (chat posts get a message and a per-client sessionId).
+Chat posts reach whatever AI provider the target backend is configured
+with; use --exclude to leave them out or point the target at a backend
+without real keys.
+
+Per-client rate limiting is only realistic when the backend trusts
+X-Forwarded-For (TRUST_PROXY=loopback); the replayer then sends each
+recorded client from its own address.
+
+Usage:
+    python traffic.py capture [LOGFILE|-] [--follow] [--out FILE]
+    python traffic.py proxy [--listen 127.0.0.1:5080] [--target http://localhost:5000] [--bodies] [--out FILE]
+    python traffic.py replay FILE [--speed 10] [--target URL] [--concurrency 64] [--exclude REGEX] [--json OUT]
+"""
+import argparse
+import base64
+import hashlib
+import http.client
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from manager_core import BACKEND_DIR
+from metrics_exporter import parse_access_line
+
+# ------------------------------
+# Configuration
+# ------------------------------
+CAPTURE_DIR = Path(__file__).resolve().parent / "exports" / "traffic"
+DEFAULT_TARGET = "http://localhost:5000"
+DEFAULT_PROXY = ("127.0.0.1", 5080)
+MIN_SPEED, MAX_SPEED = 1.0, 50.0
+HOP_HEADERS = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te",
+               "trailers", "transfer-encoding", "upgrade", "host", "content-length"}
+ID_SEGMENT = re.compile(r"^(bot_[\w-]+|[0-9a-f]{24}|[0-9a-f-]{36}|\d+)$", re.IGNORECASE)
+# Express route registrations in backend/server.js and backend/routes/*.js
+ROUTER_REQUIRE = re.compile(r"""const\s+(\w+)\s*=\s*require\(\s*['"]\./routes/([\w-]+)['"]\s*\)""")
+APP_ROUTE = re.compile(r"""^\s*app\.(get|post|put|patch|delete|all)\(\s*['"]([^'"]+)['"]""")
+APP_MOUNT = re.compile(r"""^\s*app\.use\(\s*['"]([^'"]+)['"]\s*,\s*(\w+)\s*\)""")
+ROUTER_ROUTE = re.compile(r"""^\s*router\.(get|post|put|patch|delete|all)\(\s*['"]([^'"]+)['"]""")
+
+
+def new_capture_path() -> Path:
+    CAPTURE_DIR.mkdir(parents=True, exist_ok=True)
+    return CAPTURE_DIR / f"capture_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+
+# ------------------------------
+# Capture
+# ------------------------------
+
+class TrafficRecorder:
+    """Appends one JSON line per request; safe to call from several threads."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.count = 0
+        self.untimed = 0  # access lines without an arrival time, left out
+        self._lock = threading.Lock()
+        self._file = self.path.open("a", encoding="utf-8")
+
+    def add(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + "\n")
+            self.count += 1
+            if self.count % 100 == 0:
+                self._file.flush()
+
+    def add_access_record(self, record: Dict[str, Any]):
+        """Store a metrics_exporter.parse_access_line() record; lines without `at` are skipped."""
+        # Lines are printed when the response finishes, so the read time would
+        # bunch requests up by completion and lose their inter-arrival gaps
+        if not record.get("at"):
+            with self._lock:
+                self.untimed += 1
+            return
+        self.add({
+            "t": round(record["at"], 3), "method": record["method"], "route": record["route"],
+            "path": record["path"], "status": record["status"], "ms": record["ms"],
+            "reqBytes": record["reqBytes"], "resBytes": record["resBytes"], "client": record.get("client"),
+        })
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def capture_lines(lines: Iterable[str], recorder: TrafficRecorder) -> int:
+    for line in lines:
+        record = parse_access_line(line)
+        if record is not None:
+            recorder.add_access_record(record)
+    return recorder.count
+
+
+def _follow(stream) -> Iterable[str]:
+    while True:
+        line = stream.readline()
+        if line:
+            yield line
+        else:
+            time.sleep(0.2)
+
+
+@lru_cache(maxsize=1)
+def backend_routes() -> Tuple[Tuple[str, str, "re.Pattern"], ...]:
+    """
+    (METHOD, template, pattern) for every Express route, in registration
+    order, read from backend/server.js and the routers it mounts.
+    """
+    try:
+        server = (BACKEND_DIR / "server.js").read_text(encoding="utf-8")
+    except OSError:
+        return ()
+    routers = dict(ROUTER_REQUIRE.findall(server))
+    routes = []
+
+    def add(method: str, template: str):
+        # Named as accessLog.js names it (baseUrl + route path); matched like Express, trailing slash optional
+        pattern = re.sub(r":\w+", "[^/]+", re.escape(template.rstrip("/")).replace("\\:", ":"))
+        routes.append((method.upper(), template, re.compile(f"^{pattern}/?$", re.IGNORECASE)))
+
+    for line in server.splitlines():
+        match = APP_ROUTE.match(line)
+        if match:
+            add(*match.groups())
+            continue
+        match = APP_MOUNT.match(line)
+        if match and match.group(2) in routers:
+            prefix = match.group(1).rstrip("/")
+            try:
+                source = (BACKEND_DIR / "routes" / f"{routers[match.group(2)]}.js").read_text(encoding="utf-8")
+            except OSError:
+                continue
+            for route in source.splitlines():
+                found = ROUTER_ROUTE.match(route)
+                if found:
+                    add(found.group(1), prefix + found.group(2))
+    return tuple(routes)
+
+
+def route_of(path: str, method: str = "GET") -> str:
+    """
+    Route template for a raw path, named like the backend's access log
+    (/api/chatbot/:botId, 'unmatched', 'static'): the first Express route
+    that matches, as Express would pick it. Without the backend sources ids
+    are templated as :id.
+    """
+    url = urlsplit(path).path
+    routes = backend_routes()
+    if not routes:
+        return "/".join(":id" if ID_SEGMENT.match(part) else part for part in url.split("/"))
+    method = "GET" if method.upper() == "HEAD" else method.upper()
+    for route_method, template, pattern in routes:
+        if route_method in (method, "ALL") and pattern.match(url):
+            return template
+    return "unmatched" if url.startswith("/api/") else "static"
+
+
+def record_proxy(target: str = DEFAULT_TARGET, host: str = DEFAULT_PROXY[0], port: int = DEFAULT_PROXY[1],
+                 recorder: Optional[TrafficRecorder] = None, bodies: bool = False) -> ThreadingHTTPServer:
+    """
+    Forward every request to `target` and record it. Returns the server; call
+    serve_forever() on it (or run it in a thread) and shutdown() to stop.
+    """
+    upstream = urlsplit(target)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _forward(self):
+            arrived = time.time()
+            started = time.perf_counter()
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else None
+            headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_HEADERS}
+            forwarded = self.headers.get("X-Forwarded-For")
+            headers["X-Forwarded-For"] = f"{forwarded}, {self.client_address[0]}" if forwarded else self.client_address[0]
+
+            conn = http.client.HTTPConnection(upstream.hostname, upstream.port or 80, timeout=60)
+            try:
+                conn.request(self.command, self.path, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+                status = response.status
+                self.send_response(status, response.reason)
+                for key, value in response.getheaders():
+                    if key.lower() not in HOP_HEADERS:
+                        self.send_header(key, value)
+            except OSError as e:
+                status, payload = 502, f"Upstream error: {e}".encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain")
+            finally:
+                conn.close()
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(payload)
+
+            if recorder:
+                entry = {
+                    "t": round(arrived, 3), "method": self.command, "route": route_of(self.path, self.command), "path": self.path,
+                    "status": status, "ms": round((time.perf_counter() - started) * 1000, 1),
+                    "reqBytes": length, "resBytes": len(payload), "client": _client_id(self.client_address[0]),
+                }
+                if bodies and body:
+                    entry["body"] = base64.b64encode(body).decode()
+                    entry["contentType"] = self.headers.get("Content-Type")
+                recorder.add(entry)
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _forward
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def _client_id(address: str) -> str:
+    return hashlib.sha1(address.encode()).hexdigest()[:8]
+
+
+# ------------------------------
+# Replay
+# ------------------------------
+
+def load_capture(path: Path, exclude: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    pattern = re.compile(exclude) if exclude else None
+    records = []
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a capture cut off mid-line
+            if pattern and (pattern.search(record.get("route", "")) or pattern.search(record.get("path", ""))):
+                continue
+            records.append(record)
+    records.sort(key=lambda r: r["t"])
+    return records[:limit] if limit else records
+
+
+def _is_chat(record: Dict[str, Any]) -> bool:
+    route = record.get("route", "")
+    return route.endswith("/chat") or route.startswith("/api/chat/")
+
+
+def request_body(record: Dict[str, Any]) -> Optional[bytes]:
+    """The recorded body, or a synthetic JSON body of the recorded size."""
+    if record.get("body"):
+        return base64.b64decode(record["body"])
+    size = record.get("reqBytes") or 0
+    if record["method"] in ("GET", "HEAD", "DELETE", "OPTIONS") or not size:
+        return None
+    if _is_chat(record):
+        payload = {"sessionId": f"replay_{record.get('client') or 'anon'}", "message": ""}
+        field = "message"
+    else:
+        payload, field = {"replay": ""}, "replay"
+    payload[field] = "x" * max(1, size - len(json.dumps(payload)))
+    return json.dumps(payload).encode()
+
+
+def _percentiles(values: List[float], points=(50, 90, 95, 99)) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {f"p{p}": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 2) for p in points}
+    result["max"] = round(ordered[-1], 2)
+    return result
+
+
+def _gaps(times: List[float]) -> List[float]:
+    return [(b - a) * 1000 for a, b in zip(times, times[1:])]
+
+
+def replay(records: List[Dict[str, Any]], target: str = DEFAULT_TARGET, speed: float = 1.0,
+           concurrency: int = 64, token: Optional[str] = None, forward_clients: bool = True,
+           stop_event: Optional[threading.Event] = None, log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """
+    Re-issue `records` with their recorded gaps divided by `speed`.
+
+    Latency is measured from each request's scheduled time, so time spent
+    waiting for a free worker counts (no coordinated omission); `slip` is
+    how late requests left compared to the schedule.
+    """
+    if not MIN_SPEED <= speed <= MAX_SPEED:
+        raise ValueError(f"speed must be between {MIN_SPEED:g}x and {MAX_SPEED:g}x")
+    if not records:
+        raise ValueError("nothing to replay")
+    upstream = urlsplit(target)
+    stop_event = stop_event or threading.Event()
+    local = threading.local()
+    samples: List[Dict[str, Any]] = []
+    samples_lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(concurrency * 4)  # cap the queued backlog too
+
+    def connection() -> http.client.HTTPConnection:
+        if getattr(local, "conn", None) is None:
+            local.conn = http.client.HTTPConnection(upstream.hostname, upstream.port or 80, timeout=60)
+        return local.conn
+
+    def send(record: Dict[str, Any], due: float):
+        sent = time.perf_counter()
+        status: Any = None
+        try:
+            headers = {"User-Agent": "traffic-replay"}
+            body = request_body(record)
+            if body is not None:
+                headers["Content-Type"] = record.get("contentType") or "application/json"
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+            if forward_clients and record.get("client"):
+                octets = bytes.fromhex(record["client"][:6].ljust(6, "0"))
+                headers["X-Forwarded-For"] = "10.{}.{}.{}".format(*octets)
+            conn = connection()
+            try:
+                conn.request(record["method"], record["path"], body=body, headers=headers)
+                response = conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                # Server closed an idle keep-alive connection; retry once on a new one
+                conn.close()
+                local.conn = None
+                conn = connection()
+                conn.request(record["method"], record["path"], body=body, headers=headers)
+                response = conn.getresponse()
+            response.read()
+            status = response.status
+        except Exception as e:
+            status = f"error:{type(e).__name__}"
+            local.conn = None
+        finally:
+            done = time.perf_counter()
+            with samples_lock:
+                samples.append({"offset": round(sent - start, 4), "route": record.get("route", "?"),
+                                "status": status, "latencyMs": (done - due) * 1000,
+                                "serviceMs": (done - sent) * 1000, "slipMs": (sent - due) * 1000})
+            in_flight.release()
+
+    t0 = records[0]["t"]
+    log(f"Replaying {len(records)} requests ({records[-1]['t'] - t0:.1f}s recorded) at {speed:g}x against {target}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record in records:
+            due = start + (record["t"] - t0) / speed
+            delay = due - time.perf_counter()
+            if delay > 0 and stop_event.wait(delay):
+                break
+            if stop_event.is_set():
+                break
+            in_flight.acquire()
+            pool.submit(send, record, due)
+    elapsed = time.perf_counter() - start
+    return summarize(records[:len(samples)], samples, speed, elapsed, target)
+
+
+def summarize(records: List[Dict[str, Any]], samples: List[Dict[str, Any]], speed: float,
+              elapsed: float, target: str) -> Dict[str, Any]:
+    statuses: Dict[str, int] = {}
+    routes: Dict[str, Dict[str, Any]] = {}
+    for sample in samples:
+        key = str(sample["status"])
+        statuses[key] = statuses.get(key, 0) + 1
+        route = routes.setdefault(sample["route"], {"count": 0, "rateLimited": 0, "errors": 0, "latencies": []})
+        route["count"] += 1
+        route["latencies"].append(sample["latencyMs"])
+        if sample["status"] == 429:
+            route["rateLimited"] += 1
+        elif not isinstance(sample["status"], int) or sample["status"] >= 500:
+            route["errors"] += 1
+
+    recorded_span = (records[-1]["t"] - records[0]["t"]) if len(records) > 1 else 0.0
+    sends = sorted(s["offset"] for s in samples)
+    return {
+        "target": target,
+        "speed": speed,
+        "requests": len(samples),
+        "seconds": round(elapsed, 3),
+        "recordedSeconds": round(recorded_span, 3),
+        "offeredRps": round(len(records) / (recorded_span / speed), 1) if recorded_span else None,
+        "achievedRps": round(len(samples) / elapsed, 1) if elapsed else None,
+        "status": dict(sorted(statuses.items())),
+        "rateLimited": statuses.get("429", 0),
+        "errors": sum(n for code, n in statuses.items() if not code.isdigit() or int(code) >= 500),
+        "latencyMs": _percentiles([s["latencyMs"] for s in samples]),
+        "slipMs": _percentiles([s["slipMs"] for s in samples], (50, 99)),
+        "interArrivalMs": {
+            "recordedScaled": _percentiles([g / speed for g in _gaps([r["t"] for r in records])], (50, 90, 99)),
+            "replayed": _percentiles(_gaps(sends), (50, 90, 99)),
+        },
+        "routes": {
+            name: {"count": r["count"], "rateLimited": r["rateLimited"], "errors": r["errors"],
+                   "latencyMs": _percentiles(r["latencies"], (50, 95, 99))}
+            for name, r in sorted(routes.items(), key=lambda item: -item[1]["count"])
+        },
+        "samples": samples,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lat = report["latencyMs"]
+    gaps = report["interArrivalMs"]
+    lines = [
+        f"{report['requests']} requests in {report['seconds']}s at {report['speed']:g}x "
+        f"(offered {report['offeredRps']} rps, achieved {report['achievedRps']} rps)",
+        f"status: {report['status']}   429s: {report['rateLimited']}   errors: {report['errors']}",
+        f"latency ms: p50 {lat.get('p50')}  p90 {lat.get('p90')}  p95 {lat.get('p95')}  p99 {lat.get('p99')}  max {lat.get('max')}",
+        f"schedule slip ms: p50 {report['slipMs'].get('p50')}  p99 {report['slipMs'].get('p99')}  max {report['slipMs'].get('max')}",
+        f"inter-arrival ms p50/p90/p99: recorded {gaps['recordedScaled'].get('p50')}/{gaps['recordedScaled'].get('p90')}/"
+        f"{gaps['recordedScaled'].get('p99')}  replayed {gaps['replayed'].get('p50')}/{gaps['replayed'].get('p90')}/{gaps['replayed'].get('p99')}",
+        "",
+        f"{'route':<40} {'count':>7} {'429':>6} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8}",
+    ]
+    for name, r in report["routes"].items():
+        l = r["latencyMs"]
+        lines.append(f"{name[:40]:<40} {r['count']:>7} {r['rateLimited']:>6} {r['errors']:>5} "
+                     f"{l.get('p50', 0):>8} {l.get('p95', 0):>8} {l.get('p99', 0):>8}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Capture and replay backend traffic")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    capture = sub.add_parser("capture", help="Record [access] lines from a server log")
+    capture.add_argument("log", nargs="?", default="-", help="Log file, or - for stdin")
+    capture.add_argument("--follow", action="store_true", help="Keep reading as the log grows")
+    capture.add_argument("--out", type=Path)
+
+    proxy = sub.add_parser("proxy", help="Recording proxy in front of the backend")
+    proxy.add_argument("--listen", default=f"{DEFAULT_PROXY[0]}:{DEFAULT_PROXY[1]}")
+    proxy.add_argument("--target", default=DEFAULT_TARGET)
+    proxy.add_argument("--bodies", action="store_true", help="Keep request bodies for exact replay")
+    proxy.add_argument("--out", type=Path)
+
+    play = sub.add_parser("replay", help="Re-issue a capture against a backend")
+    play.add_argument("capture", type=Path)
+    play.add_argument("--target", default=DEFAULT_TARGET)
+    play.add_argument("--speed", type=float, default=1.0, help=f"{MIN_SPEED:g}-{MAX_SPEED:g}")
+    play.add_argument("--concurrency", type=int, default=64)
+    play.add_argument("--exclude", help="Skip requests whose route or path matches this regex")
+    play.add_argument("--limit", type=int, help="Replay only the first N requests")
+    play.add_argument("--token", help="Bearer token sent with every request")
+    play.add_argument("--no-forward", action="store_true", help="Don't send X-Forwarded-For per recorded client")
+    play.add_argument("--json", type=Path, help="Write the full report (with per-request samples) here")
+    args = parser.parse_args(argv)
+
+    if args.command == "replay":
+        if not MIN_SPEED <= args.speed <= MAX_SPEED:
+            parser.error(f"--speed must be between {MIN_SPEED:g} and {MAX_SPEED:g}")
+        records = load_capture(args.capture, args.exclude, args.limit)
+        report = replay(records, args.target, args.speed, args.concurrency, args.token, not args.no_forward)
+        print(format_report(report))
+        if args.json:
+            args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        return 0
+
+    recorder = TrafficRecorder(args.out or new_capture_path())
+    try:
+        if args.command == "capture":
+            stream = sys.stdin if args.log == "-" else open(args.log, "r", encoding="utf-8", errors="replace")
+            capture_lines(_follow(stream) if args.follow else stream, recorder)
+        else:
+            host, _, port = args.listen.rpartition(":")
+            server = record_proxy(args.target, host or DEFAULT_PROXY[0], int(port), recorder, args.bodies)
+            print(f"Recording {args.target} via http://{host}:{port} -> {recorder.path}")
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+    print(f"{recorder.count} requests recorded to {recorder.path}")
+    if recorder.untimed:
+        print(f"Warning: skipped {recorder.untimed} access lines without an arrival time (at=); "
+              "capture from a backend that logs it to keep the inter-arrival pattern", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())